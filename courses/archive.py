@@ -0,0 +1,336 @@
+"""
+Academic years and the attendance archive.
+
+An academic year starts on the 1st of ACADEMIC_YEAR_START_MONTH and is
+named after the calendar year it starts in (2024 = Apr 2024 - Mar 2025
+with the default April start). The current year and the
+ATTENDANCE_LIVE_YEARS - 1 before it stay in the Attendance table; older
+("closed") years can be moved by `manage.py archive_attendance` into
+AttendanceArchive: one row per student per year holding that student's
+records as zlib-compressed columns.
+
+A record lives in exactly one of the two tables, so readers combine them:
+the archive is only consulted when the requested date range starts before
+archive_horizon() (or is open-ended), and recent-range reads cost nothing
+extra.
+"""
+import datetime
+import json
+import zlib
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+PAYLOAD_VERSION = 1
+COLUMNS = ('id', 'lecture_id', 'date', 'present', 'watched_video', 'updated_at')
+
+
+# ---------------------------------------------------------------------------
+# Academic years
+# ---------------------------------------------------------------------------
+
+def start_month():
+    return getattr(settings, 'ACADEMIC_YEAR_START_MONTH', 4)
+
+
+def academic_year(day):
+    return day.year if day.month >= start_month() else day.year - 1
+
+
+def academic_year_bounds(year):
+    """
+    [start, end) dates of an academic year.
+    """
+    return datetime.date(year, start_month(), 1), datetime.date(year + 1, start_month(), 1)
+
+
+def archive_horizon(today=None):
+    """
+    First day that is always in the live table. Years starting before it
+    may be archived.
+    """
+    today = today or timezone.localdate()
+    live_years = max(getattr(settings, 'ATTENDANCE_LIVE_YEARS', 2), 1)
+    return academic_year_bounds(academic_year(today) - (live_years - 1))[0]
+
+
+def needs_archive(start_date):
+    """
+    Does a range starting at start_date (None = open) reach into archivable
+    years? Accepts a date or a 'YYYY-MM-DD' query string; an unparseable
+    string answers False and is left for the live query to reject.
+    """
+    if start_date in (None, ''):
+        return True
+    if isinstance(start_date, str):
+        try:
+            start_date = parse_date(start_date)
+        except ValueError:
+            return False
+        if start_date is None:
+            return False
+    return start_date < archive_horizon()
+
+
+def _as_date(value):
+    if value in (None, ''):
+        return None
+    if isinstance(value, str):
+        try:
+            return parse_date(value)
+        except ValueError:
+            return None
+    return value
+
+
+# ---------------------------------------------------------------------------
+# Payload encoding
+# ---------------------------------------------------------------------------
+
+def encode_records(rows):
+    """
+    rows: dicts with COLUMNS keys, sorted by date. Dates are stored as
+    day offsets from the first date, booleans as 0/1.
+    """
+    base = rows[0]['date'].toordinal() if rows else 0
+    columns = {
+        'v': PAYLOAD_VERSION,
+        'base': base,
+        'id': [r['id'] for r in rows],
+        'lecture_id': [r['lecture_id'] for r in rows],
+        'date': [r['date'].toordinal() - base for r in rows],
+        'present': [int(r['present']) for r in rows],
+        'watched_video': [int(r['watched_video']) for r in rows],
+        'updated_at': [r['updated_at'].isoformat() if r['updated_at'] else None for r in rows],
+    }
+    return zlib.compress(json.dumps(columns, separators=(',', ':')).encode(), 9)
+
+
+def decode_records(payload):
+    columns = json.loads(zlib.decompress(bytes(payload)))
+    if columns.get('v') != PAYLOAD_VERSION:
+        raise ValueError(f"Unsupported attendance archive payload version {columns.get('v')!r}.")
+    base = columns['base']
+    return [
+        {
+            'id': columns['id'][i],
+            'lecture_id': columns['lecture_id'][i],
+            'date': datetime.date.fromordinal(base + columns['date'][i]),
+            'present': bool(columns['present'][i]),
+            'watched_video': bool(columns['watched_video'][i]),
+            'updated_at': datetime.datetime.fromisoformat(columns['updated_at'][i])
+            if columns['updated_at'][i] else None,
+        }
+        for i in range(len(columns['id']))
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def _archive_rows(start_date, end_date, **filters):
+    from .models import AttendanceArchive
+
+    queryset = AttendanceArchive.objects.filter(**filters)
+    if start_date:
+        queryset = queryset.filter(last_date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(first_date__lte=end_date)
+    return queryset
+
+
+def archived_attendance(start_date=None, end_date=None, **filters):
+    """
+    Archived records matching filters (student_id=..., student_class_id=...,
+    school_id=...) within [start_date, end_date], newest first, as objects
+    shaped like Attendance for the read views: id, date, present,
+    watched_video, student_id, lecture_id and lecture (with .title, or None).
+    """
+    from .models import Lecture
+
+    start_date, end_date = _as_date(start_date), _as_date(end_date)
+    records = []
+    for archive in _archive_rows(start_date, end_date, **filters).only('student_id', 'payload'):
+        for row in decode_records(archive.payload):
+            if start_date and row['date'] < start_date:
+                continue
+            if end_date and row['date'] > end_date:
+                continue
+            records.append(SimpleNamespace(student_id=archive.student_id, **row))
+
+    lecture_ids = {r.lecture_id for r in records if r.lecture_id}
+    lectures = {
+        pk: SimpleNamespace(id=pk, title=title)
+        for pk, title in Lecture.objects.filter(pk__in=lecture_ids).values_list('id', 'title')
+    } if lecture_ids else {}
+    for record in records:
+        record.lecture = lectures.get(record.lecture_id)
+
+    records.sort(key=lambda r: (r.date, r.id), reverse=True)
+    return records
+
+
+def archived_totals(**filters):
+    """
+    (total, present) over all archived years, from the per-row counters
+    without decompressing anything.
+    """
+    from .models import AttendanceArchive
+
+    totals = AttendanceArchive.objects.filter(**filters).aggregate(
+        total=Sum('record_count'), present=Sum('present_count')
+    )
+    return totals['total'] or 0, totals['present'] or 0
+
+
+def merge_by_date(live_records, archived_records):
+    """
+    Live and archived records as one newest-first list.
+    """
+    if not archived_records:
+        return live_records
+    return sorted(
+        [*live_records, *archived_records], key=lambda r: (r.date, r.id), reverse=True
+    )
+
+
+# ---------------------------------------------------------------------------
+# Archiving
+# ---------------------------------------------------------------------------
+
+def archivable_years(today=None):
+    """
+    Academic years before the horizon that still have live rows.
+    """
+    from .models import Attendance
+
+    oldest = Attendance.objects.order_by('date').values_list('date', flat=True).first()
+    horizon_year = academic_year(archive_horizon(today))
+    if oldest is None:
+        return []
+    return list(range(academic_year(oldest), horizon_year))
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def archive_year(year, batch_size=500, today=None):
+    """
+    Move one closed academic year from Attendance into AttendanceArchive,
+    batch_size students per transaction. Students already archived for the
+    year (rows added after an earlier run) get their archive row merged.
+    Returns (students, records) moved.
+    """
+    from .models import Attendance, AttendanceArchive
+    from .sync import moving_attendance
+
+    if year >= academic_year(archive_horizon(today)):
+        raise ValueError(f"Academic year {year} is still live (see ATTENDANCE_LIVE_YEARS).")
+    start, end = academic_year_bounds(year)
+    in_year = Attendance.objects.filter(date__gte=start, date__lt=end)
+    student_ids = sorted(set(in_year.values_list('student_id', flat=True)))
+
+    moved_students = moved_records = 0
+    for batch in _chunks(student_ids, batch_size):
+        with transaction.atomic():
+            rows_by_student = {}
+            rows = in_year.filter(student_id__in=batch).select_for_update().order_by('date', 'id').values(
+                'student_id', 'student_class_id', 'school_id', *COLUMNS
+            )
+            for row in rows:
+                rows_by_student.setdefault(row['student_id'], []).append(row)
+            existing = {
+                archive.student_id: archive
+                for archive in AttendanceArchive.objects.select_for_update().filter(
+                    academic_year=year, student_id__in=rows_by_student
+                )
+            }
+
+            created, updated, ids = [], [], []
+            for student_id, student_rows in rows_by_student.items():
+                ids.extend(row['id'] for row in student_rows)
+                latest = student_rows[-1]
+                archive = existing.get(student_id)
+                if archive is not None:
+                    # A live row replaces the archived one with its key (a
+                    # record per student, lecture and day)
+                    live_keys = {(row['lecture_id'], row['date']) for row in student_rows if row['lecture_id']}
+                    student_rows = sorted(
+                        [r for r in decode_records(archive.payload) if (r['lecture_id'], r['date']) not in live_keys]
+                        + student_rows,
+                        key=lambda r: (r['date'], r['id']),
+                    )
+                else:
+                    archive = AttendanceArchive(student_id=student_id, academic_year=year)
+                archive.student_class_id = latest['student_class_id']
+                archive.school_id = latest['school_id']
+                archive.record_count = len(student_rows)
+                archive.present_count = sum(1 for r in student_rows if r['present'])
+                archive.first_date = student_rows[0]['date']
+                archive.last_date = student_rows[-1]['date']
+                archive.payload = encode_records(student_rows)
+                (updated if archive.pk else created).append(archive)
+
+            AttendanceArchive.objects.bulk_create(created)
+            if updated:
+                archive_fields = [
+                    'student_class', 'school', 'record_count', 'present_count',
+                    'first_date', 'last_date', 'payload', 'archived_at',
+                ]
+                now = timezone.now()
+                for archive in updated:
+                    archive.archived_at = now
+                AttendanceArchive.objects.bulk_update(updated, archive_fields)
+            with moving_attendance():
+                for chunk in _chunks(ids, 1000):
+                    Attendance.objects.filter(id__in=chunk).delete()
+
+        moved_students += len(rows_by_student)
+        moved_records += len(ids)
+    return moved_students, moved_records
+
+
+def restore_year(year, batch_size=500):
+    """
+    Move an archived academic year back into Attendance (same ids).
+    Returns (students, records) restored.
+    """
+    from .models import Attendance, AttendanceArchive
+
+    archive_ids = list(
+        AttendanceArchive.objects.filter(academic_year=year).order_by('id').values_list('id', flat=True)
+    )
+    start, end = academic_year_bounds(year)
+    restored_students = restored_records = 0
+    for batch in _chunks(archive_ids, batch_size):
+        with transaction.atomic():
+            archives = list(AttendanceArchive.objects.select_for_update().filter(id__in=batch))
+            # Rows written after the archive run are newer than the archived
+            # records with their key, which are dropped
+            live_keys = set(Attendance.objects.filter(
+                student_id__in=[archive.student_id for archive in archives], date__gte=start, date__lt=end,
+            ).values_list('student_id', 'lecture_id', 'date'))
+            records = [
+                Attendance(
+                    student_id=archive.student_id,
+                    student_class_id=archive.student_class_id,
+                    school_id=archive.school_id,
+                    **row,
+                )
+                for archive in archives
+                for row in decode_records(archive.payload)
+                if (archive.student_id, row['lecture_id'], row['date']) not in live_keys
+            ]
+            # updated_at is bumped (auto_now), so clients' ETags refresh
+            Attendance.objects.bulk_create(records, batch_size=1000)
+            AttendanceArchive.objects.filter(id__in=batch).delete()
+        restored_students += len(archives)
+        restored_records += len(records)
+    return restored_students, restored_records
@@ -0,0 +1,329 @@
+"""
+Async twins of the student portal views (courses/student_views.py).
+
+Served under /api/async/student/... when the project runs on ASGI. Each view
+issues its independent queries as separate async ORM calls and awaits them
+together with asyncio.gather, instead of one after another. Payloads come
+from the same builders as the sync views, so responses are identical.
+
+Note: Django's async ORM still executes SQL through sync_to_async, so how
+much real overlap you get depends on the Django version and DB backend;
+use the `loadtest_student_portal` command to compare the two stacks.
+"""
+import asyncio
+from datetime import date, timedelta
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Q
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+
+from users.models import Role
+from .async_utils import aget_user, alist, render_api_exception, render_json
+from .archive import archived_attendance, archived_totals, merge_by_date, needs_archive
+from .conditional import compute_validators, not_modified, set_validators
+from .catalog import class_subjects, lecture_catalog, render_catalog
+from .models import Announcement, Attendance, Lecture
+from .singleflight import asingle_flight
+from .student_views import (
+    DASHBOARD_USER_FIELDS,
+    attendance_queryset,
+    attendance_validator_sources,
+    build_attendance,
+    build_dashboard,
+    build_dashboard_sections,
+    build_lecture_detail,
+    build_lecture_list,
+    build_mark_watched,
+    build_profile,
+    catalog_servable,
+    dashboard_sections_key,
+    dashboard_validator_sources,
+    filter_class_lectures,
+    lecture_list_fields,
+    lectures_validators,
+    load_lecture_list_fields,
+)
+
+
+class AsyncStudentView(View):
+    """
+    Base class: authenticates like a DRF view and enforces the same access
+    rules as the sync student views.
+
+    students_only_detail: if True, non-students get DRF's generic permission
+    error (views guarded by IsStudent); otherwise the custom
+    "only for students" message (views that check the role inline).
+    """
+    students_only_detail = False
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Same as DRF: authentication classes enforce CSRF themselves
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            user = await aget_user(request)
+            if not user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+        except exceptions.APIException as exc:
+            return render_api_exception(request, exc)
+
+        if user.role != Role.STUDENT and not user.is_superuser:
+            if self.students_only_detail:
+                return render_api_exception(request, exceptions.PermissionDenied())
+            return render_json(
+                {"error": "This endpoint is only for students."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        request.user = user
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncStudentDashboardView(AsyncStudentView):
+    """
+    Async version of StudentDashboardView.
+    URL: /api/async/student/dashboard/
+
+    Attendance stats, lectures and announcements are fetched concurrently.
+    """
+    async def get(self, request):
+        user = request.user
+
+        if not user.assigned_class and not user.is_superuser:
+            return render_json(
+                {"error": "You are not assigned to any class. Please contact your school admin."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        student_class = user.assigned_class
+        one_week_ago = timezone.now() - timedelta(days=7)
+
+        validators = await sync_to_async(compute_validators)(
+            request,
+            dashboard_validator_sources(user, student_class, one_week_ago),
+            user_fields=DASHBOARD_USER_FIELDS
+        )
+        cached = not_modified(request, validators)
+        if cached:
+            return cached
+
+        async def attendance_stats():
+            live, (archived_total, archived_present) = await asyncio.gather(
+                Attendance.objects.filter(student=user).aaggregate(
+                    total=Count('id'),
+                    present=Count('id', filter=Q(present=True)),
+                ),
+                sync_to_async(archived_totals)(student_id=user.pk),
+            )
+            return {'total': live['total'] + archived_total, 'present': live['present'] + archived_present}
+
+        async def sections():
+            lectures = Lecture.objects.filter(class_assigned=student_class).order_by('-uploaded_at')
+            announcements = Announcement.objects.filter(target_class=student_class).order_by('-created_at')
+            total_lectures, recent_lectures, new_count, recent_announcements = await asyncio.gather(
+                lectures.acount(),
+                alist(lectures.select_related('subject')[:5]),
+                announcements.filter(created_at__gte=one_week_ago).acount(),
+                alist(announcements.select_related('posted_by')[:3]),
+            )
+            return build_dashboard_sections(total_lectures, recent_lectures, new_count, recent_announcements)
+
+        async def class_sections():
+            if not student_class:
+                return build_dashboard_sections(0, [], 0, [])
+            # Shared by the class's students loading the dashboard at once
+            return await asingle_flight(dashboard_sections_key(student_class, validators), sections)
+
+        stats, class_data = await asyncio.gather(attendance_stats(), class_sections())
+
+        response_data = build_dashboard(user, student_class, stats['total'], stats['present'], class_data)
+        return set_validators(render_json(response_data), validators)
+
+
+class AsyncStudentLecturesView(AsyncStudentView):
+    """
+    Async version of StudentLecturesView.
+    URL: /api/async/student/lectures/
+    Query Params: ?subject=<id>&search=<text>&fields=<keys>
+    """
+    async def get(self, request):
+        user = request.user
+
+        if not user.assigned_class and not user.is_superuser:
+            return render_json(
+                {"error": "You are not assigned to any class."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        student_class = user.assigned_class
+        try:
+            fields = lecture_list_fields(request)
+        except exceptions.ValidationError as exc:
+            return render_api_exception(request, exc)
+
+        subject_id = request.GET.get('subject')
+        search_query = request.GET.get('search')
+        from_catalog = catalog_servable(student_class, subject_id, search_query, fields)
+
+        validators = await sync_to_async(lectures_validators)(request, user, student_class, from_catalog)
+        cached = not_modified(request, validators)
+        if cached:
+            return cached
+
+        watched_qs = Attendance.objects.filter(
+            student=user, watched_video=True
+        ).values_list('lecture_id', flat=True)
+
+        if from_catalog:
+            catalog, watched_ids = await asyncio.gather(
+                sync_to_async(lecture_catalog)(student_class.pk), alist(watched_qs)
+            )
+            body = render_catalog(catalog, student_class, set(watched_ids), int(subject_id) if subject_id else None)
+            return set_validators(HttpResponse(body, content_type='application/json'), validators)
+
+        lectures_qs = load_lecture_list_fields(
+            filter_class_lectures(student_class, subject_id, search_query), fields
+        )
+        subjects_qs = class_subjects(student_class.pk if student_class else None)
+
+        lectures, watched_ids, subjects = await asyncio.gather(
+            alist(lectures_qs), alist(watched_qs), alist(subjects_qs)
+        )
+
+        response_data = build_lecture_list(student_class, lectures, set(watched_ids), subjects, fields)
+        return set_validators(render_json(response_data), validators)
+
+
+class AsyncStudentLectureDetailView(AsyncStudentView):
+    """
+    Async version of StudentLectureDetailView.
+    URL: /api/async/student/lectures/<id>/
+    """
+    async def get(self, request, pk):
+        user = request.user
+
+        try:
+            lecture = await Lecture.objects.select_related('subject', 'class_assigned').aget(pk=pk)
+        except Lecture.DoesNotExist:
+            return render_json({"error": "Lecture not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        if user.assigned_class and lecture.class_assigned_id != user.assigned_class_id:
+            return render_json(
+                {"error": "You don't have access to this lecture."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        questions = lecture.questions.select_related('asked_by').order_by('-created_at')[:5]
+        is_watched, recent_questions, question_count = await asyncio.gather(
+            Attendance.objects.filter(student=user, lecture=lecture, watched_video=True).aexists(),
+            alist(questions),
+            lecture.questions.acount(),
+        )
+
+        response_data = build_lecture_detail(lecture, is_watched, recent_questions, question_count)
+        return render_json(response_data)
+
+
+class AsyncStudentAttendanceView(AsyncStudentView):
+    """
+    Async version of StudentAttendanceView.
+    URL: /api/async/student/attendance/
+    Query Params: ?start_date=YYYY-MM-DD&end_date=YYYY-MM-DD
+    """
+    students_only_detail = True
+
+    async def get(self, request):
+        user = request.user
+        start_date = request.GET.get('start_date')
+        end_date = request.GET.get('end_date')
+        queryset = attendance_queryset(user, start_date, end_date)
+        include_archive = needs_archive(start_date)
+
+        validators = await sync_to_async(compute_validators)(
+            request, attendance_validator_sources(user, queryset, include_archive)
+        )
+        cached = not_modified(request, validators)
+        if cached:
+            return cached
+
+        async def archived():
+            if not include_archive:
+                return []
+            return await sync_to_async(archived_attendance)(start_date, end_date, student_id=user.pk)
+
+        stats, records, archived_records = await asyncio.gather(
+            queryset.aaggregate(
+                total=Count('id'),
+                present=Count('id', filter=Q(present=True)),
+            ),
+            alist(queryset),
+            archived(),
+        )
+
+        total = stats['total'] + len(archived_records)
+        present = stats['present'] + sum(record.present for record in archived_records)
+        response_data = build_attendance(total, present, merge_by_date(records, archived_records))
+        return set_validators(render_json(response_data), validators)
+
+
+class AsyncStudentProfileView(AsyncStudentView):
+    """
+    Async version of StudentProfileView.
+    URL: /api/async/student/profile/
+    """
+    students_only_detail = True
+
+    async def get(self, request):
+        return render_json(build_profile(request.user))
+
+
+class AsyncMarkLectureWatchedView(AsyncStudentView):
+    """
+    Async version of MarkLectureWatchedView.
+    URL: /api/async/student/lectures/<id>/mark-watched/
+    Method: POST
+    """
+    students_only_detail = True
+
+    async def post(self, request, pk):
+        user = request.user
+
+        try:
+            lecture = await Lecture.objects.aget(pk=pk)
+        except Lecture.DoesNotExist:
+            return render_json({"error": "Lecture not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        if user.assigned_class and lecture.class_assigned_id != user.assigned_class_id:
+            return render_json(
+                {"error": "You don't have access to this lecture."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        if not lecture.video_file and not lecture.video_url:
+            return render_json(
+                {"error": "This lecture has no video to watch."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        today = date.today()
+        attendance, created = await Attendance.objects.aget_or_create(
+            student=user,
+            lecture=lecture,
+            date=today,
+            defaults={
+                'watched_video': True,
+                'present': False  # Teacher will mark this manually
+            }
+        )
+        if not created:
+            attendance.watched_video = True
+            await attendance.asave()
+
+        return render_json(build_mark_watched(lecture, today, created))
@@ -0,0 +1,71 @@
+"""
+Helpers for plain Django async views (DRF's APIView is sync-only).
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+
+def _authenticate(request):
+    drf_request = Request(
+        request,
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    user = drf_request.user
+    # Cache the related objects the views read so they don't lazy-load
+    # from inside the event loop later.
+    if user.is_authenticated:
+        user.school
+        user.assigned_class
+    return user
+
+
+async def aget_user(request):
+    """
+    Authenticate a request with the same authentication classes DRF views use
+    (session, basic, JWT...). Returns the user or AnonymousUser.
+
+    Raises rest_framework.exceptions.APIException subclasses exactly where a
+    DRF view would (bad credentials, missing CSRF token on a session POST...).
+    """
+    return await sync_to_async(_authenticate)(request)
+
+
+async def alist(queryset):
+    """
+    Evaluate a queryset through the async ORM.
+    """
+    return [obj async for obj in queryset]
+
+
+def render_json(data, status=status.HTTP_200_OK):
+    """
+    Render like a DRF Response with the JSON renderer, so async endpoints
+    return byte-identical bodies to their sync counterparts.
+    """
+    return HttpResponse(
+        JSONRenderer().render(data),
+        content_type='application/json',
+        status=status
+    )
+
+
+def render_api_exception(request, exc):
+    """
+    Mirror DRF's handling of API exceptions (authentication, permission and
+    validation errors).
+    """
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+    response = render_json(data, status=exc.status_code)
+    if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+        authenticator = api_settings.DEFAULT_AUTHENTICATION_CLASSES[0]()
+        header = authenticator.authenticate_header(request)
+        if header:
+            response['WWW-Authenticate'] = header
+        else:
+            # DRF downgrades to 403 when the first authenticator has no challenge
+            response.status_code = status.HTTP_403_FORBIDDEN
+    return response
@@ -0,0 +1,18 @@
+"""
+DRF authentication classes (REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES']).
+"""
+from rest_framework.authentication import BaseAuthentication
+
+
+class BatchUserAuthentication(BaseAuthentication):
+    """
+    Authenticates the sub-requests of /api/batch/ (courses/batch_views.py)
+    as the user of the batch, which was authenticated already. Only
+    requests built in-process carry a batch_user; for any other request it
+    defers to the next class.
+    """
+    def authenticate(self, request):
+        user = getattr(request._request, 'batch_user', None)
+        if user is None:
+            return None
+        return user, None
@@ -0,0 +1,229 @@
+"""
+Batch API: several GET requests in one round trip (app start-up).
+
+    POST /api/batch/
+    {"requests": [
+        {"path": "/api/student/dashboard/"},
+        {"path": "/api/student/lectures/?fields=id,title", "headers": {"If-None-Match": "\"...\""}},
+        {"path": "/api/announcements/"}
+    ]}
+
+    200 {"responses": [{"status": 200, "headers": {...}, "body": {...}}, ...]}
+
+Responses come back in request order. Each sub-request runs the route's
+view in-process exactly as a direct request would (same permissions,
+ETags, read replica), authenticated as the caller by
+courses.authentication.BatchUserAuthentication: the user and its school
+and class are loaded once for the whole batch, and each sub-request gets
+its own copy of them. Only GET requests to the courses and users APIs can
+be batched; reads don't depend on each other, so they run concurrently on
+a small thread pool (BATCH_MAX_WORKERS), each thread with its own
+database connection. Inside a transaction (tests,
+ATOMIC_REQUESTS) they run one after another, since other connections
+could not see its uncommitted rows. Either way their queries count
+towards the batch request's metrics and Server-Timing header.
+"""
+import copy
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.exception import response_for_exception
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections, connections
+from django.urls import Resolver404, resolve
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework import status
+
+from scholiv_lms.admission import lane_for
+from scholiv_lms.db_router import replica_reads
+from scholiv_lms.metrics import registry
+from scholiv_lms.middleware import RequestMetricsMiddleware, RequestStats
+
+BATCHABLE_APPS = ('courses', 'users')
+# Batch request headers sub-requests don't inherit: the body's and the
+# conditional ones (each sub-request sends its own in "headers")
+EXCLUDED_META = ('CONTENT_', 'HTTP_IF_', 'wsgi.')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.BATCH_MAX_WORKERS, thread_name_prefix='batch'
+            )
+        return _executor
+
+
+def _view_module(func):
+    view = getattr(func, 'cls', None) or getattr(func, 'view_class', None) or func
+    return view.__module__
+
+
+def parse_batch(data):
+    """
+    [(path, query string, resolver match, headers)] for a batch body, or
+    raises ValueError with {index: error} for every invalid sub-request.
+    """
+    items = data.get('requests') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        raise ValueError('Expected {"requests": [{"path": "/api/..."}, ...]}.')
+    if len(items) > settings.BATCH_MAX_REQUESTS:
+        raise ValueError(f'At most {settings.BATCH_MAX_REQUESTS} requests per batch.')
+
+    parsed, errors = [], {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('path'), str):
+            errors[index] = 'Expected {"path": "/api/..."}.'
+            continue
+        if str(item.get('method', 'GET')).upper() != 'GET':
+            errors[index] = 'Only GET requests can be batched.'
+            continue
+        headers = item.get('headers') or {}
+        if not isinstance(headers, dict) or not all(isinstance(v, str) for v in headers.values()):
+            errors[index] = 'headers must be an object of strings.'
+            continue
+        url = urlsplit(item['path'])
+        try:
+            match = resolve(url.path)
+        except Resolver404:
+            errors[index] = 'Not found.'
+            continue
+        if getattr(match.func, 'view_class', None) is BatchView \
+                or _view_module(match.func).split('.')[0] not in BATCHABLE_APPS:
+            errors[index] = 'This route cannot be batched.'
+            continue
+        parsed.append((url.path, url.query, match, headers))
+    if errors:
+        raise ValueError(errors)
+    return parsed
+
+
+def _sub_request(request, user, path, query, match, headers):
+    environ = {
+        key: value for key, value in request.META.items()
+        if not key.startswith(EXCLUDED_META) and isinstance(value, str)
+    }
+    environ.update({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'wsgi.input': io.BytesIO(),
+        'wsgi.url_scheme': request.scheme,
+    })
+    for name, value in headers.items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
+    sub = WSGIRequest(environ)
+    sub.resolver_match = match
+    # What DRF (and async_utils.aget_user) authenticate this as
+    sub.batch_user = sub.user = copy.deepcopy(user)
+    return sub
+
+
+def _call_view(sub):
+    match = sub.resolver_match
+    # Same admission lanes as direct requests (scholiv_lms/admission.py)
+    lane = lane_for(match.view_name)
+    if lane is not None and not lane.acquire():
+        return lane.shed_response()
+    try:
+        with replica_reads(sub, match.func):
+            if iscoroutinefunction(match.func):
+                response = async_to_sync(match.func)(sub, *match.args, **match.kwargs)
+            else:
+                response = match.func(sub, *match.args, **match.kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+    except Exception as exc:
+        response = response_for_exception(sub, exc)
+    finally:
+        if lane is not None:
+            lane.release()
+    return response
+
+
+def _run(sub, own_connections, stats=None):
+    if own_connections:
+        close_old_connections()
+    try:
+        if stats is None:
+            response = _call_view(sub)
+        else:
+            with RequestMetricsMiddleware.wrap_connections(stats):
+                response = _call_view(sub)
+    finally:
+        if own_connections:
+            close_old_connections()
+
+    route = sub.resolver_match.view_name
+    registry.inc('http_batch_subrequests_total', route=route, status=response.status_code)
+    if response.streaming:
+        response.close()
+        return {'status': status.HTTP_400_BAD_REQUEST, 'headers': {}, 'body': {
+            'error': 'Streaming responses cannot be batched.'
+        }}
+
+    body = response.content
+    if not body:
+        body = None
+    elif response.get('Content-Type', '').startswith('application/json'):
+        body = json.loads(body)
+    else:
+        body = body.decode(response.charset, errors='replace')
+    headers = {name: value for name, value in response.items() if name != 'Content-Length'}
+    return {'status': response.status_code, 'headers': headers, 'body': body}
+
+
+def run_batch(request, user, parsed):
+    """
+    The response items of parsed sub-requests, in order.
+    """
+    subs = [_sub_request(request, user, *item) for item in parsed]
+    in_transaction = any(conn.in_atomic_block for conn in connections.all(initialized_only=True))
+    if len(subs) == 1 or in_transaction or settings.BATCH_MAX_WORKERS <= 1:
+        return [_run(sub, own_connections=False) for sub in subs]
+    # Each in a copy of this request's context: the reference cache check
+    # (courses/reference.py) done for the batch holds for its sub-requests
+    executor = _get_executor()
+    parent = getattr(request, '_request_stats', None)
+    stats = [RequestStats(sub, parent.slow_query_ms) if parent else None for sub in subs]
+    futures = [executor.submit(copy_context().run, _run, sub, True, sub_stats) for sub, sub_stats in zip(subs, stats)]
+    items = [future.result() for future in futures]
+    # Added here, on the request's thread: the pool threads only ever
+    # touch their own stats
+    for sub_stats in filter(None, stats):
+        parent.add(sub_stats)
+    return items
+
+
+class BatchView(APIView):
+    """
+    Run several GET requests to the API in one round trip (format above).
+    URL: /api/batch/
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            parsed = parse_batch(request.data)
+        except ValueError as e:
+            return Response({'error': e.args[0]}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Per-batch cache: the user with the related rows the views read,
+        # copied into each sub-request instead of loading them each
+        user = request.user
+        if getattr(user, 'pk', None) is not None:
+            user = get_user_model().objects.select_related('school', 'assigned_class').get(pk=user.pk)
+        return Response({'responses': run_batch(request, user, parsed)}, status=status.HTTP_200_OK)
@@ -0,0 +1,266 @@
+"""
+Benchmark cases for run_benchmarks: one request per API route, plus both
+Excel importers and the attendance report export, against a synthetic
+dataset (courses/synthetic.py). Requests go through django.test.Client,
+so the full middleware / DRF stack runs in-process with no network.
+"""
+import io
+import statistics
+import time
+
+import openpyxl
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections
+from django.test import Client
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from users.models import User
+
+# Routes that can't be timed as a request/response (Server-Sent Events)
+UNBENCHMARKED_ROUTES = {'announcement-stream'}
+
+
+class UnexpectedStatus(Exception):
+    """
+    A case answered with an error status: its timings would be those of
+    the error path, not of the work the case is meant to measure.
+    """
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def xlsx_upload(name, header, rows):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    buffer.name = name
+    return buffer
+
+
+class BenchmarkContext:
+    """
+    Users, objects and counters shared by the cases of one dataset.
+    """
+    def __init__(self, dataset, import_rows):
+        self.dataset = dataset
+        self.import_rows = import_rows
+        self.superuser = User.objects.create_superuser(
+            f"{dataset['prefix']}_superuser", f"{dataset['prefix']}_superuser@example.com", dataset['password']
+        )
+        self.sequence = 0
+        self.imported_emails = []
+
+    def next_id(self):
+        self.sequence += 1
+        return self.sequence
+
+    def __getitem__(self, key):
+        return self.dataset[key]
+
+
+# Each case: (name, user key, method, builder(ctx) -> (url, data, extra client kwargs))
+
+def _get(route, *args, query=''):
+    return lambda ctx: (reverse(route, args=[a(ctx) for a in args]) + query, None, {})
+
+
+def _pk(key):
+    return lambda ctx: ctx[key].pk
+
+
+def _student_import(ctx):
+    run = ctx.next_id()
+    rows = []
+    for n in range(ctx.import_rows):
+        username = f"{ctx['prefix']}_imported_{run}_{n}"
+        rows.append([username, f'{username}@example.com', 'password', ctx['klass'].name])
+    # The attendance import below marks these students
+    ctx.imported_emails = [row[1] for row in rows]
+    upload = xlsx_upload('students.xlsx', ['Username', 'Email', 'Password', 'Class Name'], rows)
+    return reverse('users:student-upload'), {'file': upload}, {}
+
+
+def _attendance_import(ctx):
+    lecture = ctx['lecture']
+    emails = ctx.imported_emails or [ctx['student'].email]
+    rows = [[email, lecture.title, lecture.uploaded_at.date()] for email in emails]
+    upload = xlsx_upload('attendance.xlsx', ['Student Email', 'Lecture Title', 'Date'], rows)
+    return reverse('attendance-upload'), {'file': upload}, {}
+
+
+def _video_upload(ctx):
+    video = SimpleUploadedFile('lecture.mp4', b'\0' * 64 * 1024, content_type='video/mp4')
+    # Client.put() sends data as is: encode the form here
+    return reverse('lecture-upload-video', args=[ctx['lecture'].pk]), encode_multipart(BOUNDARY, {'video': video}), {
+        'content_type': MULTIPART_CONTENT,
+    }
+
+
+def _change_password(ctx):
+    # To the same password: every run (and every later case) can log in
+    password = ctx['password']
+    return reverse('student-change-password'), {
+        'old_password': password, 'new_password': password, 'confirm_password': password,
+    }, {'content_type': 'application/json'}
+
+
+def _register(ctx):
+    username = f"{ctx['prefix']}_registered_{ctx.next_id()}"
+    return reverse('users:register'), {
+        'username': username, 'email': f'{username}@example.com', 'password': 'S3cure-pass-123',
+    }, {'content_type': 'application/json'}
+
+
+CASES = [
+    # name, user, method, builder
+    ('api-root', 'superuser', 'get', _get('api-root')),
+    ('school-list', 'superuser', 'get', _get('school-list')),
+    ('school-detail', 'superuser', 'get', _get('school-detail', _pk('school'))),
+    ('class-list', 'superuser', 'get', _get('class-list')),
+    ('class-detail', 'superuser', 'get', _get('class-detail', _pk('klass'))),
+    ('subject-list', 'superuser', 'get', _get('subject-list')),
+    ('subject-detail', 'superuser', 'get', lambda ctx: (
+        reverse('subject-detail', args=[ctx['lecture'].subject_id]), None, {})),
+    ('lecture-list', 'superuser', 'get', _get('lecture-list')),
+    ('lecture-detail', 'superuser', 'get', _get('lecture-detail', _pk('lecture'))),
+    ('lecture-upload-video', 'superuser', 'put', _video_upload),
+    ('attendance-list', 'superuser', 'get', _get('attendance-list')),
+    ('attendance-detail', 'superuser', 'get', lambda ctx: (
+        reverse('attendance-detail', args=[ctx['student'].attendance_records.values_list('pk', flat=True)[0]]),
+        None, {})),
+    ('announcement-list', 'superuser', 'get', _get('announcement-list')),
+    ('announcement-detail', 'superuser', 'get', lambda ctx: (
+        reverse('announcement-detail', args=[ctx['klass'].announcements.values_list('pk', flat=True)[0]]),
+        None, {})),
+    ('question-list', 'superuser', 'get', _get('question-list')),
+    ('question-detail', 'superuser', 'get', _get('question-detail', _pk('question'))),
+    ('answer-list', 'superuser', 'get', _get('answer-list')),
+    ('answer-detail', 'superuser', 'get', lambda ctx: (
+        reverse('answer-detail', args=[ctx['question'].answers.values_list('pk', flat=True)[0]]), None, {})),
+    ('answer-accept', 'teacher', 'post', lambda ctx: (
+        reverse('answer-accept', args=[ctx['question'].answers.values_list('pk', flat=True)[0]]), None, {})),
+
+    ('student-dashboard', 'student', 'get', _get('student-dashboard')),
+    ('student-lectures', 'student', 'get', _get('student-lectures')),
+    ('student-lecture-detail', 'student', 'get', _get('student-lecture-detail', _pk('lecture'))),
+    ('mark-lecture-watched', 'student', 'post', lambda ctx: (
+        reverse('mark-lecture-watched', args=[ctx['lecture'].pk]), None, {})),
+    ('student-attendance', 'student', 'get', _get('student-attendance')),
+    ('student-profile', 'student', 'get', _get('student-profile')),
+    ('student-change-password', 'student', 'post', _change_password),
+    ('async-student-dashboard', 'student', 'get', _get('async-student-dashboard')),
+    ('async-student-lectures', 'student', 'get', _get('async-student-lectures')),
+    ('async-student-lecture-detail', 'student', 'get', _get('async-student-lecture-detail', _pk('lecture'))),
+    ('async-mark-lecture-watched', 'student', 'post', lambda ctx: (
+        reverse('async-mark-lecture-watched', args=[ctx['lecture'].pk]), None, {})),
+    ('async-student-attendance', 'student', 'get', _get('async-student-attendance')),
+    ('async-student-profile', 'student', 'get', _get('async-student-profile')),
+
+    ('lecture-question-thread', 'student', 'get', _get('lecture-question-thread', _pk('lecture'))),
+    ('question-answers-page', 'student', 'get', _get('question-answers-page', _pk('question'))),
+
+    ('users:register', None, 'post', _register),
+
+    # Heavy paths: both Excel importers and the report export
+    ('users:student-upload', 'school_admin', 'post', _student_import),
+    ('attendance-upload', 'teacher', 'post', _attendance_import),
+    ('attendance-report', 'teacher', 'get', lambda ctx: (
+        reverse('attendance-report') + f"?class_id={ctx['klass'].pk}", None, {})),
+    ('attendance-export', 'superuser', 'get', _get('attendance-export')),
+]
+
+
+def run_case(ctx, case, repeat, warmup=1):
+    """
+    Time one case `repeat` times (after `warmup` untimed runs). Returns a
+    dict with latency percentiles, the query count of the last run and the
+    status codes seen. Raises UnexpectedStatus if a request answers 4xx/5xx.
+    """
+    name, user_key, method, build = case
+    # Server errors come back as status 500 (reported below) instead of
+    # an exception from the view
+    client = Client(raise_request_exception=False)
+    user = ctx.superuser if user_key == 'superuser' else ctx[user_key] if user_key else None
+
+    def login():
+        if user is not None:
+            # A password change (student-change-password) ends the session
+            user.refresh_from_db(fields=['password'])
+            client.force_login(user)
+
+    def request():
+        url, data, extra = build(ctx)
+        if data is None:
+            response = getattr(client, method)(url, **extra)
+        else:
+            response = getattr(client, method)(url, data, **extra)
+        if response.streaming:
+            # Streamed bodies (the columnar export) are produced while read
+            response.streaming_content = [b''.join(response.streaming_content)]
+        if response.status_code >= 400:
+            raise UnexpectedStatus(
+                f"{name}: {method.upper()} {url} answered {response.status_code} {response.content[:200]!r}"
+            )
+        return response
+
+    for _ in range(warmup):
+        login()
+        request()
+
+    samples = []
+    statuses = set()
+    for _ in range(repeat):
+        login()
+        with CaptureQueriesContext(connections['default']) as queries:
+            started = time.perf_counter()
+            response = request()
+            samples.append((time.perf_counter() - started) * 1000)
+        statuses.add(response.status_code)
+
+    return {
+        'median_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'min_ms': round(min(samples), 3),
+        'queries': len(queries.captured_queries),
+        'status': sorted(statuses),
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """
+    Regressions of `results` against `baseline` (same structure):
+    slower median beyond tolerance (and by more than min_delta_ms, to
+    ignore noise on sub-millisecond endpoints), more queries, other status
+    codes than before, or any server error.
+    """
+    regressions = []
+    for scale, cases in results.items():
+        for name, current in cases.items():
+            previous = baseline.get(scale, {}).get(name)
+            if previous is None:
+                continue
+            slower = current['median_ms'] - previous['median_ms']
+            if slower > min_delta_ms and current['median_ms'] > previous['median_ms'] * (1 + tolerance):
+                regressions.append(
+                    f"{scale}/{name}: median {previous['median_ms']:.2f}ms -> {current['median_ms']:.2f}ms"
+                )
+            if current['queries'] > previous['queries']:
+                regressions.append(
+                    f"{scale}/{name}: queries {previous['queries']} -> {current['queries']}"
+                )
+            if current['status'] != previous.get('status') or any(code >= 500 for code in current['status']):
+                regressions.append(
+                    f"{scale}/{name}: status {previous.get('status')} -> {current['status']}"
+                )
+    return regressions
@@ -0,0 +1,194 @@
+"""
+Bulk attendance upsert for LMS integrations (POST /api/attendance/bulk/).
+
+    bulk_upsert_attendance(user, [
+        {"student": 12, "lecture": 7, "date": "2025-01-31", "present": true},
+        ...
+    ])
+
+Items are checked in one pass without queries, then students and lectures
+are resolved with one query each for the whole request. Valid items are
+upserted on (student, lecture, date), the key the Excel upload uses and a
+unique constraint of Attendance, in chunks of CHUNK_SIZE: one query reads
+the existing rows of a chunk (to report created / updated / unchanged and
+skip unchanged rows), then one INSERT ... ON CONFLICT DO UPDATE writes the
+rest, all in one transaction. A row inserted concurrently after the read
+is updated rather than failing the request (it is reported as created).
+Invalid items never stop the valid ones; every item gets a result.
+"""
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.db import connections, router, transaction
+from django.utils.dateparse import parse_date
+
+from users.models import Role
+from .models import Attendance, Lecture
+
+CHUNK_SIZE = 1000
+
+UPSERT_KEY = ['student', 'lecture', 'date']
+UPSERT_FIELDS = ['present', 'watched_video', 'updated_at']
+
+
+def _parse_int(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+
+def _parse_item(raw):
+    """
+    (values, errors) for one raw item.
+    """
+    if not isinstance(raw, dict):
+        return None, {'non_field_errors': ['Expected an object.']}
+
+    values, errors = {}, {}
+    for field in ('student', 'lecture'):
+        if raw.get(field) is None:
+            errors[field] = ['This field is required.']
+        else:
+            values[field] = _parse_int(raw[field])
+            if values[field] is None:
+                errors[field] = ['A valid integer is required.']
+
+    if raw.get('date') is None:
+        errors['date'] = ['This field is required.']
+    else:
+        try:
+            values['date'] = parse_date(raw['date']) if isinstance(raw['date'], str) else None
+        except ValueError:
+            values['date'] = None
+        if not isinstance(values['date'], datetime.date):
+            errors['date'] = ['Date has wrong format. Use YYYY-MM-DD.']
+
+    for field, required in (('present', True), ('watched_video', False)):
+        if field not in raw:
+            if required:
+                errors[field] = ['This field is required.']
+        elif isinstance(raw[field], bool):
+            values[field] = raw[field]
+        else:
+            errors[field] = ['Must be a valid boolean.']
+
+    return values, errors
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+@transaction.atomic
+def bulk_upsert_attendance(user, items):
+    """
+    Upsert the items for `user` (a teacher or school admin may only write
+    students and lectures of their own school). Returns counts and a result
+    per item: {"index", "status": created|updated|unchanged|error, "id" | "errors"}.
+    """
+    results = [None] * len(items)
+    parsed = {}
+    seen = {}
+
+    def fail(index, errors):
+        results[index] = {'index': index, 'status': 'error', 'errors': errors}
+
+    for index, raw in enumerate(items):
+        values, errors = _parse_item(raw)
+        if errors:
+            fail(index, errors)
+            continue
+        key = (values['student'], values['lecture'], values['date'])
+        if key in seen:
+            fail(index, {'non_field_errors': [f'Duplicate of item {seen[key]}.']})
+            continue
+        seen[key] = index
+        parsed[index] = values
+
+    # One query per referenced table
+    students = {
+        pk: (class_id, school_id)
+        for pk, class_id, school_id in get_user_model().objects.filter(
+            pk__in={v['student'] for v in parsed.values()}, role=Role.STUDENT
+        ).values_list('id', 'assigned_class_id', 'school_id')
+    } if parsed else {}
+    lectures = dict(
+        Lecture.objects.filter(pk__in={v['lecture'] for v in parsed.values()}).values_list('id', 'school_id')
+    ) if parsed else {}
+    all_schools = user.is_superuser or user.role == Role.SUPER_ADMIN
+
+    valid = []
+    for index, values in parsed.items():
+        errors = {}
+        tenant = students.get(values['student'])
+        if tenant is None:
+            errors['student'] = [f"Student {values['student']} not found."]
+        elif not all_schools and tenant[1] != user.school_id:
+            errors['student'] = [f"Student {values['student']} is not in your school."]
+        if values['lecture'] not in lectures:
+            errors['lecture'] = [f"Lecture {values['lecture']} not found."]
+        elif not all_schools and lectures[values['lecture']] not in (None, user.school_id):
+            errors['lecture'] = [f"Lecture {values['lecture']} is not in your school."]
+        if errors:
+            fail(index, errors)
+        else:
+            valid.append(index)
+
+    features = connections[router.db_for_write(Attendance)].features
+    # MySQL upserts on any unique key and takes no conflict target
+    unique_fields = UPSERT_KEY if features.supports_update_conflicts_with_target else None
+    for chunk in _chunks(valid, CHUNK_SIZE):
+        chunk_values = [parsed[index] for index in chunk]
+        existing = {
+            (record.student_id, record.lecture_id, record.date): record
+            for record in Attendance.objects.filter(
+                student_id__in={v['student'] for v in chunk_values},
+                lecture_id__in={v['lecture'] for v in chunk_values},
+                date__in={v['date'] for v in chunk_values},
+            ).only('id', 'student_id', 'lecture_id', 'date', 'present', 'watched_video')
+        }
+
+        to_write = []
+        for index, values in zip(chunk, chunk_values):
+            record = existing.get((values['student'], values['lecture'], values['date']))
+            if record is not None:
+                watched = values.get('watched_video', record.watched_video)
+                if record.present == values['present'] and record.watched_video == watched:
+                    results[index] = {'index': index, 'status': 'unchanged', 'id': record.id}
+                    continue
+                results[index] = {'index': index, 'status': 'updated', 'id': record.id}
+            else:
+                watched = values.get('watched_video', False)
+            class_id, school_id = students[values['student']]
+            to_write.append((index, Attendance(
+                student_id=values['student'], lecture_id=values['lecture'], date=values['date'],
+                present=values['present'], watched_video=watched,
+                student_class_id=class_id, school_id=school_id,
+            )))
+
+        if to_write:
+            # updated_at is set by auto_now; tenant keys of existing rows are kept
+            Attendance.objects.bulk_create(
+                [record for _, record in to_write],
+                update_conflicts=True, unique_fields=unique_fields, update_fields=UPSERT_FIELDS,
+            )
+            for index, record in to_write:
+                if results[index] is None:
+                    # MySQL does not return ids from bulk inserts; "id" is null there
+                    results[index] = {'index': index, 'status': 'created', 'id': record.pk}
+
+    counts = {'created': 0, 'updated': 0, 'unchanged': 0, 'error': 0}
+    for result in results:
+        counts[result['status']] += 1
+    return {
+        'created': counts['created'],
+        'updated': counts['updated'],
+        'unchanged': counts['unchanged'],
+        'errors': counts['error'],
+        'results': results,
+    }
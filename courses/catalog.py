@@ -0,0 +1,236 @@
+"""
+Student lecture list items, and per-class pre-rendered catalogs of them.
+
+Every student of a class gets the same lecture list apart from is_watched,
+so StudentLecturesView serves it from a LectureCatalogSnapshot: one row per
+class holding each lecture as ready-rendered JSON fragments, newest first,
+plus the available_subjects list. A request reads that row and the
+student's watched set, and joins the fragments; the per-request database
+work no longer grows with the class's lectures, subjects or students.
+
+Entries (LectureCatalogSnapshot.lectures):
+
+    {"id": 7, "subject_id": 2, "sort": [<uploaded_at µs>, 7],
+     "video_file": "lectures/videos/a.mp4" or "",
+     "video_url": '"https://youtu.be/..."' (rendered) or None when video_file is set,
+     "parts": ["...", "...", ""]}
+
+"parts" are the rendered fields between the ones filled in per request
+(DYNAMIC_FIELDS): the video URL (S3 URLs are signed, so they expire) and
+is_watched. The output is byte-identical to rendering build_lecture_list().
+
+A Lecture save or delete schedules the update of its class(es) for when
+the transaction commits (schedule_catalog_update(), from signals.py). The
+lectures written in one transaction are collected, so a bulk PATCH of N
+lectures rewrites each class's catalog once. If that update fails, the
+catalogs are marked for rebuilding instead of staying stale. A Subject
+change marks every catalog for rebuilding on next use. Writes that bypass
+signals (QuerySet.update(), bulk_create() outside the bulk API) must call
+rebuild_catalog() or invalidate_catalogs().
+
+built_at changes with every write of a catalog (and is emptied to have it
+rebuilt), and is part of the lecture list's ETag: a request served between
+a lecture write's commit and its catalog update gets the old ETag with the
+old catalog, not the new ETag with the old catalog.
+"""
+from django.db import router, transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .models import Lecture, LectureCatalogSnapshot, Subject
+from .transaction_state import transaction_state
+
+
+def _has_video(lecture):
+    return bool(lecture.video_file or lecture.video_url)
+
+
+# Items of the student lecture list: key -> (Lecture columns it reads, value).
+# ?fields= picks keys; only their columns are loaded.
+LECTURE_LIST_FIELDS = {
+    "id": (("id",), lambda lecture, watched: lecture.id),
+    "title": (("title",), lambda lecture, watched: lecture.title),
+    "description": (("description",), lambda lecture, watched: lecture.description),
+    "subject": (("subject__name",), lambda lecture, watched: {
+        "id": lecture.subject.id if lecture.subject else None,
+        "name": lecture.subject.name if lecture.subject else "No Subject"
+    }),
+    "topic": (("topic",), lambda lecture, watched: lecture.topic),
+    "duration_minutes": (("duration_minutes",), lambda lecture, watched: lecture.duration_minutes),
+    "has_video": (("video_file", "video_url"), lambda lecture, watched: _has_video(lecture)),
+    "video_url": (
+        ("video_file", "video_url"),
+        lambda lecture, watched: lecture.get_video_url() if _has_video(lecture) else None,
+    ),
+    "uploaded_at": (("uploaded_at",), lambda lecture, watched: lecture.uploaded_at),
+    "is_watched": ((), lambda lecture, watched: lecture.id in watched),
+}
+
+# Filled in per request, in LECTURE_LIST_FIELDS order
+DYNAMIC_FIELDS = ('video_url', 'is_watched')
+
+_renderer = JSONRenderer()
+
+
+def _render(value):
+    # JSONRenderer renders a bare None as an empty body
+    return "null" if value is None else _renderer.render(value).decode()
+
+
+def class_subjects(class_id):
+    """
+    The subjects of a class's lectures (the lecture list's filter dropdown).
+    """
+    return Subject.objects.filter(lectures__class_assigned_id=class_id).distinct().order_by('id')
+
+
+def _entry(lecture):
+    parts, run = [], {}
+    for key, (columns, get) in LECTURE_LIST_FIELDS.items():
+        if key in DYNAMIC_FIELDS:
+            # The rendered run without its braces
+            parts.append(_render(run)[1:-1] if run else "")
+            run = {}
+        else:
+            run[key] = get(lecture, ())
+    parts.append(_render(run)[1:-1] if run else "")
+    # An external video URL doesn't expire: render it now
+    video_url = None if lecture.video_file else _render(lecture.video_url or None)
+    return {
+        "id": lecture.id,
+        "subject_id": lecture.subject_id,
+        "sort": [int(lecture.uploaded_at.timestamp() * 1_000_000), lecture.id],
+        "video_file": lecture.video_file.name if lecture.video_file else "",
+        "video_url": video_url,
+        "parts": parts,
+    }
+
+
+def _sorted(entries):
+    return sorted(entries, key=lambda entry: entry["sort"], reverse=True)
+
+
+def _class_lectures(class_id):
+    return Lecture.objects.filter(class_assigned_id=class_id).select_related('subject')
+
+
+def rebuild_catalog(class_id):
+    """
+    Build a class's catalog from its lectures, and return it.
+    """
+    # The row exists (committed) before the lectures are read: a lecture
+    # write committing meanwhile then finds it and waits for the lock below
+    LectureCatalogSnapshot.objects.get_or_create(student_class_id=class_id)
+    with transaction.atomic():
+        catalog = LectureCatalogSnapshot.objects.select_for_update().get(pk=class_id)
+        catalog.lectures = _sorted(_entry(lecture) for lecture in _class_lectures(class_id))
+        catalog.subjects = [{"id": s.id, "name": s.name} for s in class_subjects(class_id)]
+        catalog.built_at = timezone.now()
+        catalog.save()
+    return catalog
+
+
+def lecture_catalog(class_id):
+    """
+    The class's catalog, built now if it isn't yet.
+    """
+    catalog = LectureCatalogSnapshot.objects.filter(pk=class_id, built_at__isnull=False).first()
+    return catalog or rebuild_catalog(class_id)
+
+
+def update_catalog_entries(changes):
+    """
+    Re-render the given lectures in the built catalogs of their classes:
+    changes maps class ids to lecture ids (a moved lecture is listed under
+    its current and its previous class). Run after the writes commit.
+    """
+    for class_id, lecture_ids in sorted(changes.items()):
+        with transaction.atomic():
+            catalog = LectureCatalogSnapshot.objects.select_for_update().filter(
+                pk=class_id, built_at__isnull=False
+            ).first()
+            if catalog is None:
+                # Not built: the first request builds it from committed rows
+                continue
+            entries = [entry for entry in catalog.lectures if entry["id"] not in lecture_ids]
+            entries.extend(_entry(lecture) for lecture in _class_lectures(class_id).filter(pk__in=lecture_ids))
+            catalog.lectures = _sorted(entries)
+            catalog.subjects = [{"id": s.id, "name": s.name} for s in class_subjects(class_id)]
+            catalog.built_at = timezone.now()
+            catalog.save(update_fields=['lectures', 'subjects', 'built_at'])
+
+
+class _PendingUpdates:
+    """
+    The lectures written in a transaction; its run() is the transaction's
+    on_commit() callback.
+    """
+    def __init__(self):
+        self.changes = {}  # class id -> lecture ids
+        self.done = False  # see courses/transaction_state.py
+
+    def add(self, lecture_id, class_ids):
+        for class_id in class_ids:
+            self.changes.setdefault(class_id, set()).add(lecture_id)
+
+    def run(self):
+        self.done = True
+        try:
+            update_catalog_entries(self.changes)
+        except Exception:
+            # Rebuilt on next use rather than left stale; on_commit(robust=True) logs the error
+            LectureCatalogSnapshot.objects.filter(pk__in=self.changes).update(built_at=None)
+            raise
+
+
+def schedule_catalog_update(lecture_id, class_ids):
+    """
+    Update the catalogs of class_ids for a lecture written (or deleted) in
+    the current transaction, once it commits, together with the other
+    lectures of the transaction.
+    """
+    using = router.db_for_write(Lecture)
+    pending, created = transaction_state('lecture_catalog', _PendingUpdates, using=using)
+    pending.add(lecture_id, class_ids)
+    if created:
+        # Outside a transaction this runs right away
+        transaction.on_commit(pending.run, using=using, robust=True)
+
+
+def invalidate_catalogs():
+    """
+    Have every catalog rebuilt on next use (e.g. after a subject rename).
+    """
+    LectureCatalogSnapshot.objects.update(built_at=None)
+
+
+def render_catalog(catalog, student_class, watched_lecture_ids, subject_id=None):
+    """
+    JSON bytes of build_lecture_list() for all fields, from the catalog.
+    """
+    storage = Lecture._meta.get_field('video_file').storage
+    items, watched_count = [], 0
+    for entry in catalog.lectures:
+        if subject_id is not None and entry["subject_id"] != subject_id:
+            continue
+        parts = entry["parts"]
+        video_url = _render(storage.url(entry["video_file"])) if entry["video_file"] else entry["video_url"]
+        watched = entry["id"] in watched_lecture_ids
+        watched_count += watched
+        values = (video_url, "true" if watched else "false")
+        pieces = []
+        for part, key, value in zip(parts, DYNAMIC_FIELDS, values):
+            if part:
+                pieces.append(part)
+            pieces.append(f'"{key}":{value}')
+        if parts[-1]:
+            pieces.append(parts[-1])
+        items.append("{" + ",".join(pieces) + "}")
+
+    head = _render({
+        "class_name": student_class.name,
+        "total_lectures": len(items),
+        "watched_count": watched_count,
+        "available_subjects": catalog.subjects,
+    })
+    return (head[:-1] + ',"lectures":[' + ",".join(items) + "]}").encode()
@@ -0,0 +1,124 @@
+"""
+Conditional GET (ETag) helpers for read-heavy endpoints.
+
+A view describes the data it renders as a few querysets. All of them are
+reduced to COUNT(*) and MAX(<timestamp>) in ONE query (scalar subqueries
+hung off the requesting user's row), hashed into a weak ETag, and compared
+with the client's If-None-Match header before any of the heavy work runs.
+Unchanged resources answer 304 with an empty body.
+
+There is deliberately no Last-Modified: MAX(<timestamp>) stays put or
+moves backwards when rows are deleted, so If-Modified-Since would answer
+304 with stale data. The counts in the ETag catch deletions.
+
+Usage in an APIView:
+
+    validators = compute_validators(request, {
+        "lectures": (Lecture.objects.filter(class_assigned=c), "updated_at"),
+    })
+    cached = not_modified(request, validators)
+    if cached:
+        return cached
+    ...
+    return set_validators(Response(data), validators)
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import DateTimeField, F, Func, IntegerField, Subquery
+from django.utils.cache import get_conditional_response
+
+
+def _count(queryset):
+    # COUNT as a plain Func (not an Aggregate) so Django adds no GROUP BY.
+    counted = queryset.order_by().annotate(
+        _n=Func(F('pk'), function='COUNT', output_field=IntegerField())
+    ).values('_n')
+    return Subquery(counted[:1], output_field=IntegerField())
+
+
+def _latest(queryset, field):
+    latest = queryset.order_by().annotate(
+        _m=Func(F(field), function='MAX', output_field=DateTimeField())
+    ).values('_m')
+    return Subquery(latest[:1], output_field=DateTimeField())
+
+
+def signed_url_epoch():
+    """
+    Time bucket that changes before S3 signed URLs (querystring_auth) expire,
+    so a 304 never keeps a client on an expired video URL.
+    """
+    expire = getattr(settings, 'AWS_QUERYSTRING_EXPIRE', 3600)
+    return int(time.time() // max(expire // 2, 1))
+
+
+class Validators(str):
+    """
+    The weak ETag of a resource, plus the source values it was hashed from.
+    """
+    def __new__(cls, etag, row):
+        validators = super().__new__(cls, etag)
+        validators.row = row
+        return validators
+
+    def digest(self, *names):
+        """
+        Hash of just the named sources' count and latest timestamp, e.g. to
+        key work shared by users who see the same data (singleflight.py).
+        """
+        parts = [f"{key}={self.row.get(key)!r}" for name in names for key in (f'{name}_count', f'{name}_latest')]
+        return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def compute_validators(request, sources, user_fields=(), salt=''):
+    """
+    Compute the Validators (ETag) of the resource a view is about to build.
+
+    sources:     {name: (queryset, timestamp_field or None)}
+    user_fields: fields of the requesting user (may span relations, e.g.
+                 'assigned_class__name') that also appear in the response.
+    salt:        anything else the representation depends on.
+
+    Runs exactly one query.
+    """
+    annotations = {}
+    for name, (queryset, field) in sources.items():
+        annotations[f'{name}_count'] = _count(queryset)
+        if field:
+            annotations[f'{name}_latest'] = _latest(queryset, field)
+
+    User = get_user_model()
+    row = User.objects.filter(pk=request.user.pk).values(*user_fields, **annotations).first() or {}
+
+    parts = [
+        request.get_full_path(),
+        getattr(request, 'accepted_media_type', '') or '',
+        str(salt),
+    ]
+    parts += [f"{key}={row[key]!r}" for key in sorted(row)]
+    digest = hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+    return Validators(f'W/"{digest}"', row)
+
+
+def not_modified(request, validators):
+    """
+    Return a 304 (or 412) response if the client's copy is current, else None.
+    """
+    response = get_conditional_response(request, etag=validators)
+    if response is None:
+        return None
+    return set_validators(response, validators)
+
+
+def set_validators(response, validators):
+    """
+    Attach the ETag to a response. Clients must revalidate on every use
+    (the data is per-user), which is what makes 304s possible.
+    """
+    response['ETag'] = str(validators)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,214 @@
+"""
+Announcement event feed (pub/sub behind the SSE stream).
+
+Every saved or deleted Announcement is published on a per-class channel.
+Open SSE connections subscribe to their class channel and wait on an
+asyncio.Queue, so an idle connection costs one coroutine, not a thread.
+
+Backends (settings.ANNOUNCEMENT_EVENTS_BACKEND):
+- 'local':    in-process only. Fine for a single ASGI worker.
+- 'database': events are written to the AnnouncementEvent table and one
+              poller per process fans them out to its local subscribers.
+              Use this when running several workers/processes.
+"""
+import asyncio
+import contextlib
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+
+def get_setting(name, default):
+    return getattr(settings, name, default)
+
+
+def announcement_payload(announcement, event_type):
+    """
+    Build the JSON-friendly event body for an Announcement.
+    """
+    return {
+        "event": event_type,
+        "id": announcement.id,
+        "title": announcement.title,
+        "content": announcement.content,
+        "priority": announcement.priority,
+        "posted_by_id": announcement.posted_by_id,
+        "target_class_id": announcement.target_class_id,
+        "created_at": announcement.created_at.isoformat() if announcement.created_at else None,
+    }
+
+
+class LocalBroker:
+    """
+    In-process pub/sub keyed by channel (the class id).
+
+    publish() may be called from any thread (e.g. a sync view running in a
+    worker thread); delivery is handed to each subscriber's event loop.
+    """
+    queue_size = 100
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, channel):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        entry = (loop, queue)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(entry)
+        try:
+            yield queue
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(entry)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._offer, queue, event)
+
+    def subscriber_count(self, channel=None):
+        with self._lock:
+            if channel is not None:
+                return len(self._subscribers.get(channel, ()))
+            return sum(len(s) for s in self._subscribers.values())
+
+    @staticmethod
+    def _offer(queue, event):
+        # A client that stopped reading should not grow memory without bound;
+        # it simply misses events and refetches the list on reconnect.
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+
+class LocalBackend:
+    """
+    Publishes straight to the in-process broker.
+    """
+    def __init__(self, broker):
+        self.broker = broker
+
+    def publish(self, channel, event):
+        self.broker.publish(channel, event)
+
+    def subscribe(self, channel):
+        return self.broker.subscribe(channel)
+
+
+class DatabaseBackend:
+    """
+    Cross-process fan-out through the AnnouncementEvent table.
+
+    Writers insert one row per event. Each process runs a single poller task
+    (started lazily by the first subscriber) that reads new rows and hands
+    them to the local broker, so the DB cost is one small query per poll
+    interval per process, independent of the number of open connections.
+    """
+    def __init__(self, broker):
+        self.broker = broker
+        self._poller = None
+        self._poller_loop = None
+        self._lock = threading.Lock()
+
+    def publish(self, channel, event):
+        from .models import AnnouncementEvent
+
+        AnnouncementEvent.objects.create(channel=channel, payload=event)
+
+        # Keep the table small; this only runs on announcement writes.
+        retention = get_setting('ANNOUNCEMENT_EVENTS_RETENTION_SECONDS', 3600)
+        cutoff = timezone.now() - timedelta(seconds=retention)
+        AnnouncementEvent.objects.filter(created_at__lt=cutoff).delete()
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, channel):
+        self._ensure_poller()
+        async with self.broker.subscribe(channel) as queue:
+            yield queue
+
+    def _ensure_poller(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._poller is not None and not self._poller.done() and self._poller_loop is loop:
+                return
+            self._poller_loop = loop
+            self._poller = loop.create_task(self._poll())
+
+    async def _poll(self):
+        """
+        Hand the new rows to the local broker every poll interval. Ids are
+        not committed in order (an insert can commit after one with a
+        higher id), so each poll reads the rows created in the last
+        ANNOUNCEMENT_EVENTS_POLL_OVERLAP_SECONDS before the previous poll
+        as well, and skips the ones already handed on.
+        """
+        from .models import AnnouncementEvent
+
+        interval = get_setting('ANNOUNCEMENT_EVENTS_POLL_INTERVAL', 1.0)
+        overlap = timedelta(seconds=get_setting('ANNOUNCEMENT_EVENTS_POLL_OVERLAP_SECONDS', 5))
+        batch_size = 500
+        since = timezone.now() - overlap
+        # Events from before the first subscriber are not replayed
+        recent = AnnouncementEvent.objects.filter(created_at__gte=since).values_list('id', 'created_at')
+        seen = {pk: created_at async for pk, created_at in recent}
+
+        while self.broker.subscriber_count():
+            await asyncio.sleep(interval)
+            polled_at = timezone.now()
+            rows = AnnouncementEvent.objects.filter(created_at__gte=since).exclude(id__in=list(seen)).order_by('id')
+            count = 0
+            async for pk, channel, payload, created_at in rows.values_list(
+                'id', 'channel', 'payload', 'created_at'
+            )[:batch_size]:
+                seen[pk] = created_at
+                count += 1
+                self.broker.publish(channel, payload)
+            if count < batch_size:
+                # Otherwise the rest of the window is read next time
+                since = polled_at - overlap
+                seen = {pk: created_at for pk, created_at in seen.items() if created_at >= since}
+
+
+BACKENDS = {
+    'local': LocalBackend,
+    'database': DatabaseBackend,
+}
+
+broker = LocalBroker()
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            name = get_setting('ANNOUNCEMENT_EVENTS_BACKEND', 'local')
+            try:
+                backend_class = BACKENDS[name]
+            except KeyError:
+                raise ValueError(
+                    f"Unknown ANNOUNCEMENT_EVENTS_BACKEND '{name}'. Choose from: {', '.join(BACKENDS)}."
+                )
+            _backend = backend_class(broker)
+        return _backend
+
+
+def publish_announcement(announcement, event_type):
+    """
+    Publish an Announcement change on its class channel.
+    """
+    if announcement.target_class_id is None:
+        return
+    get_backend().publish(announcement.target_class_id, announcement_payload(announcement, event_type))
@@ -0,0 +1,413 @@
+"""
+Columnar attendance export for analytics consumers.
+
+    watermark, chunks = export_attendance(Attendance.objects.all(), since=previous_watermark)
+    for data in chunks:
+        out.write(data)
+
+Rows are read in (updated_at, id) order with keyset-paginated values_list
+queries of `chunk_size` rows, so memory stays bounded on any table size, and
+each page is encoded and yielded before the next one is fetched.
+
+Incremental exports: every export covers rows with updated_at before a
+cut-off a little in the past (EXPORT_WATERMARK_LAG_SECONDS, so writes still
+in flight are not skipped) and returns that cut-off as a watermark token.
+Passing it back as `since` exports only rows created or changed after it.
+Deleted rows are not reported.
+
+Formats:
+
+'scol' (always available): the file starts with MAGIC, followed by frames.
+Each frame is a little-endian u32 length, a JSON header, and the buffers
+the header lists (each compressed on its own with 'zstd', if the zstandard
+package is installed, else 'zlib').
+
+    {"kind": "schema", "columns": [{"name", "type"}], "since", "watermark"}
+    {"kind": "chunk", "rows": n, "columns": [{"name", "encoding", "buffers": [
+        {"kind": "validity" | "dictionary" | "data", "dtype", "codec", "size"}]}]}
+    {"kind": "end", "rows": total, "watermark"}
+
+Integer and date columns are dictionary-encoded when a chunk has few
+distinct values (the dictionary holds them, the data buffer the smallest
+unsigned index type that fits), else stored plain. Booleans and validity
+are LSB-first bitmaps. Dates are int32 days since 1970-01-01 and timestamps
+are int64 microseconds since the epoch (UTC). read_scol() decodes a file.
+
+'arrow' (needs pyarrow): an Arrow IPC stream with zstd-compressed,
+dictionary-encoded record batches, readable with pyarrow.ipc.open_stream,
+pandas, polars or DuckDB.
+"""
+import datetime
+import io
+import json
+import struct
+import sys
+import zlib
+from array import array
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+try:
+    import zstandard
+except ImportError:  # optional, zlib is used instead
+    zstandard = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # optional, only needed for the 'arrow' format
+    pyarrow = None
+
+MAGIC = b'SCOL\x01\n\x00\x00'
+FORMATS = ('scol', 'arrow')
+CONTENT_TYPES = {
+    'scol': 'application/vnd.scholiv.columnar',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+EXTENSIONS = {'scol': 'scol', 'arrow': 'arrows'}
+DEFAULT_CHUNK_SIZE = 10000
+
+# (exported name, type, values_list path)
+COLUMNS = [
+    ('id', 'int64', 'id'),
+    ('student_id', 'int64', 'student_id'),
+    ('class_id', 'int64', 'student_class_id'),
+    ('school_id', 'int64', 'school_id'),
+    ('lecture_id', 'int64', 'lecture_id'),
+    ('subject_id', 'int64', 'lecture__subject_id'),
+    ('date', 'date32', 'date'),
+    ('present', 'bool', 'present'),
+    ('watched_video', 'bool', 'watched_video'),
+    ('updated_at', 'timestamp_us', 'updated_at'),
+]
+UPDATED_AT = [name for name, _, _ in COLUMNS].index('updated_at')
+
+EPOCH_DATE = datetime.date(1970, 1, 1)
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class ExportError(ValueError):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Watermarks: "<microseconds since epoch>-<id>"
+# ---------------------------------------------------------------------------
+
+def _micros(moment):
+    delta = moment - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def _from_micros(micros):
+    return EPOCH + datetime.timedelta(microseconds=micros)
+
+
+def format_watermark(moment, last_id=0):
+    return f'{_micros(moment)}-{last_id}'
+
+
+def parse_watermark(token):
+    """
+    (updated_at, id) from a watermark token, or None for an empty token.
+    """
+    if not token:
+        return None
+    try:
+        micros, last_id = token.split('-')
+        return _from_micros(int(micros)), int(last_id)
+    except (ValueError, OverflowError):
+        raise ExportError(f"Invalid watermark '{token}'.")
+
+
+def cutoff():
+    lag = getattr(settings, 'EXPORT_WATERMARK_LAG_SECONDS', 60)
+    return timezone.now() - datetime.timedelta(seconds=lag)
+
+
+# ---------------------------------------------------------------------------
+# Reading rows
+# ---------------------------------------------------------------------------
+
+def _after(position):
+    moment, last_id = position
+    return Q(updated_at__gt=moment) | Q(updated_at=moment, id__gt=last_id)
+
+
+def iter_row_chunks(queryset, since, until, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Lists of value tuples (COLUMNS order), since < (updated_at, id),
+    updated_at < until, one keyset-paginated query per chunk.
+    """
+    queryset = queryset.filter(updated_at__lt=until).order_by('updated_at', 'id').values_list(
+        *(path for _, _, path in COLUMNS)
+    )
+    position = since
+    while True:
+        page = queryset.filter(_after(position)) if position else queryset
+        rows = list(page[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        position = (rows[-1][UPDATED_AT], rows[-1][0])
+
+
+# ---------------------------------------------------------------------------
+# 'scol' encoding
+# ---------------------------------------------------------------------------
+
+def _codec():
+    return 'zstd' if zstandard is not None else 'zlib'
+
+
+def _compress(data, codec):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return zlib.compress(data, 6)
+
+
+def _decompress(data, codec):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ExportError("This file is zstd-compressed; install the zstandard package to read it.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    raise ExportError(f"Unknown codec '{codec}'.")
+
+
+def _pack_bits(flags):
+    packed = bytearray((len(flags) + 7) // 8)
+    for i, flag in enumerate(flags):
+        if flag:
+            packed[i >> 3] |= 1 << (i & 7)
+    return bytes(packed)
+
+
+def _unpack_bits(packed, count):
+    return [bool(packed[i >> 3] & (1 << (i & 7))) for i in range(count)]
+
+
+def _index_dtype(size):
+    return 'B' if size <= 0xFF else 'H' if size <= 0xFFFF else 'I'
+
+
+def _to_bytes(typecode, values):
+    data = array(typecode, values)
+    if data.itemsize > 1 and sys.byteorder == 'big':
+        data.byteswap()  # always little-endian on disk
+    return data.tobytes()
+
+
+def _from_bytes(typecode, raw):
+    data = array(typecode)
+    data.frombytes(raw)
+    if data.itemsize > 1 and sys.byteorder == 'big':
+        data.byteswap()
+    return data.tolist()
+
+
+# array typecodes with fixed widths
+DTYPES = {'int64': 'q', 'int32': 'i', 'uint8': 'B', 'uint16': 'H', 'uint32': 'I'}
+DTYPE_NAMES = {code: name for name, code in DTYPES.items()}
+
+
+def _encode_column(values, column_type, codec):
+    """
+    (encoding, [(buffer header, compressed bytes)]) for one column of a chunk.
+    """
+    buffers = []
+
+    def add(kind, dtype, raw):
+        data = _compress(raw, codec)
+        buffers.append(({'kind': kind, 'dtype': dtype, 'codec': codec, 'size': len(data)}, data))
+
+    if column_type == 'bool':
+        add('data', 'bitmap', _pack_bits(values))
+        return 'plain', buffers
+
+    if any(value is None for value in values):
+        add('validity', 'bitmap', _pack_bits([value is not None for value in values]))
+
+    if column_type == 'date32':
+        numbers = [(value - EPOCH_DATE).days if value is not None else 0 for value in values]
+        dtype = 'int32'
+    elif column_type == 'timestamp_us':
+        numbers = [_micros(value) if value is not None else 0 for value in values]
+        dtype = 'int64'
+    else:
+        numbers = [value if value is not None else 0 for value in values]
+        dtype = 'int64'
+
+    distinct = sorted(set(numbers))
+    if column_type != 'timestamp_us' and len(distinct) * 4 <= len(numbers):
+        positions = {value: i for i, value in enumerate(distinct)}
+        index_code = _index_dtype(len(distinct))
+        add('dictionary', dtype, _to_bytes(DTYPES[dtype], distinct))
+        add('data', DTYPE_NAMES[index_code], _to_bytes(index_code, [positions[n] for n in numbers]))
+        return 'dictionary', buffers
+
+    add('data', dtype, _to_bytes(DTYPES[dtype], numbers))
+    return 'plain', buffers
+
+
+def _frame(header, buffers=()):
+    payload = json.dumps(header, separators=(',', ':')).encode()
+    return b''.join([struct.pack('<I', len(payload)), payload, *buffers])
+
+
+def _scol_chunk(rows, codec):
+    columns = []
+    buffers = []
+    for (name, column_type, _), values in zip(COLUMNS, zip(*rows)):
+        encoding, column_buffers = _encode_column(list(values), column_type, codec)
+        columns.append({'name': name, 'encoding': encoding, 'buffers': [meta for meta, _ in column_buffers]})
+        buffers.extend(data for _, data in column_buffers)
+    return _frame({'kind': 'chunk', 'rows': len(rows), 'columns': columns}, buffers)
+
+
+def _write_scol(chunks, since_token, watermark):
+    codec = _codec()
+    yield MAGIC + _frame({
+        'kind': 'schema',
+        'columns': [{'name': name, 'type': column_type} for name, column_type, _ in COLUMNS],
+        'since': since_token,
+        'watermark': watermark,
+    })
+    total = 0
+    for rows in chunks:
+        total += len(rows)
+        yield _scol_chunk(rows, codec)
+    yield _frame({'kind': 'end', 'rows': total, 'watermark': watermark})
+
+
+def _read_exactly(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ExportError("Truncated export file.")
+    return data
+
+
+def _decode_column(meta, column_type, stream, rows):
+    raw = {}
+    for buffer in meta['buffers']:
+        raw[buffer['kind']] = (buffer, _decompress(_read_exactly(stream, buffer['size']), buffer['codec']))
+
+    buffer, data = raw['data']
+    if column_type == 'bool':
+        return _unpack_bits(data, rows)
+    if buffer['dtype'] == 'bitmap':
+        raise ExportError(f"Unexpected bitmap data for column '{meta['name']}'.")
+    values = _from_bytes(DTYPES[buffer['dtype']], data)
+    if meta['encoding'] == 'dictionary':
+        dictionary_meta, dictionary = raw['dictionary']
+        dictionary = _from_bytes(DTYPES[dictionary_meta['dtype']], dictionary)
+        values = [dictionary[i] for i in values]
+
+    if column_type == 'date32':
+        values = [EPOCH_DATE + datetime.timedelta(days=v) for v in values]
+    elif column_type == 'timestamp_us':
+        values = [_from_micros(v) for v in values]
+    if 'validity' in raw:
+        valid = _unpack_bits(raw['validity'][1], rows)
+        values = [value if ok else None for value, ok in zip(values, valid)]
+    return values
+
+
+def read_scol(stream):
+    """
+    Decode a 'scol' export from a binary file object. Returns
+    (schema header, end header, iterator of {column: [values]} per chunk);
+    consume the iterator before using the end header.
+    """
+    if _read_exactly(stream, len(MAGIC)) != MAGIC:
+        raise ExportError("Not a scol export file.")
+
+    def frame():
+        (size,) = struct.unpack('<I', _read_exactly(stream, 4))
+        return json.loads(_read_exactly(stream, size))
+
+    schema = frame()
+    types = {column['name']: column['type'] for column in schema['columns']}
+    end = {}
+
+    def chunks():
+        while True:
+            header = frame()
+            if header['kind'] == 'end':
+                end.update(header)
+                return
+            yield {
+                column['name']: _decode_column(column, types[column['name']], stream, header['rows'])
+                for column in header['columns']
+            }
+
+    return schema, end, chunks()
+
+
+# ---------------------------------------------------------------------------
+# 'arrow' encoding
+# ---------------------------------------------------------------------------
+
+def _arrow_schema(since_token, watermark):
+    dictionary = pyarrow.dictionary(pyarrow.int32(), pyarrow.int64())
+    types = {
+        'id': pyarrow.int64(),
+        'student_id': pyarrow.int64(),
+        'class_id': dictionary,
+        'school_id': dictionary,
+        'lecture_id': dictionary,
+        'subject_id': dictionary,
+        'date': pyarrow.date32(),
+        'present': pyarrow.bool_(),
+        'watched_video': pyarrow.bool_(),
+        'updated_at': pyarrow.timestamp('us', tz='UTC'),
+    }
+    return pyarrow.schema(
+        [pyarrow.field(name, types[name]) for name, _, _ in COLUMNS],
+        metadata={'since': since_token or '', 'watermark': watermark},
+    )
+
+
+def _write_arrow(chunks, since_token, watermark):
+    schema = _arrow_schema(since_token, watermark)
+    sink = io.BytesIO()
+    options = pyarrow.ipc.IpcWriteOptions(compression='zstd')
+    # Each batch carries its own dictionaries (replacements are valid in the stream format)
+    with pyarrow.ipc.new_stream(sink, schema, options=options) as writer:
+        for rows in chunks:
+            arrays = []
+            for field, values in zip(schema, zip(*rows)):
+                if pyarrow.types.is_dictionary(field.type):
+                    arrays.append(pyarrow.array(values, type=pyarrow.int64()).dictionary_encode())
+                else:
+                    arrays.append(pyarrow.array(values, type=field.type))
+            writer.write_batch(pyarrow.record_batch(arrays, schema=schema))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
+
+
+# ---------------------------------------------------------------------------
+
+def export_attendance(queryset, since=None, file_format='scol', chunk_size=DEFAULT_CHUNK_SIZE, until=None):
+    """
+    Returns (watermark token, iterator of bytes). `since` is a watermark
+    token from an earlier export (or None for everything).
+    """
+    if file_format not in FORMATS:
+        raise ExportError(f"Unknown format '{file_format}'. Choose from: {', '.join(FORMATS)}.")
+    if file_format == 'arrow' and pyarrow is None:
+        raise ExportError("The 'arrow' format needs the pyarrow package.")
+
+    position = parse_watermark(since)
+    until = until or cutoff()
+    if position and position[0] >= until:
+        until = position[0]  # nothing new yet; keep the client's watermark
+    watermark = format_watermark(until)
+    chunks = iter_row_chunks(queryset, position, until, chunk_size)
+    writer = _write_arrow if file_format == 'arrow' else _write_scol
+    return watermark, writer(chunks, since or None, watermark)
@@ -0,0 +1,232 @@
+"""
+values()-based read path for the hot list endpoints.
+
+    reader = FastReader.for_serializer(LectureSerializer)
+    data = reader.serialize(queryset, context={'request': request})
+
+ModelSerializer(many=True) builds a model instance per row and runs every
+field's get_attribute() / to_representation() on it. A FastReader compiles
+the serializer's readable fields once into (key, column, converter)
+accessors, fetches just those columns with values_list() (related names
+through joins) and builds each dict with plain function calls. The result
+equals serializer(queryset, many=True).data, so the rendered JSON is
+byte-identical; courses.tests checks that and `manage.py bench_serializers`
+measures the difference.
+
+Supported fields are model columns, forward foreign keys (as pk) and
+dotted sources through forward foreign keys ("class_assigned.name"):
+joined, or through reference foreign keys (School, Class, Subject) read
+from the in-process reference cache (courses/reference.py) by pk.
+Anything that needs an instance (SerializerMethodField, nested
+serializers, properties, reverse relations) raises ImproperlyConfigured
+when the reader is compiled.
+"""
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db import models
+from rest_framework import ISO_8601, relations, serializers
+from rest_framework.fields import empty
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .reference import ReferenceForeignKey, reference_snapshot
+
+# DRF fields whose to_representation() returns a values() value unchanged
+_IDENTITY_FIELDS = (serializers.BooleanField, serializers.ReadOnlyField)
+_STRING_FIELDS = (serializers.CharField, serializers.EmailField, serializers.URLField, serializers.SlugField)
+
+
+def _unchanged(context):
+    return None
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+_MISSING = object()
+
+
+def _reference_lookup(fields):
+    """
+    (snapshot, pk) -> the column at the end of a path of reference foreign
+    keys (fields: the keys, then the column), or _MISSING where a relation
+    is NULL.
+    """
+    relation, *rest = fields
+
+    def lookup(snap, pk):
+        row = snap.row(relation.related_model, pk)
+        for field in rest:
+            if row is None:
+                return _MISSING
+            value = row[field.attname]
+            if field is rest[-1]:
+                return value
+            row = snap.row(field.related_model, value) if value is not None else None
+
+    return lookup
+
+
+def _file_url(model_field, context):
+    """
+    FileField.to_representation() for a stored file name.
+    """
+    request = context.get('request')
+    use_url = api_settings.UPLOADED_FILES_USE_URL
+
+    def convert(name):
+        if not name:
+            return None
+        if not use_url:
+            return name
+        url = model_field.storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    return convert
+
+
+class FastReader:
+    """
+    Compiled values() reader for one ModelSerializer class.
+    """
+    _cache = {}
+
+    @classmethod
+    def for_serializer(cls, serializer_class, fields=None):
+        """
+        The (cached) reader of serializer_class, optionally limited to the
+        readable field names in `fields` (?fields=, see courses/sparse.py).
+        """
+        key = (serializer_class, tuple(fields) if fields is not None else None)
+        reader = cls._cache.get(key)
+        if reader is None:
+            reader = cls._cache[key] = cls(serializer_class, fields)
+        return reader
+
+    def __init__(self, serializer_class, fields=None):
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        self.columns = []
+        # (key, value column, guard columns, reference lookup, on_missing, converter factory)
+        self.fields = []
+        for field in serializer_class().fields.values():
+            if not field.write_only and (fields is None or field.field_name in fields):
+                self.fields.append(self._compile(field))
+
+    def _column(self, path):
+        if path not in self.columns:
+            self.columns.append(path)
+        return self.columns.index(path)
+
+    def _compile(self, field):
+        name = f"{self.serializer_class.__name__}.{field.field_name}"
+        if field.source == '*' or isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField)):
+            raise ImproperlyConfigured(f"{name}: {type(field).__name__} needs an instance.")
+
+        # Walk the source through forward foreign keys. From the first
+        # reference foreign key on (School, Class, Subject) the rest of the
+        # path is read from the reference cache instead of joined.
+        model, guards, path, lookup = self.model, [], [], []
+        for i, attr in enumerate(field.source_attrs):
+            try:
+                model_field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(f"{name}: '{attr}' is not a field of {model.__name__}.")
+            if not model_field.concrete:
+                raise ImproperlyConfigured(f"{name}: '{attr}' is not a column of {model.__name__}.")
+            if lookup:
+                lookup.append(model_field)
+            else:
+                path.append(model_field.name)
+            if i < len(field.source_attrs) - 1:
+                if not model_field.many_to_one and not model_field.one_to_one:
+                    raise ImproperlyConfigured(f"{name}: '{attr}' is not a forward relation.")
+                if not lookup:
+                    # The relation may be NULL: then DRF's get_attribute() fails on None
+                    guards.append(self._column('__'.join(path)))
+                    if isinstance(model_field, ReferenceForeignKey):
+                        lookup.append(model_field)
+                elif not isinstance(model_field, ReferenceForeignKey):
+                    raise ImproperlyConfigured(f"{name}: '{attr}' is not a reference relation.")
+                model = model_field.related_model
+        column = self._column('__'.join(path))
+
+        # What DRF's Field.get_attribute() does when a relation is NULL
+        if field.default is not empty:
+            on_missing = ('value', field.get_default())
+        elif field.allow_null:
+            on_missing = ('value', None)
+        elif not field.required or not guards:
+            on_missing = ('skip', None)
+        else:
+            raise ImproperlyConfigured(f"{name}: a required field across a nullable relation.")
+
+        lookup = _reference_lookup(lookup) if lookup else None
+        return field.field_name, column, tuple(guards), lookup, on_missing, self._converter(field, model_field)
+
+    def _converter(self, field, model_field):
+        """
+        A factory taking the serializer context and returning the value
+        converter, or None when the column value is already the output.
+        """
+        name = f"{self.serializer_class.__name__}.{field.field_name}"
+        if isinstance(field, serializers.FileField):
+            return lambda context: _file_url(model_field, context)
+        if isinstance(field, relations.RelatedField):
+            if isinstance(field, relations.PrimaryKeyRelatedField) and field.pk_field is None:
+                return _unchanged
+            raise ImproperlyConfigured(f"{name}: {type(field).__name__} needs an instance.")
+        if isinstance(field, _IDENTITY_FIELDS):
+            return _unchanged
+        if isinstance(field, _STRING_FIELDS) and not isinstance(field, serializers.ChoiceField) \
+                and isinstance(model_field, (models.CharField, models.TextField)):
+            return _unchanged
+        if isinstance(field, serializers.IntegerField) and isinstance(model_field, models.IntegerField):
+            return _unchanged
+        if type(field) is serializers.DateField and getattr(field, 'format', api_settings.DATE_FORMAT) == ISO_8601:
+            return lambda context: _isoformat
+        # Everything else (datetimes, decimals, choices, ...) goes through
+        # DRF's own to_representation(), which accepts the raw column value
+        return lambda context: field.to_representation
+
+    def serialize(self, queryset, context=None):
+        """
+        The list serializer(queryset, many=True).data would return.
+        """
+        context = context or {}
+        accessors = [
+            (key, column, guards, lookup, on_missing, make(context))
+            for key, column, guards, lookup, on_missing, make in self.fields
+        ]
+        snap = reference_snapshot() if any(lookup for _, _, _, lookup, _, _ in accessors) else None
+        data = []
+        append = data.append
+        for row in queryset.values_list(*self.columns):
+            item = {}
+            for key, column, guards, lookup, (missing, default), convert in accessors:
+                value = row[column]
+                if guards and any(row[g] is None for g in guards) \
+                        or lookup and (value := lookup(snap, value)) is _MISSING:
+                    if missing == 'value':
+                        item[key] = default
+                    continue
+                if value is None or convert is None:
+                    item[key] = value
+                else:
+                    item[key] = convert(value)
+            append(item)
+        return data
+
+
+class FastListMixin:
+    """
+    ModelViewSet mixin: list() serializes through a FastReader of the
+    action's serializer class (the paginated path is left to DRF).
+    """
+
+    def list(self, request, *args, **kwargs):
+        if self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        reader = FastReader.for_serializer(self.get_serializer_class(), getattr(self, 'sparse_fields', None))
+        return Response(reader.serialize(queryset, self.get_serializer_context()))
@@ -0,0 +1,78 @@
+"""
+Idempotency-Key support for write endpoints.
+
+    return idempotent(request, 'attendance-bulk', lambda: self._write(request))
+
+Without the header the handler simply runs. With it, the first request's
+response (any status below 500) is stored together with a hash of the
+request data, in the same transaction as the handler's writes; a retry
+with the same key gets that stored response back (with an
+Idempotent-Replayed header) instead of writing again, and a retry with the
+same key but different data is rejected with 422. Two concurrent requests
+with one key race on the unique constraint: the loser's writes roll back
+and it replays the winner's response.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+
+
+def request_hash(data):
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _replay(stored, digest):
+    if stored.request_hash != digest:
+        return Response(
+            {'error': 'This Idempotency-Key was already used with a different request.'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    return Response(stored.response, status=stored.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def idempotent(request, scope, handler):
+    """
+    Run handler() (returning a DRF Response) at most once per
+    (user, scope, Idempotency-Key).
+    """
+    key = request.META.get(HEADER)
+    if not key:
+        return handler()
+    if len(key) > 255:
+        return Response({'error': 'Idempotency-Key is too long (max 255).'}, status=status.HTTP_400_BAD_REQUEST)
+
+    digest = request_hash(request.data)
+    keys = IdempotencyKey.objects.filter(user=request.user, scope=scope)
+    expired = timezone.now() - timedelta(hours=getattr(settings, 'IDEMPOTENCY_KEY_TTL_HOURS', 24))
+    # Expired keys of this user are dropped here, so the table stays small
+    keys.filter(created_at__lt=expired).delete()
+
+    stored = keys.filter(key=key).first()
+    if stored is not None:
+        return _replay(stored, digest)
+
+    try:
+        with transaction.atomic():
+            response = handler()
+            if response.status_code < 500:
+                IdempotencyKey.objects.create(
+                    user=request.user, scope=scope, key=key, request_hash=digest,
+                    status_code=response.status_code, response=response.data,
+                )
+    except IntegrityError:
+        stored = keys.filter(key=key).first()
+        if stored is None:
+            raise
+        return _replay(stored, digest)
+    return response
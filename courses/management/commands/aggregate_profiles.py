@@ -0,0 +1,87 @@
+import glob
+import os
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from scholiv_lms.profiling import collapse_prof_file, collapse_stacks_file
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge the request profiles written by ProfilingMiddleware (.prof and .stacks "
+        "files under PROFILING_DIR) into collapsed stacks for flamegraph.pl, "
+        "speedscope or inferno. Weights are microseconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=None, help="Profile directory (default: PROFILING_DIR).")
+        parser.add_argument(
+            '--route', action='append', default=[],
+            help="Only this route (e.g. attendance-report, users:student-upload). Repeatable."
+        )
+        parser.add_argument('--output', '-o', default=None, help="Write here instead of stdout.")
+        parser.add_argument('--min-us', type=float, default=10, help="Drop stacks lighter than this.")
+        parser.add_argument('--top', type=int, default=0, help="Print the N heaviest stacks as a summary.")
+        parser.add_argument('--delete', action='store_true', help="Remove the aggregated files afterwards.")
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or settings.PROFILING_DIR
+        if not os.path.isdir(directory):
+            raise CommandError(f"Profile directory '{directory}' does not exist.")
+
+        if options['route']:
+            folders = [os.path.join(directory, r.replace(':', '_').replace('/', '_')) for r in options['route']]
+        else:
+            folders = [os.path.join(directory, '*')]
+        files = sorted(
+            path
+            for folder in folders
+            for pattern in ('*.prof', '*.stacks')
+            for path in glob.glob(os.path.join(folder, pattern))
+        )
+        if not files:
+            raise CommandError("No profile files found.")
+
+        counts = Counter()
+        aggregated = []
+        for path in files:
+            # Merged once read in full: a file that fails halfway adds nothing
+            file_counts = Counter()
+            try:
+                if path.endswith('.prof'):
+                    collapse_prof_file(path, file_counts, min_us=options['min_us'])
+                else:
+                    collapse_stacks_file(path, file_counts)
+            except (OSError, ValueError, EOFError) as e:
+                self.stderr.write(f"Skipping {path}: {e}")
+                continue
+            counts.update(file_counts)
+            aggregated.append(path)
+
+        lines = [
+            f"{stack} {round(weight)}"
+            for stack, weight in sorted(counts.items())
+            if weight >= options['min_us']
+        ]
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+        else:
+            self.stdout.write('\n'.join(lines))
+
+        if options['top']:
+            self.stderr.write(f"Heaviest {options['top']} stacks (leaf frame, ms):")
+            for stack, weight in counts.most_common(options['top']):
+                self.stderr.write(f"  {weight / 1000:10.1f}  {stack.rsplit(';', 1)[-1]}")
+
+        if options['delete']:
+            # Skipped files stay, to be looked at (or retried)
+            for path in aggregated:
+                os.remove(path)
+
+        self.stderr.write(self.style.SUCCESS(
+            f"Aggregated {len(aggregated)} profile(s) into {len(lines)} stacks"
+            + (f" -> {options['output']}" if options['output'] else '')
+        ))
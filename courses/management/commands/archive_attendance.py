@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.archive import (
+    academic_year,
+    academic_year_bounds,
+    archivable_years,
+    archive_horizon,
+    archive_year,
+    restore_year,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Move closed academic years of attendance (older than ATTENDANCE_LIVE_YEARS) "
+        "from the Attendance table into the compressed AttendanceArchive table. "
+        "Student read APIs and the attendance report include archived years "
+        "whenever the requested date range reaches them. Safe to re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, action='append', default=[],
+                            help="Only this academic year (the calendar year it starts in). Repeatable.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Students per transaction.")
+        parser.add_argument('--dry-run', action='store_true', help="Only list the years that would be archived.")
+        parser.add_argument('--restore', action='store_true',
+                            help="Move the given --year(s) back from the archive into Attendance.")
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            if not options['year']:
+                raise CommandError("--restore needs at least one --year.")
+            for year in options['year']:
+                started = time.perf_counter()
+                students, records = restore_year(year, batch_size=options['batch_size'])
+                self.stdout.write(self.style.SUCCESS(
+                    f"Restored {year}/{year + 1}: {records} records of {students} students "
+                    f"({time.perf_counter() - started:.1f}s)"
+                ))
+            return
+
+        horizon = archive_horizon()
+        self.stdout.write(f"Live window starts {horizon} (academic year {academic_year(horizon)}).")
+        years = options['year'] or archivable_years()
+        too_recent = [year for year in years if year >= academic_year(horizon)]
+        if too_recent:
+            raise CommandError(
+                f"Academic year(s) {', '.join(map(str, too_recent))} are still live (see ATTENDANCE_LIVE_YEARS)."
+            )
+        if not years:
+            self.stdout.write("Nothing to archive.")
+            return
+
+        for year in years:
+            start, end = academic_year_bounds(year)
+            if options['dry_run']:
+                self.stdout.write(f"Would archive {year}/{year + 1} ({start} - {end})")
+                continue
+            started = time.perf_counter()
+            students, records = archive_year(year, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Archived {year}/{year + 1}: {records} records of {students} students "
+                f"({time.perf_counter() - started:.1f}s)"
+            ))
@@ -0,0 +1,97 @@
+import copy
+import statistics
+import time
+
+from django.core import signals
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request database latency with connection reuse off, with "
+        "persistent connections (CONN_MAX_AGE) and with a psycopg pool (PostgreSQL). "
+        "Each iteration replays the request lifecycle: request_started, one query, "
+        "request_finished - the same hooks Django uses to open/close connections."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help="Alias whose settings are used as the base.")
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--query', default='SELECT 1')
+        parser.add_argument(
+            '--modes', default='none,persistent,pool',
+            help="Comma-separated: none (CONN_MAX_AGE=0), persistent, pool (PostgreSQL only)."
+        )
+
+    def handle(self, *args, **options):
+        base = connections.settings.get(options['database'])
+        if base is None:
+            raise CommandError(f"Unknown database alias '{options['database']}'.")
+
+        modes = [m.strip() for m in options['modes'].split(',') if m.strip()]
+        for mode in modes:
+            overrides = self.mode_settings(mode, base)
+            if overrides is None:
+                self.stdout.write(f"{mode:<11} skipped (not supported by {base['ENGINE']})")
+                continue
+
+            alias = f"bench_{mode}"
+            settings = copy.deepcopy(base)
+            settings.update(overrides)
+            connections.settings[alias] = settings
+            try:
+                samples = self.run(alias, options['requests'], options['query'])
+            finally:
+                connections[alias].close()
+                pool = getattr(connections[alias], 'pool', None)
+                if pool is not None:
+                    connections[alias].close_pool()
+                del connections[alias]
+                del connections.settings[alias]
+
+            self.stdout.write(
+                f"{mode:<11} p50={percentile(samples, 50):.2f}ms "
+                f"p99={percentile(samples, 99):.2f}ms "
+                f"mean={statistics.fmean(samples):.2f}ms "
+                f"({options['requests']} requests)"
+            )
+
+    def mode_settings(self, mode, base):
+        options = {k: v for k, v in base.get('OPTIONS', {}).items() if k != 'pool'}
+        if mode == 'none':
+            return {'CONN_MAX_AGE': 0, 'OPTIONS': options}
+        if mode == 'persistent':
+            return {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True, 'OPTIONS': options}
+        if mode == 'pool':
+            if base['ENGINE'] != 'django.db.backends.postgresql':
+                return None
+            return {
+                'CONN_MAX_AGE': 0,
+                'OPTIONS': {**options, 'pool': base.get('OPTIONS', {}).get('pool') or {'min_size': 2, 'max_size': 10}},
+            }
+        raise CommandError(f"Unknown mode '{mode}'.")
+
+    def run(self, alias, requests, query):
+        # Warm up: first connection / pool creation is not a steady-state cost
+        self.one_request(alias, query)
+
+        samples = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            self.one_request(alias, query)
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
+
+    def one_request(self, alias, query):
+        signals.request_started.send(sender=self.__class__)
+        with connections[alias].cursor() as cursor:
+            cursor.execute(query)
+            cursor.fetchall()
+        signals.request_finished.send(sender=self.__class__)
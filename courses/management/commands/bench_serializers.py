@@ -0,0 +1,79 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from courses.fast_serializers import FastReader
+from courses.models import Announcement, Attendance, Lecture
+from courses.reference import reference_scope
+from courses.serializers import AnnouncementSerializer, AttendanceSerializer, LectureSerializer
+
+# name -> (serializer, queryset as the list endpoint builds it)
+CASES = {
+    'lecture': (LectureSerializer, lambda: Lecture.objects.select_related('class_assigned', 'subject')),
+    'attendance': (AttendanceSerializer, lambda: Attendance.objects.select_related('student', 'lecture')),
+    'announcement': (
+        AnnouncementSerializer, lambda: Announcement.objects.select_related('posted_by', 'target_class__school')
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare list serialization throughput (rows/s, query included) of the "
+        "ModelSerializers and their values()-based FastReader (courses/fast_serializers.py) "
+        "on the rows in the database; see generate_synthetic_data for test data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help="Rows per list (first N by id).")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--models', default=','.join(CASES), help=f"Comma-separated: {', '.join(CASES)}.")
+
+    @reference_scope()
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['models'].split(',') if name.strip()]
+        unknown = set(names) - set(CASES)
+        if unknown:
+            raise CommandError(f"Unknown model(s): {', '.join(sorted(unknown))}.")
+        context = {'request': RequestFactory().get('/')}
+
+        for name in names:
+            serializer_class, queryset = CASES[name]
+            reader = FastReader.for_serializer(serializer_class)
+
+            def rows():
+                return queryset().order_by('pk')[:options['rows']]
+
+            def drf():
+                return serializer_class(rows(), many=True, context=context).data
+
+            def fast():
+                return reader.serialize(rows(), context)
+
+            renderer = JSONRenderer()
+            identical = renderer.render(drf()) == renderer.render(fast())  # also warms up both paths
+            count = rows().count()
+            if not count:
+                self.stdout.write(f"{name:<13} no rows")
+                continue
+
+            drf_time = self.measure(drf, options['repeat'])
+            fast_time = self.measure(fast, options['repeat'])
+            self.stdout.write(
+                f"{name:<13} {count} rows  "
+                f"serializer {count / drf_time:,.0f} rows/s  "
+                f"fast {count / fast_time:,.0f} rows/s  "
+                f"x{drf_time / fast_time:.1f}  "
+                + (self.style.SUCCESS("identical output") if identical else self.style.ERROR("OUTPUT DIFFERS"))
+            )
+
+    def measure(self, func, repeat):
+        samples = []
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - started)
+        return statistics.median(samples)
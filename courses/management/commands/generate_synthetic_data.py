@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.reference import reference_scope
+from courses.synthetic import SCALES, generate_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with a realistic synthetic dataset: schools, classes, "
+        "students, lectures, years of daily attendance, announcements and Q&A. "
+        "Start from a --scale preset and override individual sizes as needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES, default='small')
+        parser.add_argument('--schools', type=int)
+        parser.add_argument('--classes-per-school', type=int)
+        parser.add_argument('--students-per-class', type=int)
+        parser.add_argument('--teachers-per-school', type=int)
+        parser.add_argument('--subjects', type=int)
+        parser.add_argument('--lectures-per-class', type=int)
+        parser.add_argument('--years', type=int, help="Years of attendance history (weekdays).")
+        parser.add_argument('--announcements-per-class', type=int)
+        parser.add_argument('--questions-per-lecture', type=int)
+        parser.add_argument('--answers-per-question', type=int)
+        parser.add_argument('--password', default='password', help="Password of every generated account.")
+        parser.add_argument('--prefix', default='syn', help="Prefix of generated usernames and names.")
+        parser.add_argument('--seed', type=int, default=42)
+
+    @reference_scope()
+    def handle(self, *args, **options):
+        params = dict(SCALES[options['scale']])
+        for name in (
+            'schools', 'classes_per_school', 'students_per_class', 'teachers_per_school', 'subjects',
+            'lectures_per_class', 'years', 'announcements_per_class', 'questions_per_lecture',
+            'answers_per_question',
+        ):
+            if options[name] is not None:
+                params[name] = options[name]
+
+        try:
+            dataset = generate_dataset(
+                password=options['password'], prefix=options['prefix'], seed=options['seed'],
+                log=self.stdout.write, **params
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        counts = ', '.join(f"{count} {name}" for name, count in dataset['counts'].items())
+        self.stdout.write(self.style.SUCCESS(f"Created {counts}."))
+        accounts = [
+            f"{dataset[key].username} ({label})"
+            for key, label in (('student', 'student'), ('teacher', 'teacher'), ('school_admin', 'school admin'))
+            if dataset[key] is not None
+        ]
+        self.stdout.write(f"Log in as {' or '.join(accounts)}, password '{options['password']}'.")
@@ -0,0 +1,113 @@
+import base64
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+ENDPOINTS = {
+    'dashboard': 'student/dashboard/',
+    'lectures': 'student/lectures/',
+    'attendance': 'student/attendance/',
+    'profile': 'student/profile/',
+}
+
+STACKS = {
+    'sync': '/api/',
+    'async': '/api/async/',
+}
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the student portal against a running server and compare the "
+        "sync (/api/student/...) and async (/api/async/student/...) stacks. "
+        "Reports p50/p99 latency and throughput per endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--username', required=True, help="A student account (HTTP Basic auth).")
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint per stack.")
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--stacks', default='sync,async')
+        parser.add_argument('--endpoints', default=','.join(ENDPOINTS))
+        parser.add_argument('--json', dest='json_path', help="Also write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        stacks = [s.strip() for s in options['stacks'].split(',') if s.strip()]
+        endpoints = [e.strip() for e in options['endpoints'].split(',') if e.strip()]
+        for name in stacks:
+            if name not in STACKS:
+                raise CommandError(f"Unknown stack '{name}'. Choose from: {', '.join(STACKS)}")
+        for name in endpoints:
+            if name not in ENDPOINTS:
+                raise CommandError(f"Unknown endpoint '{name}'. Choose from: {', '.join(ENDPOINTS)}")
+
+        credentials = f"{options['username']}:{options['password']}".encode()
+        headers = {
+            'Authorization': 'Basic ' + base64.b64encode(credentials).decode(),
+            'Accept': 'application/json',
+        }
+
+        results = []
+        for endpoint in endpoints:
+            for stack in stacks:
+                url = options['base_url'].rstrip('/') + STACKS[stack] + ENDPOINTS[endpoint]
+                result = self.run_load(url, headers, options['requests'], options['concurrency'])
+                result.update({'stack': stack, 'endpoint': endpoint})
+                results.append(result)
+                self.stdout.write(
+                    f"{endpoint:<11} {stack:<6} "
+                    f"p50={result['p50_ms']:.1f}ms p99={result['p99_ms']:.1f}ms "
+                    f"throughput={result['throughput_rps']:.1f} req/s errors={result['errors']}"
+                )
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['json_path']}"))
+
+    def run_load(self, url, headers, total, concurrency):
+        def one_request(_):
+            request = urllib.request.Request(url, headers=headers)
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+                    ok = 200 <= response.status < 300
+            except (urllib.error.URLError, OSError):
+                ok = False
+            return (time.perf_counter() - started) * 1000, ok
+
+        # Warm up (connections, caches) before measuring
+        one_request(None)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(one_request, range(total)))
+        elapsed = time.perf_counter() - started
+
+        latencies = [ms for ms, ok in samples if ok]
+        return {
+            'requests': total,
+            'concurrency': concurrency,
+            'errors': sum(1 for _, ok in samples if not ok),
+            'p50_ms': percentile(latencies, 50) or 0.0,
+            'p99_ms': percentile(latencies, 99) or 0.0,
+            'mean_ms': statistics.fmean(latencies) if latencies else 0.0,
+            'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+        }
@@ -0,0 +1,81 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from courses.archive import academic_year, academic_year_bounds
+from courses.models import Attendance
+
+
+class Command(BaseCommand):
+    help = (
+        "Add partitions for upcoming academic years to an Attendance table that was "
+        "range-partitioned on PostgreSQL (see docs/attendance_partitioning.md). Prints "
+        "the DDL; pass --execute to run it. Schedule it yearly (e.g. with --years-ahead 2) "
+        "so partitions exist before their year starts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--years-ahead', type=int, default=2,
+                            help="Create partitions up to this many academic years ahead.")
+        parser.add_argument('--execute', action='store_true', help="Run the DDL instead of printing it.")
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'postgresql':
+            raise CommandError(
+                f"Partitioning is supported on PostgreSQL, not {connection.vendor}. "
+                "Use archive_attendance to keep the table small instead."
+            )
+
+        table = Attendance._meta.db_table
+        with connection.cursor() as cursor:
+            existing = self.partitions(cursor, table)
+        if existing is None:
+            raise CommandError(
+                f"{table} is not partitioned. Convert it first (docs/attendance_partitioning.md)."
+            )
+
+        last_year = academic_year(timezone.localdate()) + options['years_ahead']
+        statements = [
+            self.partition(connection, table, year)
+            for year in range(academic_year(timezone.localdate()), last_year + 1)
+            if f'{table}_y{year}' not in existing
+        ]
+        if not statements:
+            self.stdout.write(f"{table} already has partitions up to {last_year}/{last_year + 1}.")
+            return
+        if not options['execute']:
+            self.stdout.write(';\n'.join(statements) + ';')
+            return
+
+        with connection.cursor() as cursor:
+            for statement in statements:
+                self.stdout.write(statement)
+                cursor.execute(statement)
+        self.stdout.write(self.style.SUCCESS(
+            f"{table}: partitions up to {last_year}/{last_year + 1} in place ({len(statements)} created)."
+        ))
+
+    def partitions(self, cursor, table):
+        """
+        Names of the partitions, or None if the table is not partitioned.
+        """
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [table])
+        if cursor.fetchone() is None:
+            return None
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s)", [table]
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+    def partition(self, connection, table, year):
+        # Creating a partition fails once the DEFAULT partition holds rows of
+        # its range, hence ahead of time
+        quote = connection.ops.quote_name
+        start, end = academic_year_bounds(year)
+        return (
+            f"CREATE TABLE {quote(f'{table}_y{year}')} PARTITION OF {quote(table)} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
@@ -0,0 +1,152 @@
+import json
+import os
+import platform
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+
+import courses.urls
+import users.urls
+from courses.benchmarks import CASES, UNBENCHMARKED_ROUTES, BenchmarkContext, UnexpectedStatus, compare, run_case
+from courses.reference import reference_scope
+from courses.synthetic import SCALES, generate_dataset
+from scholiv_lms.testing import route_names
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every API route, both Excel importers and the attendance report "
+        "against synthetic datasets at several scales. Each scale runs in a fresh "
+        "test database (your data is never touched), results are written as JSON "
+        "and optionally compared with a stored baseline. Run with DB_ENGINE=sqlite."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='small,medium', help=f"Comma-separated: {', '.join(SCALES)}.")
+        parser.add_argument('--repeat', type=int, default=10, help="Timed requests per case.")
+        parser.add_argument('--cases', default='', help="Only these cases (comma-separated route names).")
+        parser.add_argument('--import-rows', type=int, default=20,
+                            help="Rows per Excel import (the student import hashes one password per row).")
+        parser.add_argument('--output', '-o', default='benchmark_results.json')
+        parser.add_argument('--baseline', help="Compare against this results file.")
+        parser.add_argument('--save-baseline', help="Also write the results here, as the new baseline.")
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help="Allowed slowdown of the median before it counts as a regression (0.25 = 25%%).")
+        parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                            help="Ignore slowdowns smaller than this (noise on fast endpoints).")
+        parser.add_argument('--any-database', action='store_true',
+                            help="Allow a non-SQLite database engine (results are then not comparable).")
+
+    @reference_scope()
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite' and not options['any_database']:
+            raise CommandError(
+                "Benchmarks are meant to run on SQLite (set DB_ENGINE=sqlite) "
+                "so results are comparable; pass --any-database to override."
+            )
+
+        scales = [s.strip() for s in options['scales'].split(',') if s.strip()]
+        for scale in scales:
+            if scale not in SCALES:
+                raise CommandError(f"Unknown scale '{scale}'. Choose from: {', '.join(SCALES)}.")
+
+        cases = CASES
+        if options['cases']:
+            wanted = {c.strip() for c in options['cases'].split(',') if c.strip()}
+            unknown = wanted - {case[0] for case in CASES}
+            if unknown:
+                raise CommandError(f"Unknown case(s): {', '.join(sorted(unknown))}.")
+            cases = [case for case in CASES if case[0] in wanted]
+        else:
+            missing = route_names(courses.urls) | route_names(users.urls)
+            missing -= {case[0] for case in CASES} | UNBENCHMARKED_ROUTES
+            if missing:
+                self.stderr.write(self.style.WARNING(f"Routes without a benchmark case: {', '.join(sorted(missing))}"))
+
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)['results']
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Could not read baseline '{options['baseline']}': {e}")
+
+        results = {}
+        datasets = {}
+        setup_test_environment(debug=False)
+        # The dataset is seconds old: let the export include it,
+        # and keep the uploaded videos in memory instead of sending them to S3
+        bench_settings = override_settings(
+            EXPORT_WATERMARK_LAG_SECONDS=0,
+            STORAGES={**settings.STORAGES, 'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'}},
+        )
+        bench_settings.enable()
+        try:
+            for scale in scales:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"Scale '{scale}'"))
+                old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+                try:
+                    started = time.perf_counter()
+                    dataset = generate_dataset(**SCALES[scale], prefix='bench')
+                    datasets[scale] = dataset['counts']
+                    self.stdout.write(
+                        f"  dataset: {', '.join(f'{v} {k}' for k, v in dataset['counts'].items())} "
+                        f"({time.perf_counter() - started:.1f}s)"
+                    )
+                    context = BenchmarkContext(dataset, options['import_rows'])
+                    results[scale] = {}
+                    for case in cases:
+                        try:
+                            result = run_case(context, case, options['repeat'])
+                        except UnexpectedStatus as e:
+                            raise CommandError(f"Case {e}; fix it before timing it.")
+                        results[scale][case[0]] = result
+                        self.stdout.write(
+                            f"  {case[0]:<30} median={result['median_ms']:8.2f}ms "
+                            f"p95={result['p95_ms']:8.2f}ms queries={result['queries']:<4} "
+                            f"status={','.join(map(str, result['status']))}"
+                        )
+                finally:
+                    teardown_databases(old_config, verbosity=0)
+        finally:
+            bench_settings.disable()
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connections['default'].vendor,
+                'repeat': options['repeat'],
+                'import_rows': options['import_rows'],
+                'scales': {scale: SCALES[scale] for scale in scales},
+                'datasets': datasets,
+            },
+            'results': results,
+        }
+        self.write_json(options['output'], report)
+        if options['save_baseline']:
+            self.write_json(options['save_baseline'], report)
+
+        if baseline is not None:
+            regressions = compare(results, baseline, options['tolerance'], options['min_delta_ms'])
+            if regressions:
+                for line in regressions:
+                    self.stderr.write(self.style.ERROR(f"  REGRESSION {line}"))
+                raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}.")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}."))
+
+    def write_json(self, path, report):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        self.stdout.write(f"Results written to {path}")
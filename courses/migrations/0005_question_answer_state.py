@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_answer_state(apps, schema_editor):
+    Question = apps.get_model('courses', 'Question')
+    Answer = apps.get_model('courses', 'Answer')
+
+    answer_counts = Answer.objects.filter(question=OuterRef('pk')).order_by().values('question').annotate(
+        n=Count('pk')
+    ).values('n')
+    latest_accepted = Answer.objects.filter(question=OuterRef('pk'), is_accepted=True).order_by('-created_at').values('pk')
+
+    Question.objects.update(
+        answer_count=Coalesce(Subquery(answer_counts, output_field=IntegerField()), 0),
+        accepted_answer=Subquery(latest_accepted[:1]),
+    )
+    Question.objects.filter(answer_count__gt=0).update(is_answered=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_attendance_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='accepted_answer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='courses.answer'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='answer_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_answer_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_tenant_keys(apps, schema_editor):
+    Class = apps.get_model('courses', 'Class')
+    Lecture = apps.get_model('courses', 'Lecture')
+    Attendance = apps.get_model('courses', 'Attendance')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+
+    Lecture.objects.update(
+        school=Subquery(Class.objects.filter(pk=OuterRef('class_assigned_id')).values('school_id')[:1])
+    )
+    students = User.objects.filter(pk=OuterRef('student_id'))
+    Attendance.objects.update(
+        student_class=Subquery(students.values('assigned_class_id')[:1]),
+        school=Subquery(students.values('school_id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_question_answer_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='school',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='courses.school'),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='student_class',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='courses.class'),
+        ),
+        migrations.AddField(
+            model_name='lecture',
+            name='school',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='courses.school'),
+        ),
+        # Backfill before the indexes exist, so the UPDATEs don't maintain them
+        migrations.RunPython(backfill_tenant_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['school', 'date'], name='attendance_school_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['student_class', 'date'], name='attendance_class_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lecture',
+            index=models.Index(fields=['school', '-uploaded_at'], name='lecture_school_uploaded_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_tenant_keys'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.PositiveSmallIntegerField()),
+                ('record_count', models.PositiveIntegerField()),
+                ('present_count', models.PositiveIntegerField()),
+                ('first_date', models.DateField()),
+                ('last_date', models.DateField()),
+                ('payload', models.BinaryField()),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+                ('school', models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='courses.school')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('student_class', models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='courses.class')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['student_class', 'academic_year'], name='attendance_archive_class_idx'), models.Index(fields=['school', 'academic_year'], name='attendance_archive_school_idx')],
+                'constraints': [models.UniqueConstraint(fields=('student', 'academic_year'), name='attendance_archive_student_year')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_idempotency_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['target_class', '-created_at'], name='announcement_class_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lecture',
+            index=models.Index(fields=['class_assigned', '-uploaded_at'], name='lecture_class_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lecture',
+            index=models.Index(fields=['class_assigned', 'subject', '-uploaded_at'], name='lecture_class_subject_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['lecture', '-created_at', '-id'], name='question_lecture_created_idx'),
+        ),
+    ]
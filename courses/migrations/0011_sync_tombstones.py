@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:10
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_listing_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('lecture', 'Lecture'), ('announcement', 'Announcement'), ('attendance', 'Attendance')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('student_class_id', models.BigIntegerField(blank=True, null=True)),
+                ('student_id', models.BigIntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['target_class', 'updated_at'], name='announcement_class_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['student', 'updated_at'], name='attendance_student_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lecture',
+            index=models.Index(fields=['class_assigned', 'updated_at'], name='lecture_class_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['student_class_id', 'deleted_at'], name='tombstone_class_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['student_id', 'deleted_at'], name='tombstone_student_idx'),
+        ),
+    ]
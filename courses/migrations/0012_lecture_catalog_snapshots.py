@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0011_sync_tombstones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LectureCatalogSnapshot',
+            fields=[
+                ('student_class', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='lecture_catalog', serialize=False, to='courses.class')),
+                ('lectures', models.JSONField(default=list)),
+                ('subjects', models.JSONField(default=list)),
+                ('built_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:26
+
+from django.db import migrations, models
+
+
+def create_version_row(apps, schema_editor):
+    ReferenceDataVersion = apps.get_model('courses', 'ReferenceDataVersion')
+    ReferenceDataVersion.objects.using(schema_editor.connection.alias).get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0012_lecture_catalog_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferenceDataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_version_row, migrations.RunPython.noop),
+    ]
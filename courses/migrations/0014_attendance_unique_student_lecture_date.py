@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-19 08:20
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def remove_duplicates(apps, schema_editor):
+    """
+    Keep the most recently updated record of each (student, lecture, date)
+    and delete the others, with a tombstone so delta sync drops them too.
+    """
+    Attendance = apps.get_model('courses', 'Attendance')
+    Tombstone = apps.get_model('courses', 'Tombstone')
+
+    duplicated = (
+        Attendance.objects.filter(lecture__isnull=False)
+        .values('student_id', 'lecture_id', 'date')
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+        .values_list('student_id', 'lecture_id', 'date')
+    )
+    for student_id, lecture_id, date in list(duplicated):
+        ids = list(
+            Attendance.objects.filter(student_id=student_id, lecture_id=lecture_id, date=date)
+            .order_by('-updated_at', '-id')
+            .values_list('id', flat=True)
+        )
+        Attendance.objects.filter(id__in=ids[1:]).delete()
+        Tombstone.objects.bulk_create([
+            Tombstone(kind='attendance', object_id=pk, student_id=student_id) for pk in ids[1:]
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0013_reference_data_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(fields=('student', 'lecture', 'date'), name='attendance_student_lecture_date_uniq'),
+        ),
+    ]
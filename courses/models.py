@@ -1,5 +1,11 @@
 from django.db import models
+from django.db.models import Case, F, Q, Value, When
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .reference import ReferenceForeignKey
 
 # Get the User model we defined in our 'users' app
 User = settings.AUTH_USER_MODEL
@@ -14,7 +20,7 @@ class School(models.Model):
 class Class(models.Model):
     # e.g., "Class 10", "Class 12"
     name = models.CharField(max_length=100) 
-    school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='classes')
+    school = ReferenceForeignKey(School, on_delete=models.CASCADE, related_name='classes')
 
     def __str__(self):
         return f"{self.name} - {self.school.name}"
@@ -28,6 +34,14 @@ class Subject(models.Model):
     def __str__(self):
         return self.name
 
+class ReferenceDataVersion(models.Model):
+    """
+    Single row (pk=1) whose version changes on every School, Class or
+    Subject write; processes compare it with their cached copy of those
+    tables (courses/reference.py).
+    """
+    version = models.BigIntegerField(default=0)
+
 class Lecture(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
@@ -50,15 +64,62 @@ class Lecture(models.Model):
                                        help_text="File size in MB")
     
     # Relationships based on requirements
-    class_assigned = models.ForeignKey(Class, on_delete=models.SET_NULL, null=True, related_name='lectures')
-    subject = models.ForeignKey(Subject, on_delete=models.SET_NULL, null=True, related_name='lectures')
+    class_assigned = ReferenceForeignKey(Class, on_delete=models.SET_NULL, null=True, related_name='lectures')
+    subject = ReferenceForeignKey(Subject, on_delete=models.SET_NULL, null=True, related_name='lectures')
     topic = models.CharField(max_length=255, blank=True, null=True) # e.g., "Chapter 1: Algebra"
+
+    # Tenant key, denormalized from class_assigned.school so per-school
+    # queries stay on this table (and it can be partitioned by school).
+    # Kept in sync by save() and the Class post_save signal.
+    school = models.ForeignKey(
+        School, on_delete=models.SET_NULL, null=True, blank=True,
+        editable=False, db_index=False, related_name='+'
+    )
     
     uploaded_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['school', '-uploaded_at'], name='lecture_school_uploaded_idx'),
+            # A class's lectures newest first, optionally of one subject
+            # (student lecture list and dashboard): read in index order
+            models.Index(fields=['class_assigned', '-uploaded_at'], name='lecture_class_uploaded_idx'),
+            models.Index(
+                fields=['class_assigned', 'subject', '-uploaded_at'], name='lecture_class_subject_idx'
+            ),
+            # Delta sync (courses/sync.py): a class's lectures changed since a watermark
+            models.Index(fields=['class_assigned', 'updated_at'], name='lecture_class_updated_idx'),
+        ]
     
     def __str__(self):
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_class_assigned_id = instance.__dict__.get('class_assigned_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Refresh the denormalized school when the class is set or changes
+        (no extra query if class_assigned is already loaded).
+        """
+        if self._state.adding or self.class_assigned_id != getattr(self, '_loaded_class_assigned_id', None):
+            if self.class_assigned_id is None:
+                self.school_id = None
+            elif Lecture.class_assigned.is_cached(self):
+                self.school_id = self.class_assigned.school_id
+            else:
+                self.school_id = Class.objects.filter(pk=self.class_assigned_id).values_list(
+                    'school_id', flat=True
+                ).first()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'class_assigned' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'school'}
+        super().save(*args, **kwargs)
+        self._loaded_class_assigned_id = self.class_assigned_id
     
     def get_video_url(self):
         """
@@ -79,9 +140,107 @@ class Attendance(models.Model):
     # This will be used for the "auto-mark present" feature
     watched_video = models.BooleanField(default=False) 
 
+    # Bumped on every save; used for cheap ETags / change detection
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Tenant keys, denormalized from the student (assigned_class, school) so
+    # class/school reports are single-table range scans and the table can be
+    # partitioned by school. Kept in sync by save() and the User post_save
+    # signal; bulk writes must set them explicitly.
+    student_class = models.ForeignKey(
+        Class, on_delete=models.SET_NULL, null=True, blank=True,
+        editable=False, db_index=False, related_name='+'
+    )
+    school = models.ForeignKey(
+        School, on_delete=models.SET_NULL, null=True, blank=True,
+        editable=False, db_index=False, related_name='+'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['school', 'date'], name='attendance_school_date_idx'),
+            models.Index(fields=['student_class', 'date'], name='attendance_class_date_idx'),
+            # Incremental columnar export (courses/export.py) pages by (updated_at, id)
+            models.Index(fields=['updated_at', 'id'], name='attendance_updated_idx'),
+            # Delta sync (courses/sync.py): a student's records changed since a watermark
+            models.Index(fields=['student', 'updated_at'], name='attendance_student_updated_idx'),
+        ]
+        constraints = [
+            # One record per student, lecture and day: the key the uploads and
+            # the bulk API upsert on
+            models.UniqueConstraint(
+                fields=['student', 'lecture', 'date'], name='attendance_student_lecture_date_uniq'
+            ),
+        ]
+
     def __str__(self):
         return f"{self.student.username} - {self.date} - Present: {self.present}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_student_id = instance.__dict__.get('student_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Copy the student's class and school when the student is set or
+        changes (no extra query if the student is already loaded).
+        """
+        if self._state.adding or self.student_id != getattr(self, '_loaded_student_id', None):
+            if Attendance.student.is_cached(self):
+                self.student_class_id = self.student.assigned_class_id
+                self.school_id = self.student.school_id
+            else:
+                self.student_class_id, self.school_id = get_user_model().objects.filter(
+                    pk=self.student_id
+                ).values_list('assigned_class_id', 'school_id').first() or (None, None)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'student' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'student_class', 'school'}
+        super().save(*args, **kwargs)
+        self._loaded_student_id = self.student_id
+
+
+class AttendanceArchive(models.Model):
+    """
+    One student's attendance for one closed academic year, moved out of
+    Attendance by `manage.py archive_attendance`. The records are stored as
+    zlib-compressed columns (see courses/archive.py); the counters and date
+    range answer totals and range checks without decompressing.
+    """
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    academic_year = models.PositiveSmallIntegerField()  # calendar year the academic year starts in
+
+    # Tenant keys, kept in sync with the student like Attendance's
+    student_class = models.ForeignKey(
+        Class, on_delete=models.SET_NULL, null=True, blank=True,
+        editable=False, db_index=False, related_name='+'
+    )
+    school = models.ForeignKey(
+        School, on_delete=models.SET_NULL, null=True, blank=True,
+        editable=False, db_index=False, related_name='+'
+    )
+
+    record_count = models.PositiveIntegerField()
+    present_count = models.PositiveIntegerField()
+    first_date = models.DateField()
+    last_date = models.DateField()
+    payload = models.BinaryField()
+    archived_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'academic_year'], name='attendance_archive_student_year'),
+        ]
+        indexes = [
+            models.Index(fields=['student_class', 'academic_year'], name='attendance_archive_class_idx'),
+            models.Index(fields=['school', 'academic_year'], name='attendance_archive_school_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} - {self.academic_year} ({self.record_count} records)"
+
 
 # ===========================
 # Q&A SYSTEM MODELS
@@ -102,7 +261,7 @@ class Announcement(models.Model):
 
     
     # Which class should see this announcement
-    target_class = models.ForeignKey(
+    target_class = ReferenceForeignKey(
         Class, 
         on_delete=models.CASCADE, 
         related_name='announcements'
@@ -125,10 +284,27 @@ class Announcement(models.Model):
 
     class Meta:
         ordering = ['-created_at']  # Show newest first
+        indexes = [
+            # A class's announcements newest first, and the "last 7 days" count
+            models.Index(fields=['target_class', '-created_at'], name='announcement_class_created_idx'),
+            # Delta sync (courses/sync.py)
+            models.Index(fields=['target_class', 'updated_at'], name='announcement_class_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.target_class.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_target_class_id = instance.__dict__.get('target_class_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # After post_save: the announcement_moved signal compares the two
+        self._loaded_target_class_id = self.target_class_id
+
 
 class Question(models.Model):
     """
@@ -158,8 +334,24 @@ class Question(models.Model):
     # Track if the question has been answered
     is_answered = models.BooleanField(default=False)
 
+    # Denormalized Q&A state, maintained by Answer with targeted UPDATEs
+    answer_count = models.PositiveIntegerField(default=0)
+    # Cleared in the same UPDATE that decrements answer_count when the
+    # answer is deleted (signals.py), hence no SET_NULL
+    accepted_answer = models.ForeignKey(
+        'Answer',
+        on_delete=models.DO_NOTHING,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+
     class Meta:
         ordering = ['-created_at']  # Show newest first
+        indexes = [
+            # A lecture's questions newest first (id breaks ties for paging)
+            models.Index(fields=['lecture', '-created_at', '-id'], name='question_lecture_created_idx'),
+        ]
 
     def __str__(self):
         return f"Q: {self.title} by {self.asked_by.username}"
@@ -197,11 +389,180 @@ class Answer(models.Model):
     def __str__(self):
         return f"A: {self.content[:50]}... by {self.answered_by.username}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored value so save() only touches the question
+        # when acceptance actually changes.
+        instance._loaded_is_accepted = instance.__dict__.get('is_accepted')
+        return instance
+
     def save(self, *args, **kwargs):
         """
-        Override save to automatically mark the question as answered.
+        Save the answer and keep the question's Q&A state in sync with a
+        targeted UPDATE (the Question row is never fetched or fully re-saved):
+        - new answer: INSERT + one UPDATE (answer_count + 1, is_answered)
+        - edit: just the answer's own UPDATE, plus the acceptance update
+          below if is_accepted changed
         """
+        is_new = self._state.adding
+        acceptance_changed = self.is_accepted != getattr(self, '_loaded_is_accepted', False)
         super().save(*args, **kwargs)
-        # When an answer is saved, mark the question as answered
-        self.question.is_answered = True
-        self.question.save()
\ No newline at end of file
+
+        question_updates = {}
+        if is_new:
+            question_updates.update(
+                answer_count=F('answer_count') + 1,
+                is_answered=True,
+            )
+        if acceptance_changed:
+            question_updates.update(self._acceptance_updates())
+        if question_updates:
+            question_updates['updated_at'] = timezone.now()
+            Question.objects.filter(pk=self.question_id).update(**question_updates)
+
+        self._loaded_is_accepted = self.is_accepted
+
+    def _acceptance_updates(self):
+        if self.is_accepted:
+            # Only one accepted answer per question
+            Answer.objects.filter(
+                question_id=self.question_id, is_accepted=True
+            ).exclude(pk=self.pk).update(is_accepted=False)
+            return {'accepted_answer_id': self.pk}
+        return {
+            'accepted_answer_id': Case(
+                When(accepted_answer_id=self.pk, then=Value(None)),
+                default=F('accepted_answer_id'),
+            )
+        }
+
+    def accept(self):
+        """
+        Mark this answer as the accepted one for its question.
+        Two statements: flip is_accepted across the question's answers,
+        then point the question at this answer.
+        """
+        Answer.objects.filter(question_id=self.question_id).filter(
+            Q(pk=self.pk) | Q(is_accepted=True)
+        ).update(
+            is_accepted=Case(When(pk=self.pk, then=Value(True)), default=Value(False))
+        )
+        Question.objects.filter(pk=self.question_id).update(
+            accepted_answer_id=self.pk, updated_at=timezone.now()
+        )
+        self.is_accepted = True
+        self._loaded_is_accepted = True
+
+    def removed(self):
+        """
+        Update the question for this answer's deletion, in one UPDATE:
+        decrement answer_count and clear accepted_answer if it was this one.
+        Run by pre_delete (signals.py), so queryset deletes and cascades
+        keep the question in sync too.
+        """
+        # is_answered comes first: MySQL evaluates SET clauses left to right,
+        # so it must read answer_count before it is decremented.
+        Question.objects.filter(pk=self.question_id).update(
+            is_answered=Case(When(answer_count__gt=1, then=Value(True)), default=Value(False)),
+            answer_count=Case(When(answer_count__gt=0, then=F('answer_count') - 1), default=Value(0)),
+            accepted_answer_id=Case(
+                When(accepted_answer_id=self.pk, then=Value(None)), default=F('accepted_answer_id')
+            ),
+            updated_at=timezone.now(),
+        )
+
+
+class AnnouncementEvent(models.Model):
+    """
+    Outbox of announcement changes, used by the 'database' event backend
+    to fan SSE events out across processes. Rows are short-lived.
+    """
+    channel = models.BigIntegerField(db_index=True)  # target_class id
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Event {self.id} on class {self.channel}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response of a write made with an Idempotency-Key header, replayed when
+    the client retries the same request (courses/idempotency.py). Rows
+    expire after IDEMPOTENCY_KEY_TTL_HOURS.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    scope = models.CharField(max_length=100)  # route name
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    response = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'scope', 'key'], name='idempotency_key_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key}"
+
+
+class Tombstone(models.Model):
+    """
+    A lecture, announcement or attendance record that was deleted, or a
+    lecture moved to another class, so delta sync (courses/sync.py) can
+    tell clients that synced earlier to drop it. Kept for
+    SYNC_TOMBSTONE_DAYS; older sync tokens get a full sync instead.
+    """
+    LECTURE = 'lecture'
+    ANNOUNCEMENT = 'announcement'
+    ATTENDANCE = 'attendance'
+    KIND_CHOICES = (
+        (LECTURE, 'Lecture'),
+        (ANNOUNCEMENT, 'Announcement'),
+        (ATTENDANCE, 'Attendance'),
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+
+    # Who must hear about it: the class (lectures, announcements) or the
+    # student (attendance). Plain ids rather than foreign keys, because a
+    # tombstone is often written while its class or student is being
+    # deleted and must not be removed with it.
+    student_class_id = models.BigIntegerField(null=True, blank=True)
+    student_id = models.BigIntegerField(null=True, blank=True)
+
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['student_class_id', 'deleted_at'], name='tombstone_class_idx'),
+            models.Index(fields=['student_id', 'deleted_at'], name='tombstone_student_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} deleted {self.deleted_at}"
+
+
+class LectureCatalogSnapshot(models.Model):
+    """
+    A class's student lecture catalog, pre-rendered (courses/catalog.py):
+    one JSON fragment set per lecture plus the subject filter list, so the
+    student lecture list reads one row instead of joining the lectures.
+    Updated per lecture after each Lecture write commits; built on first
+    use when built_at is empty. built_at changes with every write, and is
+    part of the student lecture list's ETag.
+    """
+    student_class = models.OneToOneField(
+        Class, on_delete=models.CASCADE, primary_key=True, related_name='lecture_catalog'
+    )
+    # Newest first; see courses/catalog.py for the entry format
+    lectures = models.JSONField(default=list)
+    subjects = models.JSONField(default=list)
+    built_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Lecture catalog of class {self.student_class_id}"
+
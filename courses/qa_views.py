@@ -0,0 +1,199 @@
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from users.models import Role
+from .models import Lecture, Question, Answer
+
+
+# ===========================
+# Q&A THREAD API
+# ===========================
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+DEFAULT_ANSWERS_PER_QUESTION = 3
+MAX_ANSWERS_PER_QUESTION = 20
+
+
+def _int_param(request, name, default, minimum, maximum):
+    """
+    Read a bounded integer query parameter. Raises ValueError with a
+    user-facing message if it is not a valid integer.
+    """
+    raw = request.query_params.get(name)
+    if raw in (None, ''):
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an integer.")
+    return max(minimum, min(value, maximum))
+
+
+def _can_view_lecture(user, lecture):
+    if user.is_superuser or user.role != Role.STUDENT:
+        return True
+    return lecture.class_assigned_id == user.assigned_class_id
+
+
+# Columns needed to render a thread (skips long user rows etc.)
+QUESTION_FIELDS = (
+    'id', 'title', 'content', 'is_answered', 'answer_count',
+    'accepted_answer_id', 'created_at', 'asked_by__username',
+)
+ANSWER_FIELDS = ('id', 'question_id', 'content', 'is_accepted', 'created_at', 'answered_by__username')
+
+
+def _answer_data(answer):
+    return {
+        "id": answer.id,
+        "content": answer.content,
+        "answered_by": answer.answered_by.username,
+        "is_accepted": answer.is_accepted,
+        "created_at": answer.created_at,
+    }
+
+
+class LectureQuestionThreadView(APIView):
+    """
+    Paged Q&A thread for one lecture.
+    URL: /api/lectures/<id>/thread/
+
+    Query Parameters:
+    - page: Page number, newest questions first (default 1)
+    - page_size: Questions per page (default 20, max 100)
+    - answers: How many answers to include per question (default 3, max 20)
+
+    Each question carries its answer_count and only its first N answers,
+    loaded for the whole page in ONE query using
+    ROW_NUMBER() OVER (PARTITION BY question). Further answers are paged
+    through /api/questions/<id>/answers/.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        try:
+            page = _int_param(request, 'page', 1, 1, 10**6)
+            page_size = _int_param(request, 'page_size', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+            answers_per_question = _int_param(
+                request, 'answers', DEFAULT_ANSWERS_PER_QUESTION, 0, MAX_ANSWERS_PER_QUESTION
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            lecture = Lecture.objects.only('id', 'class_assigned_id').get(pk=pk)
+        except Lecture.DoesNotExist:
+            return Response({"error": "Lecture not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        if not _can_view_lecture(request.user, lecture):
+            return Response(
+                {"error": "You don't have access to this lecture."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        # 1. One page of questions (+1 row to know if there is a next page)
+        offset = (page - 1) * page_size
+        questions = list(
+            Question.objects.filter(lecture=lecture)
+            .select_related('asked_by')
+            .only(*QUESTION_FIELDS)
+            .order_by('-created_at', '-id')[offset:offset + page_size + 1]
+        )
+        has_next = len(questions) > page_size
+        questions = questions[:page_size]
+
+        # 2. First N answers of every question on the page, in one query
+        answers_by_question = {q.id: [] for q in questions}
+        if questions and answers_per_question:
+            answers = (
+                Answer.objects.filter(question_id__in=answers_by_question)
+                .select_related('answered_by')
+                .only(*ANSWER_FIELDS)
+                .annotate(position=Window(
+                    expression=RowNumber(),
+                    partition_by=[F('question_id')],
+                    order_by=[F('id').asc()],
+                ))
+                .filter(position__lte=answers_per_question)
+                .order_by('question_id', 'id')
+            )
+            for answer in answers:
+                answers_by_question[answer.question_id].append(_answer_data(answer))
+
+        question_list = []
+        for q in questions:
+            loaded = answers_by_question[q.id]
+            question_list.append({
+                "id": q.id,
+                "title": q.title,
+                "content": q.content,
+                "asked_by": q.asked_by.username,
+                "is_answered": q.is_answered,
+                "answer_count": q.answer_count,
+                "accepted_answer": q.accepted_answer_id,
+                "created_at": q.created_at,
+                "answers": loaded,
+                "has_more_answers": q.answer_count > len(loaded),
+            })
+
+        return Response({
+            "lecture_id": lecture.id,
+            "page": page,
+            "page_size": page_size,
+            "has_next": has_next,
+            "questions": question_list,
+        }, status=status.HTTP_200_OK)
+
+
+class QuestionAnswersPageView(APIView):
+    """
+    Further answers of one question, oldest first (keyset pagination).
+    URL: /api/questions/<id>/answers/
+
+    Query Parameters:
+    - after: Return answers with an id greater than this (use 'next_after'
+             from the previous page, or the last answer id from the thread)
+    - limit: Answers per page (default 20, max 100)
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        try:
+            after = _int_param(request, 'after', 0, 0, 2**63 - 1)
+            limit = _int_param(request, 'limit', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            question = Question.objects.select_related('lecture').only(
+                'id', 'answer_count', 'lecture__id', 'lecture__class_assigned_id'
+            ).get(pk=pk)
+        except Question.DoesNotExist:
+            return Response({"error": "Question not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        if not _can_view_lecture(request.user, question.lecture):
+            return Response(
+                {"error": "You don't have access to this lecture."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        answers = list(
+            Answer.objects.filter(question=question, id__gt=after)
+            .select_related('answered_by')
+            .only(*ANSWER_FIELDS)
+            .order_by('id')[:limit + 1]
+        )
+        has_next = len(answers) > limit
+        answers = answers[:limit]
+
+        return Response({
+            "question_id": question.id,
+            "answer_count": question.answer_count,
+            "answers": [_answer_data(a) for a in answers],
+            "next_after": answers[-1].id if has_next else None,
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,230 @@
+"""
+In-process cache of the reference tables: School, Class and Subject.
+
+They are tiny and rarely change, yet nearly every request reads one of
+them (class and school names, subject names, user.assigned_class). Each
+process keeps all their rows in memory, tagged with the version in the
+ReferenceDataVersion row:
+
+  - every School/Class/Subject save or delete drops this process's copy,
+    and the first one in a transaction (or savepoint) sets a new version in
+    it (signals.py), so a bulk write updates the row once;
+  - the first lookup of each request compares the cached version with the
+    row (one primary-key query) and reloads all three tables when another
+    process changed them. Threads serving a request (the batch API's pool)
+    run in a copy of its context and share that check. Management commands
+    wrapped in reference_scope() check once per command; elsewhere (shell)
+    every lookup checks, so nothing is ever served stale.
+
+Foreign keys declared as ReferenceForeignKey resolve through the cache
+(lecture.subject, user.assigned_class, klass.school...) instead of
+issuing a query, unless the relation was already loaded with
+select_related(). FastReader (courses/fast_serializers.py) serializes
+sources such as 'class_assigned.name' the same way, without a join.
+Versions and rows are read from the primary, so a lagging replica cannot
+flip the cache back to older data. Writes that bypass signals
+(QuerySet.update(), raw SQL) must call bump_version().
+"""
+import asyncio
+import secrets
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.apps import apps
+from django.core.signals import request_finished, request_started
+from django.db import connections, models, router, transaction
+from django.db.models.fields.related_descriptors import ForwardManyToOneDescriptor
+from django.dispatch import receiver
+
+from .transaction_state import transaction_state
+
+REFERENCE_MODELS = ('School', 'Class', 'Subject')
+
+_lock = threading.Lock()
+_current = None
+# The request (or reference_scope()) being handled, and the (request,
+# snapshot) last validated in it
+_request = ContextVar('reference_request', default=None)
+_validated = ContextVar('reference_validated', default=(None, None))
+
+
+class ReferenceSnapshot:
+    """
+    The School, Class and Subject rows at one version.
+    """
+
+    def __init__(self, version, alias, rows):
+        self.version = version
+        self.alias = alias
+        self.rows = rows  # model -> (attnames, {pk: {attname: value}})
+
+    def row(self, model, pk):
+        """
+        {attname: value} of a row, or None if there is no such row.
+        """
+        return self.rows[model][1].get(pk)
+
+    def instance(self, model, pk):
+        """
+        A fresh model instance of a row, or None if there is no such row.
+        """
+        row = self.row(model, pk)
+        if row is None:
+            return None
+        attnames = self.rows[model][0]
+        # Fresh each time: callers may modify (and save) what they get
+        return model.from_db(self.alias, attnames, [row[name] for name in attnames])
+
+
+def _version_model():
+    return apps.get_model('courses', 'ReferenceDataVersion')
+
+
+def _alias():
+    return router.db_for_write(_version_model())
+
+
+def _load(version, alias):
+    rows = {}
+    for name in REFERENCE_MODELS:
+        model = apps.get_model('courses', name)
+        attnames = [field.attname for field in model._meta.concrete_fields]
+        rows[model] = (attnames, {
+            values[0]: dict(zip(attnames, values))
+            for values in model.objects.using(alias).values_list(*attnames)
+        })
+    return ReferenceSnapshot(version, alias, rows)
+
+
+def _in_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def reference_snapshot():
+    """
+    The current ReferenceSnapshot, checked against the version row once
+    per request (every call outside requests). Inside an event loop, where
+    no query can run, returns None unless already checked in this request.
+    """
+    global _current
+    snap, request = _current, _request.get()
+    if snap is not None and request is not None:
+        validated_request, validated_snap = _validated.get()
+        if validated_request is request and validated_snap is snap:
+            return snap
+    if _in_event_loop():
+        return None
+
+    alias = _alias()
+    version = _version_model().objects.using(alias).filter(pk=1).values_list('version', flat=True).first() or 0
+    with _lock:
+        snap = _current
+        if snap is None or snap.version != version:
+            snap = _current = _load(version, alias)
+    if request is not None:
+        _validated.set((request, snap))
+    return snap
+
+
+class _VersionBump:
+    """
+    The version set by a transaction, at one savepoint: later writes there
+    leave the row alone (courses/transaction_state.py).
+    """
+    def __init__(self):
+        self.done = False
+
+    def committed(self):
+        self.done = True
+
+
+def bump_version():
+    """
+    Mark the reference tables changed, so every process reloads them on
+    its next request. Called inside the writing transaction; only the first
+    call of a transaction writes the version row.
+    """
+    global _current
+    _current = None
+    alias = _alias()
+    # Per savepoint: rolling one back restores the version set outside it,
+    # which a snapshot loaded inside must not match
+    bump, created = transaction_state('reference_version', _VersionBump, using=alias)
+    if not created:
+        return
+    if connections[alias].in_atomic_block:
+        # Holds the state until the transaction (or savepoint) ends
+        transaction.on_commit(bump.committed, using=alias)
+    # A fresh random value rather than a counter: if this transaction rolls
+    # back, no later write can reuse the version a process cached meanwhile
+    version = secrets.randbits(62)
+    model = _version_model()
+    if not model.objects.using(alias).filter(pk=1).update(version=version):
+        model.objects.using(alias).update_or_create(pk=1, defaults={'version': version})
+
+
+class _Scope:
+    def __init__(self, outer):
+        self.outer = outer
+
+
+def _enter():
+    _request.set(_Scope(_request.get()))
+
+
+def _exit():
+    scope = _request.get()
+    # Back to the enclosing scope (a command's test client requests)
+    _request.set(scope.outer if scope is not None else None)
+
+
+@contextmanager
+def reference_scope():
+    """
+    Check the version once for everything inside, like a request does.
+    Also a decorator (management command handle() methods).
+    """
+    _enter()
+    try:
+        yield
+    finally:
+        _exit()
+
+
+@receiver(request_started)
+def _request_started(sender, **kwargs):
+    _enter()
+
+
+@receiver(request_finished)
+def _request_finished(sender, **kwargs):
+    _exit()
+
+
+class ReferenceDescriptor(ForwardManyToOneDescriptor):
+    def get_object(self, instance):
+        snap = reference_snapshot()
+        obj = None
+        if snap is not None:
+            obj = snap.instance(self.field.related_model, getattr(instance, self.field.attname))
+        if obj is None:
+            # Not in the cache: query, raising DoesNotExist as usual
+            return super().get_object(instance)
+        return obj
+
+
+class ReferenceForeignKey(models.ForeignKey):
+    """
+    ForeignKey to School, Class or Subject whose related object comes from
+    the reference cache. Same column and migrations as a ForeignKey.
+    """
+    forward_related_accessor_class = ReferenceDescriptor
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        return name, 'django.db.models.ForeignKey', args, kwargs
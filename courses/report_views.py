@@ -1,11 +1,100 @@
+import io
+
 import openpyxl
 from openpyxl.styles import Font, Alignment
-from django.http import HttpResponse
+from django.db import router
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from users.models import User
+from .archive import archived_attendance, needs_archive
+from .export import CONTENT_TYPES, EXTENSIONS, ExportError, export_attendance
 from .models import Attendance, Class
+from .permissions import IsSchoolAdmin, IsSuperAdmin
+from .singleflight import single_flight
+from users.models import Role
+
+
+def build_attendance_report(target_class, start_date=None, end_date=None):
+    """
+    The attendance report of a class as .xlsx bytes.
+    """
+    # Filter attendance records (student_class is denormalized onto
+    # Attendance, so this is a range scan on attendance_class_date_idx)
+    queryset = Attendance.objects.filter(student_class=target_class).select_related('student', 'lecture')
+
+    if start_date:
+        queryset = queryset.filter(date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(date__lte=end_date)
+        
+    # Order by date (newest first), then student name
+    queryset = queryset.order_by('-date', 'student__first_name')
+
+    # Create Excel Workbook
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = f"Attendance - {target_class.name}"
+
+    # --- Header Row ---
+    headers = ["Date", "Student Name", "Student Email", "Lecture Title", "Status"]
+    ws.append(headers)
+
+    # Style the header (Bold + Center)
+    for cell in ws[1]:
+        cell.font = Font(bold=True)
+        cell.alignment = Alignment(horizontal="center")
+
+    # --- Data Rows ---
+    for record in queryset:
+        status_text = "Present" if record.present else "Absent"
+        
+        row = [
+            record.date,
+            f"{record.student.first_name} {record.student.last_name}".strip(),
+            record.student.email,
+            record.lecture.title if record.lecture else "N/A",
+            status_text
+        ]
+        ws.append(row)
+
+    # Archived academic years, only if the requested range reaches them
+    if needs_archive(start_date):
+        archived = archived_attendance(start_date, end_date, student_class_id=target_class.id)
+        students = User.objects.only('first_name', 'last_name', 'email').in_bulk(
+            {record.student_id for record in archived}
+        ) if archived else {}
+        archived.sort(key=lambda r: students[r.student_id].first_name if r.student_id in students else '')
+        archived.sort(key=lambda r: r.date, reverse=True)
+        for record in archived:
+            student = students.get(record.student_id)
+            ws.append([
+                record.date,
+                f"{student.first_name} {student.last_name}".strip() if student else "N/A",
+                student.email if student else "N/A",
+                record.lecture.title if record.lecture else "N/A",
+                "Present" if record.present else "Absent",
+            ])
+
+    # Auto-adjust column widths
+    for col in ws.columns:
+        max_length = 0
+        column = col[0].column_letter
+        for cell in col:
+            try:
+                if len(str(cell.value)) > max_length:
+                    max_length = len(str(cell.value))
+            except:
+                pass
+        adjusted_width = (max_length + 2)
+        ws.column_dimensions[column].width = adjusted_width
+
+    content = io.BytesIO()
+    wb.save(content)
+    return content.getvalue()
+
 
 class AttendanceReportView(APIView):
     """
@@ -13,6 +102,7 @@ class AttendanceReportView(APIView):
     URL: /api/reports/attendance/
     """
     permission_classes = [IsAuthenticated]
+    use_read_replica = True
 
     def get(self, request):
         user = request.user
@@ -46,65 +136,62 @@ class AttendanceReportView(APIView):
         except Class.DoesNotExist:
             return Response({'error': 'Class not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-        # Filter attendance records
-        queryset = Attendance.objects.filter(student__assigned_class=target_class).select_related('student', 'lecture')
-
-        if start_date:
-            queryset = queryset.filter(date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(date__lte=end_date)
-            
-        # Order by date (newest first), then student name
-        queryset = queryset.order_by('-date', 'student__first_name')
-
-        # 4. Create Excel Workbook
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = f"Attendance - {target_class.name}"
-
-        # --- Header Row ---
-        headers = ["Date", "Student Name", "Student Email", "Lecture Title", "Status"]
-        ws.append(headers)
-
-        # Style the header (Bold + Center)
-        for cell in ws[1]:
-            cell.font = Font(bold=True)
-            cell.alignment = Alignment(horizontal="center")
-
-        # --- Data Rows ---
-        for record in queryset:
-            status_text = "Present" if record.present else "Absent"
-            
-            row = [
-                record.date,
-                f"{record.student.first_name} {record.student.last_name}".strip(),
-                record.student.email,
-                record.lecture.title if record.lecture else "N/A",
-                status_text
-            ]
-            ws.append(row)
-
-        # Auto-adjust column widths
-        for col in ws.columns:
-            max_length = 0
-            column = col[0].column_letter
-            for cell in col:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = (max_length + 2)
-            ws.column_dimensions[column].width = adjusted_width
+        # 4. Build the workbook; identical concurrent requests (a shared
+        # report link) wait for one build instead of each running it, and
+        # other workers never build it at the same time
+        content = single_flight(
+            ('attendance-report', target_class.pk, start_date, end_date),
+            lambda: build_attendance_report(target_class, start_date, end_date),
+            across_workers=True,
+        )
 
         # 5. Return File Response
         response = HttpResponse(
+            content,
             content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         )
         response['Content-Disposition'] = f'attachment; filename="Attendance_Report_{target_class.name}.xlsx"'
-        
-        wb.save(response)
         return response
-    
 
-    
\ No newline at end of file
+
+class AttendanceExportView(APIView):
+    """
+    Columnar attendance export for analytics (see courses/export.py).
+    URL: /api/reports/attendance/export/
+    Query Params: ?since=<watermark>&file_format=scol|arrow&school_id=<id>
+
+    Streams every attendance row changed since the watermark. The next
+    watermark is in the X-Export-Watermark header (and in the file).
+    School admins get their own school only.
+    """
+    permission_classes = [IsAuthenticated, IsSuperAdmin | IsSchoolAdmin]
+    use_read_replica = True
+
+    def get(self, request):
+        user = request.user
+        queryset = Attendance.objects.all()
+        if user.is_superuser or user.role == Role.SUPER_ADMIN:
+            school_id = request.query_params.get('school_id')
+            if school_id:
+                if not school_id.isdigit():
+                    return Response({'error': 'school_id must be a number.'}, status=status.HTTP_400_BAD_REQUEST)
+                queryset = queryset.filter(school_id=school_id)
+        else:
+            queryset = queryset.filter(school_id=user.school_id)
+
+        # The body is produced after this view returns, so pin the database
+        # chosen for this request (possibly a read replica) now
+        queryset = queryset.using(router.db_for_read(Attendance))
+
+        file_format = request.query_params.get('file_format', 'scol')
+        try:
+            watermark, chunks = export_attendance(
+                queryset, since=request.query_params.get('since'), file_format=file_format
+            )
+        except ExportError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[file_format])
+        response['X-Export-Watermark'] = watermark
+        response['Content-Disposition'] = f'attachment; filename="attendance-{watermark}.{EXTENSIONS[file_format]}"'
+        return response
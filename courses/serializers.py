@@ -1,3 +1,7 @@
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models.signals import post_save
+from django.utils import timezone
 from rest_framework import serializers
 from .models import (
     School, 
@@ -10,15 +14,151 @@ from .models import (
     Answer
 )
 
+# --- Bulk support (the /bulk/ action of the course viewsets) ---
+
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that, inside a BulkListSerializer, looks ids up
+    in one in_bulk() per field per request instead of one query per item.
+    """
+    bulk_cache = None
+
+    def to_internal_value(self, data):
+        if self.bulk_cache is None:
+            return super().to_internal_value(data)
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        try:
+            if isinstance(data, (bool, float)):
+                raise TypeError
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        instance = self.bulk_cache.get(pk)
+        if instance is None:
+            self.fail('does_not_exist', pk_value=data)
+        return instance
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    many=True serializer behind the bulk create / update actions.
+
+    Items are validated one by one as usual, but their related ids are
+    fetched up front with one in_bulk() per field. create() and update()
+    write with bulk_create / bulk_update and then send the post_save
+    signals save() would have sent. A child serializer can define
+    bulk_prepare(instance) (and list the fields it sets in
+    bulk_prepared_fields) for what its model's save() computes.
+
+    Updates match items to instances by their "id", and each instance
+    writes only the fields its own item set (instances with the same
+    fields share one bulk_update), so a field left out of an item is not
+    overwritten with the value read before the request.
+    """
+    batch_size = 500
+
+    def _related_fields(self):
+        return [
+            field for field in self.child.fields.values()
+            if isinstance(field, CachedPrimaryKeyRelatedField) and not field.read_only
+        ]
+
+    def to_internal_value(self, data):
+        fields = self._related_fields() if isinstance(data, list) else []
+        for field in fields:
+            ids = set()
+            for item in data:
+                value = item.get(field.field_name) if isinstance(item, dict) else None
+                if isinstance(value, int) and not isinstance(value, bool):
+                    ids.add(value)
+                elif isinstance(value, str) and value.isdigit():
+                    ids.add(int(value))
+            field.bulk_cache = field.get_queryset().in_bulk(ids)
+        self._by_id = {str(obj.pk): obj for obj in self.instance} if self.instance is not None else {}
+        self._matched = []
+        self._seen_ids = set()
+        try:
+            return super().to_internal_value(data)
+        finally:
+            for field in fields:
+                field.bulk_cache = None
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            pk = str(data.get('id')) if isinstance(data, dict) else None
+            instance = self._by_id.get(pk) if pk not in self._seen_ids else None
+            if instance is None:
+                raise serializers.ValidationError({'id': ['Missing, unknown or repeated id.']})
+            self._seen_ids.add(pk)
+            self._matched.append(instance)
+            self.child.instance = instance
+            self.child.initial_data = data
+        return super().run_child_validation(data)
+
+    def _prepare(self, instance):
+        prepare = getattr(self.child, 'bulk_prepare', None)
+        if prepare is not None:
+            prepare(instance)
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        instances = [model(**attrs) for attrs in validated_data]
+        for instance in instances:
+            self._prepare(instance)
+
+        using = router.db_for_write(model)
+        with transaction.atomic(using=using):
+            if connections[using].features.can_return_rows_from_bulk_insert:
+                model.objects.bulk_create(instances, batch_size=self.batch_size)
+                for instance in instances:
+                    post_save.send(
+                        sender=model, instance=instance, created=True, update_fields=None, raw=False, using=using
+                    )
+            else:
+                # MySQL returns no primary keys from bulk inserts
+                for instance in instances:
+                    instance.save(using=using)
+        return instances
+
+    def update(self, instances, validated_data):
+        model = self.child.Meta.model
+        instances = self._matched
+        auto_now = [f for f in model._meta.concrete_fields if getattr(f, 'auto_now', False)]
+        always = {f.name for f in auto_now} | set(getattr(self.child, 'bulk_prepared_fields', ()))
+        now = timezone.now()
+        groups = {}  # fields -> instances updating exactly those
+        for instance, attrs in zip(instances, validated_data):
+            for attr, value in attrs.items():
+                setattr(instance, attr, value)
+            for field in auto_now:
+                setattr(instance, field.attname, now)  # bulk_update skips auto_now
+            self._prepare(instance)
+            groups.setdefault(frozenset(always | attrs.keys()), []).append(instance)
+
+        using = router.db_for_write(model)
+        with transaction.atomic(using=using):
+            for fields, group in groups.items():
+                model.objects.bulk_update(group, sorted(fields), batch_size=self.batch_size)
+                for instance in group:
+                    post_save.send(
+                        sender=model, instance=instance, created=False,
+                        update_fields=fields, raw=False, using=using,
+                    )
+        return instances
+
+
 # --- Core CRUD Serializers ---
 
 class SchoolSerializer(serializers.ModelSerializer):
     class Meta:
         model = School
         fields = ['id', 'name', 'address']
+        list_serializer_class = BulkListSerializer
 
 
 class ClassSerializer(serializers.ModelSerializer):
+    serializer_related_field = CachedPrimaryKeyRelatedField
     school_name = serializers.CharField(source='school.name', read_only=True)
     
     class Meta:
@@ -27,15 +167,19 @@ class ClassSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'school': {'write_only': True}
         }
+        list_serializer_class = BulkListSerializer
 
 
 class SubjectSerializer(serializers.ModelSerializer):
     class Meta:
         model = Subject
         fields = ['id', 'name']
+        list_serializer_class = BulkListSerializer
 
 
 class LectureSerializer(serializers.ModelSerializer):
+    serializer_related_field = CachedPrimaryKeyRelatedField
+    bulk_prepared_fields = ('school',)
     class_assigned_name = serializers.CharField(source='class_assigned.name', read_only=True)
     subject_name = serializers.CharField(source='subject.name', read_only=True)
     
@@ -54,6 +198,11 @@ class LectureSerializer(serializers.ModelSerializer):
             'subject': {'write_only': True},
         }
         read_only_fields = ['uploaded_at']
+        list_serializer_class = BulkListSerializer
+
+    def bulk_prepare(self, instance):
+        # What Lecture.save() does; class_assigned is already loaded
+        instance.school_id = instance.class_assigned.school_id if instance.class_assigned else None
 
 
 class AttendanceSerializer(serializers.ModelSerializer):
@@ -87,6 +236,7 @@ class AnnouncementSerializer(serializers.ModelSerializer):
     Serializer for Announcements.
     Matches your actual model structure with title, priority, etc.
     """
+    serializer_related_field = CachedPrimaryKeyRelatedField
     posted_by_username = serializers.CharField(source='posted_by.username', read_only=True)
     target_class_name = serializers.CharField(source='target_class.name', read_only=True)
     school_name = serializers.CharField(source='target_class.school.name', read_only=True)
@@ -111,6 +261,7 @@ class AnnouncementSerializer(serializers.ModelSerializer):
             'target_class': {'write_only': True},
         }
         read_only_fields = ['posted_by_username', 'target_class_name', 'school_name', 'created_at', 'updated_at']
+        list_serializer_class = BulkListSerializer
     
     def create(self, validated_data):
         """
@@ -156,6 +307,14 @@ class AnswerSerializer(serializers.ModelSerializer):
             validated_data['answered_by'] = request.user
         return super().create(validated_data)
 
+    def update(self, instance, validated_data):
+        """
+        Answers can't be moved to another question once posted
+        (the question's answer_count is tracked per answer).
+        """
+        validated_data.pop('question', None)
+        return super().update(instance, validated_data)
+
 
 class QuestionSerializer(serializers.ModelSerializer):
     """
@@ -167,7 +326,6 @@ class QuestionSerializer(serializers.ModelSerializer):
     
     # Nested answers - shows all answers for this question
     answers = AnswerSerializer(many=True, read_only=True)
-    answer_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Question
@@ -180,6 +338,7 @@ class QuestionSerializer(serializers.ModelSerializer):
             'lecture',
             'lecture_title',
             'is_answered',
+            'accepted_answer',
             'answers',
             'answer_count',
             'created_at',
@@ -189,13 +348,8 @@ class QuestionSerializer(serializers.ModelSerializer):
             'asked_by': {'write_only': True},
             'lecture': {'write_only': True},
         }
-        read_only_fields = ['is_answered', 'created_at', 'updated_at']
-    
-    def get_answer_count(self, obj):
-        """
-        Return the number of answers for this question.
-        """
-        return obj.answers.count()
+        # Q&A state is maintained by Answer.save()/delete()/accept()
+        read_only_fields = ['is_answered', 'accepted_answer', 'answer_count', 'created_at', 'updated_at']
     
     def create(self, validated_data):
         """
@@ -210,6 +364,21 @@ class QuestionSerializer(serializers.ModelSerializer):
 class AttendanceUploadSerializer(serializers.Serializer):
     """    Serializer for attendance Excel file upload."""
     file = serializers.FileField()
+
+
+class AttendanceBulkSerializer(serializers.Serializer):
+    """
+    Envelope of the bulk attendance API. The items themselves are checked
+    by courses/bulk.py, which reports errors per item.
+    """
+    records = serializers.ListField(child=serializers.JSONField(), allow_empty=False)
+
+    def validate_records(self, value):
+        limit = getattr(settings, 'ATTENDANCE_BULK_MAX_RECORDS', 5000)
+        if len(value) > limit:
+            raise serializers.ValidationError(f"At most {limit} records per request.")
+        return value
+
 class ChangePasswordSerializer(serializers.Serializer):
     old_password = serializers.CharField(required=True, style={'input_type': 'password'})
     new_password = serializers.CharField(required=True, style={'input_type': 'password'})
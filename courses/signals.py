@@ -0,0 +1,217 @@
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Q
+from django.db.models.functions import Now
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .events import publish_announcement
+from .catalog import invalidate_catalogs, schedule_catalog_update
+from .models import (
+    Announcement, Answer, Attendance, AttendanceArchive, Class, Lecture, Question, School, Subject, Tombstone,
+)
+from .reference import bump_version
+from .sync import add_tombstone, attendance_moving
+from .transaction_state import transaction_state
+
+
+@receiver(post_save, sender=Announcement)
+def announcement_saved(sender, instance, created, **kwargs):
+    """
+    Push new/edited announcements to the SSE stream once the write commits.
+    """
+    event_type = "created" if created else "updated"
+    transaction.on_commit(lambda: publish_announcement(instance, event_type))
+
+
+@receiver(post_delete, sender=Announcement)
+def announcement_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: publish_announcement(instance, "deleted"))
+
+
+# --- Question Q&A state (answer_count / is_answered) ---
+
+@receiver(pre_delete, sender=Answer)
+def answer_deleted(sender, instance, origin=None, **kwargs):
+    """
+    Every way an answer goes (instance or queryset delete, a cascade from
+    the answering user) updates its question before the row is deleted,
+    except the question's own deletion.
+    """
+    if isinstance(origin, Question) or getattr(origin, 'model', None) is Question:
+        return
+    instance.removed()
+
+
+@receiver(pre_delete, sender=Question)
+def question_deleted(sender, instance, **kwargs):
+    # Its answers are deleted first: drop the pointer to the accepted one
+    if instance.accepted_answer_id:
+        Question.objects.filter(pk=instance.pk).update(accepted_answer=None)
+
+
+# --- Denormalized tenant keys (Lecture.school, Attendance.student_class/school) ---
+
+def _touches(update_fields, *fields):
+    return update_fields is None or any(f in update_fields for f in fields)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def student_moved(sender, instance, created, update_fields=None, **kwargs):
+    """
+    A student changed class or school: re-tag their attendance rows, live
+    and archived. Indexed UPDATEs that only touch rows that differ, skipped
+    for saves like the last_login update on every login.
+    """
+    if created or not _touches(update_fields, 'assigned_class', 'school'):
+        return
+    # updated_at is bumped so incremental exports pick the change up
+    Attendance.objects.filter(student_id=instance.pk).exclude(
+        Q(student_class_id=instance.assigned_class_id) & Q(school_id=instance.school_id)
+    ).update(student_class_id=instance.assigned_class_id, school_id=instance.school_id, updated_at=Now())
+    AttendanceArchive.objects.filter(student_id=instance.pk).exclude(
+        Q(student_class_id=instance.assigned_class_id) & Q(school_id=instance.school_id)
+    ).update(student_class_id=instance.assigned_class_id, school_id=instance.school_id)
+
+
+@receiver(post_save, sender=Class)
+def class_moved(sender, instance, created, update_fields=None, **kwargs):
+    """
+    A class moved to another school: re-tag its lectures.
+    """
+    if created or not _touches(update_fields, 'school'):
+        return
+    # updated_at is bumped so delta syncs pick the change up
+    Lecture.objects.filter(class_assigned_id=instance.pk).exclude(
+        school_id=instance.school_id
+    ).update(school_id=instance.school_id, updated_at=Now())
+
+
+# --- Names shown in other rows' payloads (ETags, delta sync) ---
+
+class _RenamedSubjects:
+    """
+    The subjects saved in one transaction, whose lectures are touched once
+    it commits (one UPDATE for a bulk PATCH of N subjects).
+    """
+    def __init__(self):
+        self.ids = set()
+        self.done = False  # see courses/transaction_state.py
+
+    def run(self):
+        self.done = True
+        Lecture.objects.filter(subject_id__in=self.ids).update(updated_at=Now())
+
+
+@receiver(post_save, sender=Subject)
+def subject_renamed(sender, instance, created, **kwargs):
+    """
+    Lectures show their subject's name: a rename bumps their updated_at,
+    which the lecture ETags and delta syncs read.
+    """
+    if created:
+        return
+    using = router.db_for_write(Lecture)
+    renamed, first = transaction_state('renamed_subjects', _RenamedSubjects, using=using)
+    renamed.ids.add(instance.pk)
+    if first:
+        transaction.on_commit(renamed.run, using=using)
+
+
+@receiver(pre_delete, sender=Subject)
+def subject_deleted(sender, instance, **kwargs):
+    # Its lectures' subject is emptied next, which leaves updated_at as is
+    Lecture.objects.filter(subject_id=instance.pk).update(updated_at=Now())
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def poster_renamed(sender, instance, created, **kwargs):
+    """
+    Announcements show their poster's username: a rename bumps their
+    updated_at (dashboard ETag, delta sync).
+    """
+    # User.save() updates _loaded_username after this signal
+    previous = getattr(instance, '_loaded_username', None)
+    if not created and previous is not None and previous != instance.username:
+        Announcement.objects.filter(posted_by_id=instance.pk).update(updated_at=Now())
+
+
+# --- Tombstones for delta sync (courses/sync.py) ---
+
+@receiver(post_delete, sender=Lecture)
+def lecture_deleted(sender, instance, **kwargs):
+    if instance.class_assigned_id:
+        add_tombstone(Tombstone.LECTURE, instance.pk, student_class_id=instance.class_assigned_id)
+
+
+@receiver(post_save, sender=Lecture)
+def lecture_moved(sender, instance, created, **kwargs):
+    """
+    A lecture moved to another class disappears for the old class.
+    """
+    # Lecture.save() updates _loaded_class_assigned_id after this signal
+    previous = getattr(instance, '_loaded_class_assigned_id', None)
+    if not created and previous and previous != instance.class_assigned_id:
+        add_tombstone(Tombstone.LECTURE, instance.pk, student_class_id=previous)
+
+
+@receiver(post_delete, sender=Announcement)
+def announcement_tombstone(sender, instance, **kwargs):
+    add_tombstone(Tombstone.ANNOUNCEMENT, instance.pk, student_class_id=instance.target_class_id)
+
+
+@receiver(post_save, sender=Announcement)
+def announcement_moved(sender, instance, created, **kwargs):
+    """
+    An announcement retargeted to another class disappears for the old one.
+    """
+    # Announcement.save() updates _loaded_target_class_id after this signal
+    previous = getattr(instance, '_loaded_target_class_id', None)
+    if not created and previous and previous != instance.target_class_id:
+        add_tombstone(Tombstone.ANNOUNCEMENT, instance.pk, student_class_id=previous)
+
+
+@receiver(post_delete, sender=Attendance)
+def attendance_tombstone(sender, instance, **kwargs):
+    """
+    Every way a record goes (API, bulk API, admin, queryset deletes, a
+    cascade), except archiving, which moves it (moving_attendance()).
+    """
+    if not attendance_moving():
+        add_tombstone(Tombstone.ATTENDANCE, instance.pk, student_id=instance.student_id)
+
+
+# --- Per-class lecture catalogs (courses/catalog.py) ---
+
+@receiver(post_save, sender=Lecture)
+def lecture_catalog_saved(sender, instance, created, **kwargs):
+    # Lecture.save() updates _loaded_class_assigned_id after this signal
+    class_ids = {instance.class_assigned_id, getattr(instance, '_loaded_class_assigned_id', None)} - {None}
+    if class_ids:
+        schedule_catalog_update(instance.pk, class_ids)
+
+
+@receiver(post_delete, sender=Lecture)
+def lecture_catalog_deleted(sender, instance, **kwargs):
+    if instance.class_assigned_id:
+        schedule_catalog_update(instance.pk, [instance.class_assigned_id])
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def subject_changed(sender, instance, created=False, **kwargs):
+    # Subject names are rendered into every catalog listing them
+    if not created:
+        transaction.on_commit(invalidate_catalogs, robust=True)
+
+
+# --- In-process reference cache (courses/reference.py) ---
+
+@receiver(post_save, sender=School)
+@receiver(post_delete, sender=School)
+@receiver(post_save, sender=Class)
+@receiver(post_delete, sender=Class)
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def reference_changed(sender, instance, **kwargs):
+    bump_version()
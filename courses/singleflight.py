@@ -0,0 +1,188 @@
+"""
+Single-flight coalescing of expensive read computations.
+
+    data = single_flight(('attendance-report', class_id, start, end), lambda: build(...), across_workers=True)
+    data = await asingle_flight(key, build_coroutine_function)
+
+Calls with the same key made while one is already computing don't compute
+again: they wait for it and get its result (or its exception). Nothing is
+kept once the computation finishes; a later call computes afresh, so this
+adds no staleness beyond the overlap itself. The key must hold everything
+the result depends on (route name first, then parameters and, where a
+response carries an ETag, the validators). Results are shared, so callers
+must not modify them.
+
+Within a process, threads wait on the first caller's Event and coroutines
+on its future. No query is involved, so cheap computations (the student
+dashboard) can use it freely.
+
+With across_workers=True (the attendance report), the first caller of a
+process also holds a database advisory lock on the key while computing
+(pg_try_advisory_lock on PostgreSQL, GET_LOCK on MySQL; none elsewhere).
+A worker that finds the lock taken waits for it, backing off from
+SINGLE_FLIGHT_LOCK_BACKOFF_SECONDS, then computes itself: results are not
+handed across workers, but the same expensive computation never runs in
+several workers at once. Past SINGLE_FLIGHT_TIMEOUT_SECONDS it computes
+without the lock.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections, router
+
+from scholiv_lms.metrics import registry
+from .models import Attendance
+
+_lock = threading.Lock()
+_calls = {}    # digest -> _Call (threads)
+_futures = {}  # (event loop, digest) -> asyncio.Future (coroutines)
+
+MAX_LOCK_BACKOFF_SECONDS = 1.0
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _digest(key):
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+def _count(key, role):
+    registry.inc('singleflight_calls_total', computation=key[0], role=role)
+
+
+def _try_lock(connection, digest):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Signed 60-bit key of the digest
+            cursor.execute('SELECT pg_try_advisory_lock(%s)', [int(digest[:15], 16)])
+        else:
+            cursor.execute('SELECT GET_LOCK(%s, 0)', [f'singleflight:{digest}'])
+        return bool(cursor.fetchone()[0])
+
+
+def _unlock(connection, digest):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT pg_advisory_unlock(%s)', [int(digest[:15], 16)])
+        else:
+            cursor.execute('SELECT RELEASE_LOCK(%s)', [f'singleflight:{digest}'])
+
+
+@contextmanager
+def _worker_lock(digest):
+    """
+    Hold the key's advisory lock, waiting for another worker holding it.
+    Yields the role of the caller: 'leader' with the lock, 'waited' after
+    waiting for it, 'uncoalesced' if it timed out waiting.
+    """
+    connection = connections[router.db_for_write(Attendance)]
+    if connection.vendor not in ('postgresql', 'mysql'):
+        yield 'leader'
+        return
+
+    role = 'leader'
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_TIMEOUT_SECONDS
+    backoff = settings.SINGLE_FLIGHT_LOCK_BACKOFF_SECONDS
+    locked = _try_lock(connection, digest)
+    while not locked:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            role = 'uncoalesced'
+            break
+        time.sleep(min(backoff, remaining))
+        backoff = min(backoff * 2, MAX_LOCK_BACKOFF_SECONDS)
+        role = 'waited'
+        locked = _try_lock(connection, digest)
+    try:
+        yield role
+    finally:
+        if locked:
+            _unlock(connection, digest)
+
+
+def _compute(key, digest, compute, across_workers):
+    if not across_workers:
+        _count(key, 'leader')
+        return compute()
+    with _worker_lock(digest) as role:
+        _count(key, role)
+        return compute()
+
+
+def single_flight(key, compute, across_workers=False):
+    """
+    compute(), or the result of the identical call (same key) already
+    running in this process. With across_workers, also never at the same
+    time as the identical call in another worker.
+    """
+    digest = _digest(key)
+    with _lock:
+        call = _calls.get(digest)
+        leader = call is None
+        if leader:
+            call = _calls[digest] = _Call()
+
+    if not leader:
+        if not call.done.wait(settings.SINGLE_FLIGHT_TIMEOUT_SECONDS):
+            _count(key, 'uncoalesced')
+            return compute()
+        _count(key, 'follower')
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = _compute(key, digest, compute, across_workers)
+    except BaseException as exc:
+        call.error = exc
+        raise
+    finally:
+        with _lock:
+            del _calls[digest]
+        call.done.set()
+    return call.result
+
+
+async def asingle_flight(key, compute):
+    """
+    Async single_flight(): await compute() (a coroutine function), or the
+    result of the identical call already running in this event loop.
+    """
+    loop = asyncio.get_running_loop()
+    digest = _digest(key)
+    future = _futures.get((loop, digest))
+
+    if future is not None:
+        await asyncio.wait({future}, timeout=settings.SINGLE_FLIGHT_TIMEOUT_SECONDS)
+        if future.done() and not future.cancelled():
+            _count(key, 'follower')
+            return future.result()
+        # Timed out, or the first caller was cancelled
+        _count(key, 'uncoalesced')
+        return await compute()
+
+    future = _futures[loop, digest] = loop.create_future()
+    _count(key, 'leader')
+    try:
+        result = await compute()
+    except Exception as exc:
+        future.set_exception(exc)
+        future.exception()  # retrieved: no "never retrieved" warning without followers
+        raise
+    except BaseException:
+        future.cancel()
+        raise
+    else:
+        future.set_result(result)
+    finally:
+        del _futures[loop, digest]
+    return result
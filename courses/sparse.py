@@ -0,0 +1,111 @@
+"""
+Sparse fieldsets: ?fields=id,title on the course APIs.
+
+    GET /api/lectures/?fields=id,title,subject_name
+
+The response holds only the named fields, and the query loads only the
+columns they need (only() / values_list(), with joins for related names
+and select_related() trimmed to match), so long TEXT columns such as
+Lecture.description are neither read nor sent unless asked for. Unknown
+names answer 400 with the list of available ones. Without the parameter
+nothing changes.
+"""
+from functools import cached_property
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.exceptions import ValidationError
+
+from .fast_serializers import FastReader
+
+PARAM = 'fields'
+
+
+def requested_fields(request, available):
+    """
+    The names in ?fields=, in `available` order, or None when the parameter
+    is absent. Raises ValidationError (400) for unknown or no names.
+    """
+    raw = request.GET.get(PARAM)
+    if raw is None:
+        return None
+    names = {name.strip() for name in raw.split(',') if name.strip()}
+    if not names:
+        raise ValidationError({PARAM: ["Name at least one field."]})
+    unknown = sorted(names - set(available))
+    if unknown:
+        raise ValidationError({PARAM: [
+            f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(available)}."
+        ]})
+    return tuple(name for name in available if name in names)
+
+
+def _select_related_paths(tree, prefix=''):
+    for name, children in tree.items():
+        path = f'{prefix}{name}'
+        if children:
+            yield from _select_related_paths(children, f'{path}__')
+        else:
+            yield path
+
+
+def load_only(queryset, columns):
+    """
+    queryset.only(*columns), dropping the select_related() joins the columns
+    don't reach (Django refuses to defer a relation it follows).
+    """
+    relations = set()
+    for column in columns:
+        parts = column.split('__')
+        relations.update('__'.join(parts[:i]) for i in range(1, len(parts)))
+    selected = queryset.query.select_related
+    if isinstance(selected, dict):
+        kept = set()
+        for path in _select_related_paths(selected):
+            parts = path.split('__')
+            reached = [p for p in ('__'.join(parts[:i]) for i in range(1, len(parts) + 1)) if p in relations]
+            if reached:
+                kept.add(reached[-1])
+        queryset = queryset.select_related(None)
+        if kept:
+            queryset = queryset.select_related(*sorted(kept))
+    elif selected:
+        # select_related() without names follows every non-null FK
+        queryset = queryset.select_related(None)
+    return queryset.only(*columns)
+
+
+class SparseFieldsMixin:
+    """
+    ModelViewSet mixin: ?fields= on list and retrieve trims the serializer
+    and the columns the queryset loads.
+    """
+    sparse_actions = ('list', 'retrieve')
+
+    @cached_property
+    def sparse_fields(self):
+        if self.action not in self.sparse_actions:
+            return None
+        serializer_class = self.get_serializer_class()
+        available = [name for name, field in serializer_class().fields.items() if not field.write_only]
+        return requested_fields(self.request, available)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.sparse_fields is not None:
+            target = getattr(serializer, 'child', serializer)
+            for name, field in list(target.fields.items()):
+                if not field.write_only and name not in self.sparse_fields:
+                    del target.fields[name]
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.sparse_fields is None:
+            return queryset
+        try:
+            reader = FastReader.for_serializer(self.get_serializer_class(), self.sparse_fields)
+        except ImproperlyConfigured:
+            # A requested field needs instances (e.g. nested answers): load as usual
+            return queryset
+        # Columns and forward joins only, so no prefetch is needed either
+        return load_only(queryset.prefetch_related(None), reader.columns)
@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+
+from users.models import Role
+from .async_utils import aget_user
+from .events import get_backend, get_setting
+from .models import Class
+
+
+def _format_event(event):
+    data = json.dumps(event, separators=(',', ':'))
+    return f"event: announcement\ndata: {data}\n\n".encode()
+
+
+async def _announcement_events(channel):
+    keepalive = get_setting('ANNOUNCEMENT_EVENTS_KEEPALIVE', 15)
+    async with get_backend().subscribe(channel) as queue:
+        yield b"retry: 5000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing an idle connection
+                yield b": keep-alive\n\n"
+                continue
+            yield _format_event(event)
+
+
+async def announcement_stream(request, class_id):
+    """
+    Server-Sent Events stream of announcements for one class.
+    URL: /api/announcements/stream/<class_id>/
+
+    Emits an 'announcement' event whenever an announcement for the class is
+    created, updated or deleted (see courses/events.py). Students may only
+    subscribe to their own class, other users to classes of their school
+    (super admins to any). Requires the app to be served over ASGI
+    (scholiv_lms/asgi.py), where each open stream is just a coroutine.
+    """
+    if request.method != 'GET':
+        return JsonResponse({"error": "Method not allowed."}, status=405)
+
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"error": "The announcement stream is only available when served over ASGI."},
+            status=501
+        )
+
+    user = await aget_user(request)
+    if not user.is_authenticated:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+    unrestricted = user.is_superuser or user.role == Role.SUPER_ADMIN
+    if not unrestricted and user.role == Role.STUDENT and user.assigned_class_id != class_id:
+        return JsonResponse({"error": "You can only follow announcements for your own class."}, status=403)
+
+    school_id = await Class.objects.filter(pk=class_id).values_list('school_id', flat=True).afirst()
+    if school_id is None:
+        return JsonResponse({"error": "Class not found."}, status=404)
+    if not unrestricted and user.school_id != school_id:
+        return JsonResponse({"error": "You can only follow announcements for classes of your school."}, status=403)
+
+    response = StreamingHttpResponse(
+        _announcement_events(class_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable nginx response buffering
+    return response
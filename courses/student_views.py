@@ -3,10 +3,16 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 from django.db.models import Count, Q
+from django.http import HttpResponse
 from django.utils import timezone
 from datetime import timedelta
 from .serializers import ChangePasswordSerializer
-from .models import Lecture, Attendance, Announcement, Subject
+from .conditional import compute_validators, not_modified, set_validators, signed_url_epoch
+from .models import Lecture, LectureCatalogSnapshot, Attendance, AttendanceArchive, Announcement
+from .archive import archived_attendance, archived_totals, merge_by_date, needs_archive
+from .singleflight import single_flight
+from .sparse import load_only, requested_fields
+from .catalog import LECTURE_LIST_FIELDS, class_subjects, lecture_catalog, render_catalog
 from users.models import Role
 
 
@@ -21,12 +27,328 @@ class IsStudent(IsAuthenticated):
         return request.user.role == Role.STUDENT or request.user.is_superuser
 
 
+# Fields of the student's own row that appear in the dashboard payload
+DASHBOARD_USER_FIELDS = (
+    'username', 'first_name', 'last_name', 'email',
+    'assigned_class__name', 'school__name',
+)
+
+
+# ===========================
+# SHARED QUERY & RESPONSE BUILDERS
+# Used by the views below and by their async twins in
+# async_student_views.py, so both stacks return identical payloads.
+# ===========================
+
+def dashboard_validator_sources(user, student_class, one_week_ago):
+    class_announcements = Announcement.objects.filter(target_class=student_class)
+    return {
+        "attendance": (Attendance.objects.filter(student=user), "updated_at"),
+        "archive": (AttendanceArchive.objects.filter(student=user), "archived_at"),
+        "lectures": (Lecture.objects.filter(class_assigned=student_class), "updated_at"),
+        "announcements": (class_announcements, "updated_at"),
+        "new_announcements": (class_announcements.filter(created_at__gte=one_week_ago), None),
+    }
+
+
+def lectures_validator_sources(user, student_class):
+    return {
+        "lectures": (Lecture.objects.filter(class_assigned=student_class), "updated_at"),
+        "watched": (Attendance.objects.filter(student=user, watched_video=True), "updated_at"),
+        # The catalog is updated after the lecture writes commit
+        "catalog": (LectureCatalogSnapshot.objects.filter(student_class=student_class), "built_at"),
+    }
+
+
+def lectures_validators(request, user, student_class, from_catalog=False):
+    """
+    The lecture list's validators. For a response served from_catalog, a
+    catalog that isn't built (yet, or again) is built first, so it carries
+    the ETag the next request will compute.
+    """
+    def compute():
+        return compute_validators(
+            request,
+            lectures_validator_sources(user, student_class),
+            user_fields=('assigned_class__name',),
+            salt=signed_url_epoch()
+        )
+
+    validators = compute()
+    if from_catalog and validators.row.get('catalog_latest') is None:
+        lecture_catalog(student_class.pk)
+        validators = compute()
+    return validators
+
+
+def attendance_validator_sources(user, queryset, include_archive=False):
+    sources = {
+        "attendance": (queryset, "updated_at"),
+        "lectures": (Lecture.objects.filter(attendance__student=user), "updated_at"),
+    }
+    if include_archive:
+        sources["archive"] = (AttendanceArchive.objects.filter(student=user), "archived_at")
+    return sources
+
+
+def filter_class_lectures(student_class, subject_id=None, search_query=None):
+    """
+    Lectures of a class, newest first, optionally filtered by subject and
+    a title/topic/description search.
+    """
+    lectures = Lecture.objects.filter(
+        class_assigned=student_class
+    ).select_related('subject').order_by('-uploaded_at')
+    
+    if subject_id:
+        lectures = lectures.filter(subject_id=subject_id)
+    
+    if search_query:
+        lectures = lectures.filter(
+            Q(title__icontains=search_query) |
+            Q(topic__icontains=search_query) |
+            Q(description__icontains=search_query)
+        )
+    return lectures
+
+
+def attendance_queryset(user, start_date=None, end_date=None):
+    queryset = Attendance.objects.filter(student=user).select_related('lecture').order_by('-date')
+    if start_date:
+        queryset = queryset.filter(date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(date__lte=end_date)
+    return queryset
+
+
+def build_dashboard_sections(total_lectures, recent_lectures, new_announcements_count, recent_announcements):
+    """
+    The dashboard's "lectures" and "announcements": the same for every
+    student of a class.
+    """
+    return {
+        "lectures": {
+            "total_count": total_lectures,
+            "recent": [
+                {
+                    "id": lecture.id,
+                    "title": lecture.title,
+                    "subject": lecture.subject.name if lecture.subject else None,
+                    "topic": lecture.topic,
+                    "uploaded_at": lecture.uploaded_at,
+                    "has_video": bool(lecture.video_file or lecture.video_url),
+                }
+                for lecture in recent_lectures
+            ]
+        },
+        "announcements": {
+            "new_count": new_announcements_count,
+            "recent": [
+                {
+                    "id": announcement.id,
+                    "title": announcement.title,
+                    "content": announcement.content[:100] + "..." if announcement.content and len(announcement.content) > 100 else announcement.content,
+                    "priority": announcement.priority,
+                    "posted_by": announcement.posted_by.username,
+                    "created_at": announcement.created_at,
+                }
+                for announcement in recent_announcements
+            ]
+        }
+    }
+
+
+def dashboard_sections_key(student_class, validators):
+    """
+    single_flight() key of a class's dashboard sections: students of the
+    class whose validators agree on its lectures and announcements share
+    one computation.
+    """
+    return ('student-dashboard', student_class.pk, validators.digest('lectures', 'announcements', 'new_announcements'))
+
+
+def class_dashboard_sections(student_class, one_week_ago):
+    lectures = Lecture.objects.filter(class_assigned=student_class).order_by('-uploaded_at')
+    announcements = Announcement.objects.filter(target_class=student_class).select_related('posted_by').order_by('-created_at')
+    return build_dashboard_sections(
+        lectures.count(), lectures[:5],
+        announcements.filter(created_at__gte=one_week_ago).count(), announcements[:3],
+    )
+
+
+def build_dashboard(user, student_class, total_attendance_records, present_count, sections):
+    if total_attendance_records > 0:
+        attendance_percentage = round((present_count / total_attendance_records) * 100, 1)
+    else:
+        attendance_percentage = 0.0
+
+    return {
+        "student": {
+            "id": user.id,
+            "username": user.username,
+            "full_name": f"{user.first_name} {user.last_name}".strip() or user.username,
+            "email": user.email,
+            "class_name": student_class.name if student_class else None,
+            "school_name": user.school.name if user.school else None,
+        },
+        "attendance": {
+            "percentage": attendance_percentage,
+            "total_records": total_attendance_records,
+            "present_count": present_count,
+            "absent_count": total_attendance_records - present_count,
+        },
+        **sections,
+    }
+
+
+def lecture_list_fields(request):
+    """
+    The ?fields= keys of the lecture list, or None for all (400 if unknown).
+    """
+    return requested_fields(request, list(LECTURE_LIST_FIELDS))
+
+
+def load_lecture_list_fields(lectures, fields):
+    """
+    Restrict the lectures queryset to the columns of the requested keys.
+    """
+    if fields is None:
+        return lectures
+    return load_only(lectures, sorted({column for key in fields for column in LECTURE_LIST_FIELDS[key][0]}))
+
+
+def catalog_servable(student_class, subject_id, search_query, fields):
+    """
+    Whether the lecture list can come from the class's catalog
+    (courses/catalog.py): all fields, filtered by subject at most.
+    """
+    return student_class is not None and not search_query and fields is None \
+        and (not subject_id or subject_id.isdigit())
+
+
+def catalog_response(user, student_class, subject_id=None):
+    catalog = lecture_catalog(student_class.pk)
+    watched_lecture_ids = set(Attendance.objects.filter(
+        student=user, watched_video=True
+    ).values_list('lecture_id', flat=True))
+    body = render_catalog(catalog, student_class, watched_lecture_ids, int(subject_id) if subject_id else None)
+    return HttpResponse(body, content_type='application/json')
+
+
+def build_lecture_list(student_class, lectures, watched_lecture_ids, available_subjects, fields=None):
+    # Build lecture list with watch status
+    lectures = list(lectures)
+    getters = [(key, LECTURE_LIST_FIELDS[key][1]) for key in (fields or LECTURE_LIST_FIELDS)]
+    lecture_list = [
+        {key: get(lecture, watched_lecture_ids) for key, get in getters}
+        for lecture in lectures
+    ]
+    
+    subject_list = [
+        {"id": subj.id, "name": subj.name}
+        for subj in available_subjects
+    ]
+    
+    return {
+        "class_name": student_class.name if student_class else None,
+        "total_lectures": len(lecture_list),
+        "watched_count": sum(1 for lecture in lectures if lecture.id in watched_lecture_ids),
+        "available_subjects": subject_list,
+        "lectures": lecture_list,
+    }
+
+
+def build_lecture_detail(lecture, is_watched, questions, question_count):
+    return {
+        "id": lecture.id,
+        "title": lecture.title,
+        "description": lecture.description,
+        "subject": {
+            "id": lecture.subject.id if lecture.subject else None,
+            "name": lecture.subject.name if lecture.subject else None
+        },
+        "class_name": lecture.class_assigned.name if lecture.class_assigned else None,
+        "topic": lecture.topic,
+        "duration_minutes": lecture.duration_minutes,
+        "video_url": lecture.get_video_url(),
+        "has_video": bool(lecture.video_file or lecture.video_url),
+        "uploaded_at": lecture.uploaded_at,
+        "is_watched": is_watched,
+        "recent_questions": [
+            {
+                "id": q.id,
+                "title": q.title,
+                "asked_by": q.asked_by.username,
+                "is_answered": q.is_answered,
+                "created_at": q.created_at,
+            }
+            for q in questions
+        ],
+        "question_count": question_count,
+    }
+
+
+def attendance_history_item(record):
+    return {
+        "id": record.id,
+        "date": record.date,
+        "lecture_title": record.lecture.title if record.lecture else "N/A",
+        "status": "Present" if record.present else "Absent",
+        "color": "green" if record.present else "red" # Helper for frontend UI
+    }
+
+
+def build_attendance(total_records, present_count, records):
+    absent_count = total_records - present_count
+    
+    percentage = 0
+    if total_records > 0:
+        percentage = round((present_count / total_records) * 100, 2)
+
+    history = [attendance_history_item(record) for record in records]
+
+    return {
+        "summary": {
+            "total_lectures": total_records,
+            "present": present_count,
+            "absent": absent_count,
+            "percentage": f"{percentage}%"
+        },
+        "history": history
+    }
+
+
+def build_profile(user):
+    return {
+        "id": user.id,
+        "username": user.username,
+        "full_name": f"{user.first_name} {user.last_name}".strip(),
+        "email": user.email,
+        "role": "Student",
+        "school": user.school.name if user.school else "N/A",
+        "assigned_class": user.assigned_class.name if user.assigned_class else "N/A",
+        "date_joined": user.date_joined.strftime("%Y-%m-%d"),
+    }
+
+
+def build_mark_watched(lecture, today, created):
+    return {
+        "message": "Video marked as watched!",
+        "lecture_id": lecture.id,
+        "lecture_title": lecture.title,
+        "watched_video": True,
+        "date": today,
+        "is_new_record": created
+    }
+
+
 class StudentDashboardView(APIView):
     """
     API endpoint that returns a student's dashboard summary.
     URL: /api/student/dashboard/
     """
     permission_classes = [IsAuthenticated]
+    use_read_replica = True
     
     def get(self, request):
         user = request.user
@@ -44,81 +366,36 @@ class StudentDashboardView(APIView):
             )
         
         student_class = user.assigned_class
+        one_week_ago = timezone.now() - timedelta(days=7)
+
+        # Cheap ETag check (one aggregate query) before the heavy work
+        validators = compute_validators(
+            request,
+            dashboard_validator_sources(user, student_class, one_week_ago),
+            user_fields=DASHBOARD_USER_FIELDS
+        )
+        cached = not_modified(request, validators)
+        if cached:
+            return cached
         
-        # Calculate Attendance Statistics
-        total_attendance_records = Attendance.objects.filter(student=user).count()
-        present_count = Attendance.objects.filter(student=user, present=True).count()
-        
-        if total_attendance_records > 0:
-            attendance_percentage = round((present_count / total_attendance_records) * 100, 1)
-        else:
-            attendance_percentage = 0.0
+        # Calculate Attendance Statistics (live + archived academic years)
+        archived_total, archived_present = archived_totals(student_id=user.pk)
+        total_attendance_records = Attendance.objects.filter(student=user).count() + archived_total
+        present_count = Attendance.objects.filter(student=user, present=True).count() + archived_present
         
-        # Get Lectures for Student's Class
+        # Lectures and announcements are the class's: its students loading
+        # the dashboard at once (say, after an announcement) share one computation
         if student_class:
-            lectures = Lecture.objects.filter(class_assigned=student_class).order_by('-uploaded_at')
-            total_lectures = lectures.count()
-            recent_lectures = lectures[:5]
-        else:
-            total_lectures = 0
-            recent_lectures = []
-        
-        # Get Announcements for Student's Class
-        if student_class:
-            announcements = Announcement.objects.filter(target_class=student_class).order_by('-created_at')
-            one_week_ago = timezone.now() - timedelta(days=7)
-            new_announcements_count = announcements.filter(created_at__gte=one_week_ago).count()
-            recent_announcements = announcements[:3]
+            sections = single_flight(
+                dashboard_sections_key(student_class, validators),
+                lambda: class_dashboard_sections(student_class, one_week_ago),
+            )
         else:
-            new_announcements_count = 0
-            recent_announcements = []
+            sections = build_dashboard_sections(0, [], 0, [])
         
-        response_data = {
-            "student": {
-                "id": user.id,
-                "username": user.username,
-                "full_name": f"{user.first_name} {user.last_name}".strip() or user.username,
-                "email": user.email,
-                "class_name": student_class.name if student_class else None,
-                "school_name": user.school.name if user.school else None,
-            },
-            "attendance": {
-                "percentage": attendance_percentage,
-                "total_records": total_attendance_records,
-                "present_count": present_count,
-                "absent_count": total_attendance_records - present_count,
-            },
-            "lectures": {
-                "total_count": total_lectures,
-                "recent": [
-                    {
-                        "id": lecture.id,
-                        "title": lecture.title,
-                        "subject": lecture.subject.name if lecture.subject else None,
-                        "topic": lecture.topic,
-                        "uploaded_at": lecture.uploaded_at,
-                        "has_video": bool(lecture.video_file or lecture.video_url),
-                    }
-                    for lecture in recent_lectures
-                ]
-            },
-            "announcements": {
-                "new_count": new_announcements_count,
-                "recent": [
-                    {
-                        "id": announcement.id,
-                        "title": announcement.title,
-                        "content": announcement.content[:100] + "..." if announcement.content and len(announcement.content) > 100 else announcement.content,
-                        "priority": announcement.priority,
-                        "posted_by": announcement.posted_by.username,
-                        "created_at": announcement.created_at,
-                    }
-                    for announcement in recent_announcements
-                ]
-            }
-        }
+        response_data = build_dashboard(user, student_class, total_attendance_records, present_count, sections)
         
-        return Response(response_data, status=status.HTTP_200_OK)
+        return set_validators(Response(response_data, status=status.HTTP_200_OK), validators)
 
 
 # ===========================
@@ -133,12 +410,14 @@ class StudentLecturesView(APIView):
     Query Parameters:
     - subject: Filter by subject ID (e.g., ?subject=1)
     - search: Search by title or topic (e.g., ?search=algebra)
+    - fields: Only these keys per lecture (e.g., ?fields=id,title,is_watched)
     
     Returns:
     - List of subjects with their lectures
     - OR filtered lectures if query params are provided
     """
     permission_classes = [IsAuthenticated]
+    use_read_replica = True
     
     def get(self, request):
         user = request.user
@@ -158,73 +437,41 @@ class StudentLecturesView(APIView):
             )
         
         student_class = user.assigned_class
-        
+        fields = lecture_list_fields(request)
+
         # Get query parameters
         subject_id = request.query_params.get('subject', None)
         search_query = request.query_params.get('search', None)
-        
-        # Base queryset - only lectures for student's class
-        lectures = Lecture.objects.filter(
-            class_assigned=student_class
-        ).select_related('subject').order_by('-uploaded_at')
-        
-        # Filter by subject if provided
-        if subject_id:
-            lectures = lectures.filter(subject_id=subject_id)
-        
-        # Search by title or topic if provided
-        if search_query:
-            lectures = lectures.filter(
-                Q(title__icontains=search_query) |
-                Q(topic__icontains=search_query) |
-                Q(description__icontains=search_query)
+        # The common case comes pre-rendered from the class's catalog
+        from_catalog = catalog_servable(student_class, subject_id, search_query, fields) \
+            and request.accepted_renderer.format == 'json'
+
+        # Cheap ETag check (one aggregate query) before the heavy work
+        validators = lectures_validators(request, user, student_class, from_catalog)
+        cached = not_modified(request, validators)
+        if cached:
+            return cached
+
+        if from_catalog:
+            return set_validators(
+                catalog_response(user, student_class, subject_id), validators
             )
         
+        # Only lectures for student's class, filtered by subject/search
+        lectures = load_lecture_list_fields(filter_class_lectures(student_class, subject_id, search_query), fields)
+        
         # Get student's watched lectures for marking
-        watched_lecture_ids = Attendance.objects.filter(
+        watched_lecture_ids = set(Attendance.objects.filter(
             student=user,
             watched_video=True
-        ).values_list('lecture_id', flat=True)
-        
-        # Build lecture list with watch status
-        lecture_list = []
-        for lecture in lectures:
-            lecture_data = {
-                "id": lecture.id,
-                "title": lecture.title,
-                "description": lecture.description,
-                "subject": {
-                    "id": lecture.subject.id if lecture.subject else None,
-                    "name": lecture.subject.name if lecture.subject else "No Subject"
-                },
-                "topic": lecture.topic,
-                "duration_minutes": lecture.duration_minutes,
-                "has_video": bool(lecture.video_file or lecture.video_url),
-                "video_url": lecture.get_video_url() if lecture.video_file or lecture.video_url else None,
-                "uploaded_at": lecture.uploaded_at,
-                "is_watched": lecture.id in watched_lecture_ids,
-            }
-            lecture_list.append(lecture_data)
+        ).values_list('lecture_id', flat=True))
         
         # Get list of subjects available for this class (for filter dropdown)
-        available_subjects = Subject.objects.filter(
-            lectures__class_assigned=student_class
-        ).distinct()
+        available_subjects = class_subjects(student_class.pk if student_class else None)
         
-        subject_list = [
-            {"id": subj.id, "name": subj.name}
-            for subj in available_subjects
-        ]
+        response_data = build_lecture_list(student_class, lectures, watched_lecture_ids, available_subjects, fields)
         
-        response_data = {
-            "class_name": student_class.name if student_class else None,
-            "total_lectures": len(lecture_list),
-            "watched_count": len([l for l in lecture_list if l['is_watched']]),
-            "available_subjects": subject_list,
-            "lectures": lecture_list,
-        }
-        
-        return Response(response_data, status=status.HTTP_200_OK)
+        return set_validators(Response(response_data, status=status.HTTP_200_OK), validators)
 
 
 class StudentLectureDetailView(APIView):
@@ -250,7 +497,7 @@ class StudentLectureDetailView(APIView):
         
         # Get the lecture
         try:
-            lecture = Lecture.objects.select_related('subject', 'class_assigned').get(pk=pk)
+            lecture = Lecture.objects.get(pk=pk)
         except Lecture.DoesNotExist:
             return Response(
                 {"error": "Lecture not found."},
@@ -272,35 +519,9 @@ class StudentLectureDetailView(APIView):
         ).exists()
         
         # Get questions for this lecture
-        questions = lecture.questions.all().order_by('-created_at')[:5]
+        questions = lecture.questions.select_related('asked_by').order_by('-created_at')[:5]
         
-        response_data = {
-            "id": lecture.id,
-            "title": lecture.title,
-            "description": lecture.description,
-            "subject": {
-                "id": lecture.subject.id if lecture.subject else None,
-                "name": lecture.subject.name if lecture.subject else None
-            },
-            "class_name": lecture.class_assigned.name if lecture.class_assigned else None,
-            "topic": lecture.topic,
-            "duration_minutes": lecture.duration_minutes,
-            "video_url": lecture.get_video_url(),
-            "has_video": bool(lecture.video_file or lecture.video_url),
-            "uploaded_at": lecture.uploaded_at,
-            "is_watched": is_watched,
-            "recent_questions": [
-                {
-                    "id": q.id,
-                    "title": q.title,
-                    "asked_by": q.asked_by.username,
-                    "is_answered": q.is_answered,
-                    "created_at": q.created_at,
-                }
-                for q in questions
-            ],
-            "question_count": lecture.questions.count(),
-        }
+        response_data = build_lecture_detail(lecture, is_watched, questions, lecture.questions.count())
         
         return Response(response_data, status=status.HTTP_200_OK)
     
@@ -317,53 +538,38 @@ class StudentAttendanceView(APIView):
     Query Params: ?start_date=YYYY-MM-DD&end_date=YYYY-MM-DD
     """
     permission_classes = [IsAuthenticated, IsStudent]
+    use_read_replica = True
 
     def get(self, request):
         user = request.user
-        
-        # 1. Base Query: Get all attendance records for this student
-        queryset = Attendance.objects.filter(student=user).select_related('lecture').order_by('-date')
-
-        # 2. Date Filtering (Optional)
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
         
-        if start_date:
-            queryset = queryset.filter(date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(date__lte=end_date)
+        # 1. Base Query: this student's records, optionally filtered by date
+        queryset = attendance_queryset(user, start_date, end_date)
+        # Archived academic years are only read when the range reaches them
+        include_archive = needs_archive(start_date)
+
+        # Cheap ETag check (one aggregate query) before building the history
+        validators = compute_validators(request, attendance_validator_sources(user, queryset, include_archive))
+        cached = not_modified(request, validators)
+        if cached:
+            return cached
 
-        # 3. Calculate Summary Stats (for the filtered period)
+        # 2. Calculate Summary Stats (for the filtered period)
         total_records = queryset.count()
         present_count = queryset.filter(present=True).count()
-        absent_count = total_records - present_count
-        
-        percentage = 0
-        if total_records > 0:
-            percentage = round((present_count / total_records) * 100, 2)
-
-        # 4. Build History List
-        history = []
-        for record in queryset:
-            history.append({
-                "id": record.id,
-                "date": record.date,
-                "lecture_title": record.lecture.title if record.lecture else "N/A",
-                "status": "Present" if record.present else "Absent",
-                "color": "green" if record.present else "red" # Helper for frontend UI
-            })
-
-        response_data = {
-            "summary": {
-                "total_lectures": total_records,
-                "present": present_count,
-                "absent": absent_count,
-                "percentage": f"{percentage}%"
-            },
-            "history": history
-        }
+        records = queryset
+        if include_archive:
+            archived = archived_attendance(start_date, end_date, student_id=user.pk)
+            total_records += len(archived)
+            present_count += sum(record.present for record in archived)
+            records = merge_by_date(list(queryset), archived)
 
-        return Response(response_data, status=status.HTTP_200_OK)
+        # 3. Build Summary + History List
+        response_data = build_attendance(total_records, present_count, records)
+
+        return set_validators(Response(response_data, status=status.HTTP_200_OK), validators)
  
 # ===========================
 # STEP 4: PROFILE & SECURITY
@@ -377,19 +583,7 @@ class StudentProfileView(APIView):
     permission_classes = [IsAuthenticated, IsStudent]
 
     def get(self, request):
-        user = request.user
-        
-        data = {
-            "id": user.id,
-            "username": user.username,
-            "full_name": f"{user.first_name} {user.last_name}".strip(),
-            "email": user.email,
-            "role": "Student",
-            "school": user.school.name if user.school else "N/A",
-            "assigned_class": user.assigned_class.name if user.assigned_class else "N/A",
-            "date_joined": user.date_joined.strftime("%Y-%m-%d"),
-        }
-        return Response(data, status=status.HTTP_200_OK)
+        return Response(build_profile(request.user), status=status.HTTP_200_OK)
 
 
 class StudentChangePasswordView(APIView):
@@ -441,7 +635,7 @@ class StudentChangePasswordView(APIView):
             
             # D. Save New Password
             user.set_password(new_password)
-            user.save()
+            user.save(update_fields=['password'])
             
             return Response(
                 {'message': 'Password changed successfully. Please login again.'}, 
@@ -514,11 +708,4 @@ class MarkLectureWatchedView(APIView):
             attendance.watched_video = True
             attendance.save()
         
-        return Response({
-            "message": "Video marked as watched!",
-            "lecture_id": lecture.id,
-            "lecture_title": lecture.title,
-            "watched_video": True,
-            "date": today,
-            "is_new_record": created
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(build_mark_watched(lecture, today, created), status=status.HTTP_200_OK)
\ No newline at end of file
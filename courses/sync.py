@@ -0,0 +1,164 @@
+"""
+Delta sync for offline-capable clients (GET /api/student/sync/?since=<token>).
+
+    {
+        "token": "1767225600000000-12",   # pass as ?since= next time
+        "full": false,                    # true: replace local data
+        "lectures":      {"changed": [...], "deleted": [ids]},
+        "announcements": {"changed": [...], "deleted": [ids]},
+        "attendance":    {"changed": [...], "deleted": [ids]},
+    }
+
+Items have the shape of the student lecture list (without video_url:
+signed URLs expire, so clients get one from the lecture detail when
+playing), the announcement API and the attendance history (plus
+lecture_id). A token is "<microseconds>-<class id>", taken before reading.
+The next sync returns rows whose updated_at (or tombstone deleted_at) is at
+most SYNC_OVERLAP_SECONDS older than it, so a row committed late is never
+skipped; clients upsert by id, so rows seen twice are harmless. Every
+changed set is one range scan on a (class or student, updated_at) index.
+Names shown from other rows (a lecture's subject, an announcement's
+poster) bump the updated_at of the rows showing them when they change.
+
+A full sync (all rows, nothing deleted) is sent without a token, after a
+class change (the student now sees other lectures) and when the token is
+older than the tombstones kept (SYNC_TOMBSTONE_DAYS). Archived attendance
+(courses/archive.py) is not part of sync; archiving moves rows, it does
+not delete them, so it leaves no tombstones (moving_attendance()).
+"""
+import datetime
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .fast_serializers import FastReader
+from .models import Announcement, Attendance, Lecture, Tombstone
+from .serializers import AnnouncementSerializer
+from .catalog import LECTURE_LIST_FIELDS
+from .student_views import attendance_history_item
+
+LECTURE_SYNC_FIELDS = [key for key in LECTURE_LIST_FIELDS if key != 'video_url']
+
+
+class SyncTokenError(ValueError):
+    pass
+
+
+def make_token(moment, class_id):
+    micros = int(moment.timestamp() * 1_000_000)
+    return f"{micros}-{class_id or 0}"
+
+
+def parse_token(token):
+    """
+    (moment, class_id) from a token; raises SyncTokenError.
+    """
+    try:
+        micros, class_id = token.split('-')
+        moment = datetime.datetime.fromtimestamp(int(micros) / 1_000_000, tz=datetime.timezone.utc)
+        return moment, int(class_id) or None
+    except (ValueError, OverflowError, OSError):
+        raise SyncTokenError("Invalid sync token.")
+
+
+def add_tombstone(kind, object_id, student_class_id=None, student_id=None):
+    """
+    Record a deletion, and drop tombstones nobody can ask for any more.
+    """
+    Tombstone.objects.create(
+        kind=kind, object_id=object_id, student_class_id=student_class_id, student_id=student_id
+    )
+    expired = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+    Tombstone.objects.filter(deleted_at__lt=expired).delete()
+
+
+# Set while archiving moves attendance rows out (courses/archive.py)
+_attendance_moving = ContextVar('attendance_moving', default=False)
+
+
+@contextmanager
+def moving_attendance():
+    """
+    Attendance deleted inside is moved elsewhere, not gone: no tombstones.
+    """
+    token = _attendance_moving.set(True)
+    try:
+        yield
+    finally:
+        _attendance_moving.reset(token)
+
+
+def attendance_moving():
+    return _attendance_moving.get()
+
+
+def _attendance_item(record):
+    return {**attendance_history_item(record), "lecture_id": record.lecture_id}
+
+
+def build_sync(user, since=None, context=None):
+    """
+    The sync payload for a student; `since` is the client's token or None
+    (raises SyncTokenError if it is malformed).
+    """
+    now = timezone.now()
+    class_id = user.assigned_class_id
+
+    changed_since = None
+    if since:
+        moment, token_class_id = parse_token(since)
+        oldest = now - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+        if token_class_id == class_id and moment >= oldest:
+            changed_since = moment - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+
+    attendance = Attendance.objects.filter(student=user).select_related('lecture').order_by('id')
+    lectures = Lecture.objects.filter(class_assigned_id=class_id).select_related('subject').order_by('id')
+    announcements = Announcement.objects.filter(target_class_id=class_id).order_by('id')
+    deleted = {Tombstone.LECTURE: [], Tombstone.ANNOUNCEMENT: [], Tombstone.ATTENDANCE: []}
+
+    if changed_since is not None:
+        attendance = list(attendance.filter(updated_at__gte=changed_since))
+        # is_watched of a lecture changes with the student's attendance
+        lectures = list(lectures.filter(
+            Q(updated_at__gte=changed_since) | Q(id__in={r.lecture_id for r in attendance if r.lecture_id})
+        )) if class_id else []
+        watched = set(Attendance.objects.filter(
+            student=user, watched_video=True, lecture_id__in=[lecture.id for lecture in lectures]
+        ).values_list('lecture_id', flat=True)) if lectures else set()
+        announcements = announcements.filter(updated_at__gte=changed_since)
+
+        audience = Q(student_id=user.pk)
+        if class_id:
+            audience |= Q(student_class_id=class_id)
+        tombstones = Tombstone.objects.filter(audience, deleted_at__gte=changed_since)
+        for kind, object_id in tombstones.values_list('kind', 'object_id'):
+            deleted[kind].append(object_id)
+    else:
+        attendance = list(attendance)
+        lectures = list(lectures) if class_id else []
+        # All live records are at hand: the watch status needs no query
+        watched = {record.lecture_id for record in attendance if record.watched_video}
+
+    getters = [(key, LECTURE_LIST_FIELDS[key][1]) for key in LECTURE_SYNC_FIELDS]
+    changed = {
+        "lectures": [{key: get(lecture, watched) for key, get in getters} for lecture in lectures],
+        "announcements": FastReader.for_serializer(AnnouncementSerializer).serialize(announcements, context)
+        if class_id else [],
+        "attendance": [_attendance_item(record) for record in attendance],
+    }
+    kinds = {"lectures": Tombstone.LECTURE, "announcements": Tombstone.ANNOUNCEMENT, "attendance": Tombstone.ATTENDANCE}
+
+    payload = {"token": make_token(now, class_id), "full": changed_since is None}
+    for name, items in changed.items():
+        # Deleted and back within the window (e.g. a lecture moved away and
+        # back): it exists now
+        present = {item["id"] for item in items}
+        payload[name] = {
+            "changed": items,
+            "deleted": sorted(set(deleted[kinds[name]]) - present),
+        }
+    return payload
@@ -0,0 +1,25 @@
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework import status
+from .student_views import IsStudent
+from .sync import SyncTokenError, build_sync
+
+
+class StudentSyncView(APIView):
+    """
+    Changes to the student's lectures, announcements and attendance since
+    the last sync (format in courses/sync.py).
+    URL: /api/student/sync/
+    Query Params: ?since=<token from the previous response>
+    """
+    permission_classes = [IsAuthenticated, IsStudent]
+    # Reads the primary: a lagging replica could hide rows older than the
+    # token's overlap window, and the client would never see them
+
+    def get(self, request):
+        try:
+            data = build_sync(request.user, request.query_params.get('since'), {'request': request})
+        except SyncTokenError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data, status=status.HTTP_200_OK)
@@ -0,0 +1,261 @@
+"""
+Synthetic data for benchmarks and local load testing.
+
+    generate_dataset(schools=2, classes_per_school=3, students_per_class=25, years=1)
+
+Builds schools with admins and teachers, classes with students and
+lectures, one attendance row per student per school day (weekdays) for the
+last `years` years, announcements and Q&A threads. Everything is created
+with bulk_create, so model save() hooks and signals do NOT run; the
+denormalized Q&A counters and tenant keys are filled in directly.
+
+All usernames/names start with `prefix`, and the same `seed` gives the
+same dataset.
+"""
+import datetime
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from users.models import User, Role, normalize_email
+from .models import School, Class, Subject, Lecture, Attendance, Announcement, Question, Answer
+
+BATCH_SIZE = 1000
+
+# Named dataset sizes used by run_benchmarks (and generate_synthetic_data --scale)
+SCALES = {
+    'small': dict(schools=1, classes_per_school=2, students_per_class=15, lectures_per_class=10, years=1),
+    'medium': dict(schools=2, classes_per_school=4, students_per_class=30, lectures_per_class=30, years=1),
+    'large': dict(schools=4, classes_per_school=6, students_per_class=40, lectures_per_class=60, years=2),
+}
+
+SUBJECT_NAMES = [
+    'Mathematics', 'Physics', 'Chemistry', 'Biology', 'English',
+    'History', 'Geography', 'Computer Science', 'Economics', 'Art',
+]
+FIRST_NAMES = ['Aarav', 'Diya', 'Ishaan', 'Meera', 'Kabir', 'Anaya', 'Rohan', 'Sara', 'Vivaan', 'Zoya']
+LAST_NAMES = ['Sharma', 'Patel', 'Khan', 'Singh', 'Iyer', 'Das', 'Gupta', 'Reddy', 'Nair', 'Bose']
+WORDS = (
+    'equation force energy reaction cell grammar empire climate algorithm market '
+    'function vector atom essay river theorem circuit poem trade graph'
+).split()
+
+
+def school_days(years, today=None):
+    """
+    Weekdays of the last `years` years, oldest first.
+    """
+    today = today or datetime.date.today()
+    day = today - datetime.timedelta(days=365 * years)
+    days = []
+    while day <= today:
+        if day.weekday() < 5:
+            days.append(day)
+        day += datetime.timedelta(days=1)
+    return days
+
+
+def _sentence(rng, words=8):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def _created(model, objs, **lookup):
+    """
+    bulk_create, then re-read the rows in creation order (MySQL does not
+    return primary keys from bulk inserts).
+    """
+    model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+    return list(model.objects.filter(**lookup).order_by('id'))
+
+
+@transaction.atomic
+def generate_dataset(schools=2, classes_per_school=3, students_per_class=25, teachers_per_school=3,
+                     subjects=6, lectures_per_class=20, years=1, announcements_per_class=10,
+                     questions_per_lecture=2, answers_per_question=2, attendance_rate=0.9,
+                     password='password', prefix='syn', seed=42, log=None):
+    """
+    Create the dataset and return a summary with row counts and a few
+    handy objects (first school's admin, a teacher, a student, a class).
+    """
+    if User.objects.filter(username__startswith=f'{prefix}_').exists():
+        raise ValueError(f"Synthetic data with prefix '{prefix}' already exists. Use another prefix.")
+
+    log = log or (lambda message: None)
+    rng = random.Random(seed)
+    password_hash = make_password(password)  # hashed once, shared by every account
+
+    def user(username, role, **extra):
+        email = f'{username}@example.com'
+        return User(
+            username=username,
+            email=email,
+            email_normalized=normalize_email(email),  # bulk_create skips save()
+            password=password_hash,
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            role=role,
+            **extra,
+        )
+
+    # Schools and subjects
+    school_rows = _created(
+        School,
+        [School(name=f'{prefix} School {i}', address=f'{i} Main Road') for i in range(1, schools + 1)],
+        name__startswith=f'{prefix} School ',
+    )
+    subject_rows = _created(
+        Subject,
+        [Subject(name=f'{prefix} {SUBJECT_NAMES[i % len(SUBJECT_NAMES)]} {i // len(SUBJECT_NAMES) or ""}'.rstrip())
+         for i in range(subjects)],
+        name__startswith=f'{prefix} ',
+    )
+    log(f"{len(school_rows)} schools, {len(subject_rows)} subjects")
+
+    # Classes
+    class_rows = _created(
+        Class,
+        [Class(name=f'{prefix} Class {c}', school=school)
+         for school in school_rows for c in range(1, classes_per_school + 1)],
+        name__startswith=f'{prefix} Class ', school__in=school_rows,
+    )
+
+    # Staff and students
+    staff = []
+    for s, school in enumerate(school_rows, start=1):
+        staff.append(user(f'{prefix}_admin_{s}', Role.SCHOOL_ADMIN, school=school))
+        staff.extend(user(f'{prefix}_teacher_{s}_{t}', Role.TEACHER, school=school)
+                     for t in range(1, teachers_per_school + 1))
+    students = [
+        user(f'{prefix}_student_{klass.id}_{n}', Role.STUDENT, school_id=klass.school_id, assigned_class=klass)
+        for klass in class_rows for n in range(1, students_per_class + 1)
+    ]
+    users = _created(User, staff + students, username__startswith=f'{prefix}_')
+    teachers_by_school = {}
+    students_by_class = {}
+    for u in users:
+        if u.role == Role.TEACHER:
+            teachers_by_school.setdefault(u.school_id, []).append(u)
+        elif u.role == Role.STUDENT:
+            students_by_class.setdefault(u.assigned_class_id, []).append(u)
+    log(f"{len(class_rows)} classes, {len(users)} users")
+
+    # Lectures
+    lecture_rows = _created(
+        Lecture,
+        [
+            Lecture(
+                title=f'{prefix} {klass.name} Lecture {n}',
+                description=_sentence(rng, 20),
+                video_url=f'https://videos.example.com/{prefix}/{klass.id}/{n}.mp4',
+                duration_minutes=rng.randint(20, 60),
+                class_assigned=klass,
+                school_id=klass.school_id,
+                subject=rng.choice(subject_rows),
+                topic=f'Chapter {n}: {rng.choice(WORDS).title()}',
+            )
+            for klass in class_rows for n in range(1, lectures_per_class + 1)
+        ],
+        title__startswith=f'{prefix} ', class_assigned__in=class_rows,
+    )
+    lectures_by_class = {}
+    for lecture in lecture_rows:
+        lectures_by_class.setdefault(lecture.class_assigned_id, []).append(lecture)
+    log(f"{len(lecture_rows)} lectures")
+
+    # Attendance: one row per student per school day, inserted in batches
+    days = school_days(years)
+    attendance_count = 0
+    batch = []
+    for klass in class_rows:
+        class_lectures = lectures_by_class.get(klass.id) or [None]
+        for student in students_by_class.get(klass.id, []):
+            for i, day in enumerate(days):
+                present = rng.random() < attendance_rate
+                batch.append(Attendance(
+                    student=student,
+                    student_class_id=student.assigned_class_id,
+                    school_id=student.school_id,
+                    lecture=class_lectures[i % len(class_lectures)],
+                    date=day,
+                    present=present,
+                    watched_video=present and rng.random() < 0.5,
+                ))
+                if len(batch) >= BATCH_SIZE:
+                    Attendance.objects.bulk_create(batch)
+                    attendance_count += len(batch)
+                    batch = []
+    Attendance.objects.bulk_create(batch)
+    attendance_count += len(batch)
+    log(f"{attendance_count} attendance records over {len(days)} school days")
+
+    # Announcements
+    Announcement.objects.bulk_create([
+        Announcement(
+            title=f'{rng.choice(WORDS).title()} notice {n}',
+            content=_sentence(rng, 30),
+            posted_by=rng.choice(teachers_by_school.get(klass.school_id) or users),
+            target_class=klass,
+            priority=rng.choice(['low', 'medium', 'high']),
+        )
+        for klass in class_rows for n in range(1, announcements_per_class + 1)
+    ], batch_size=BATCH_SIZE)
+
+    # Q&A: questions by students of the lecture's class, answered by teachers
+    question_rows = _created(
+        Question,
+        [
+            Question(
+                title=f'{prefix} Q{n}: why {rng.choice(WORDS)}?',
+                content=_sentence(rng, 15),
+                asked_by=rng.choice(students_by_class[lecture.class_assigned_id]),
+                lecture=lecture,
+                answer_count=answers_per_question,
+                is_answered=answers_per_question > 0,
+            )
+            for lecture in lecture_rows if students_by_class.get(lecture.class_assigned_id)
+            for n in range(1, questions_per_lecture + 1)
+        ],
+        title__startswith=f'{prefix} Q', lecture__in=lecture_rows,
+    )
+    school_of_class = {klass.id: klass.school_id for klass in class_rows}
+    class_of_lecture = {lecture.id: lecture.class_assigned_id for lecture in lecture_rows}
+    answers = [
+        Answer(
+            question=question,
+            content=_sentence(rng, 25),
+            answered_by=rng.choice(
+                teachers_by_school.get(school_of_class[class_of_lecture[question.lecture_id]]) or users
+            ),
+        )
+        for question in question_rows
+        for _ in range(answers_per_question)
+    ]
+    Answer.objects.bulk_create(answers, batch_size=BATCH_SIZE)
+    log(f"{len(question_rows)} questions, {len(answers)} answers")
+
+    first_school = school_rows[0]
+    first_class = class_rows[0]
+    return {
+        'counts': {
+            'schools': len(school_rows),
+            'classes': len(class_rows),
+            'subjects': len(subject_rows),
+            'users': len(users),
+            'students': len(students),
+            'lectures': len(lecture_rows),
+            'attendance': attendance_count,
+            'announcements': len(class_rows) * announcements_per_class,
+            'questions': len(question_rows),
+            'answers': len(answers),
+        },
+        'school': first_school,
+        'klass': first_class,
+        'school_admin': next(u for u in users if u.role == Role.SCHOOL_ADMIN and u.school_id == first_school.id),
+        'teacher': teachers_by_school[first_school.id][0] if teachers_by_school.get(first_school.id) else None,
+        'student': students_by_class[first_class.id][0] if students_by_class.get(first_class.id) else None,
+        'lecture': lectures_by_class[first_class.id][0] if lectures_by_class.get(first_class.id) else None,
+        'question': next((q for q in question_rows if class_of_lecture[q.lecture_id] == first_class.id), None),
+        'password': password,
+        'prefix': prefix,
+    }
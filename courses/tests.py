@@ -1,3 +1,2291 @@
-from django.test import TestCase
+import asyncio
+import base64
+import datetime
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from contextvars import copy_context
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.signals import request_finished, request_started
+from django.db import DatabaseError, connection, connections, router, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import F
+from django.test import (
+    AsyncRequestFactory, Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+import courses.urls
+import users.urls
+from scholiv_lms.admission import AdmissionControlMiddleware, Lane, check_lanes, lane_for, reset_lanes
+from scholiv_lms.database import database_config, replica_configs
+from scholiv_lms.db_router import PIN_COOKIE, ReplicaRoutingMiddleware, pin_user, replica_reads
+from scholiv_lms.metrics import registry
+from scholiv_lms.middleware import ProfilingMiddleware, RequestMetricsMiddleware
+from scholiv_lms.testing import QUERY_BUDGETS, QueryBudgetMixin, route_names
+from users.models import User, Role
+from .archive import (
+    academic_year, academic_year_bounds, archivable_years, archive_horizon, archive_year, needs_archive, restore_year,
+)
+from .authentication import BatchUserAuthentication
+from .batch_views import _sub_request, parse_batch
+from .benchmarks import compare, xlsx_upload
+from .catalog import (
+    _PendingUpdates, class_subjects, lecture_catalog, rebuild_catalog, render_catalog, update_catalog_entries,
+)
+from .conditional import compute_validators
+from .events import DatabaseBackend, LocalBroker, get_backend, publish_announcement
+from .export import COLUMNS as EXPORT_COLUMNS, export_attendance, parse_watermark, read_scol
+from .fast_serializers import FastReader
+from .models import (
+    School, Class, Subject, Lecture, Attendance, AttendanceArchive, Announcement, Question, Answer, Tombstone,
+    AnnouncementEvent, LectureCatalogSnapshot, ReferenceDataVersion,
+)
+from .reference import reference_scope, reference_snapshot
+from .serializers import AnnouncementSerializer, AttendanceSerializer, LectureSerializer
+from .synthetic import school_days
+from .singleflight import asingle_flight, single_flight
+from .stream_views import announcement_stream
+from .student_views import (
+    DASHBOARD_USER_FIELDS, build_lecture_list, dashboard_sections_key, dashboard_validator_sources, filter_class_lectures,
+)
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    One representative request per route, each held to its query budget
+    (scholiv_lms/testing.py). Several rows per table, so per-row queries
+    would exceed the budget.
+    """
+    ROWS = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name="Springfield High")
+        cls.klass = Class.objects.create(name="Class 10", school=cls.school)
+        cls.other_class = Class.objects.create(name="Class 11", school=cls.school)
+        cls.subjects = [Subject.objects.create(name=f"Subject {i}") for i in range(cls.ROWS)]
+
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        cls.school_admin = User.objects.create_user(
+            'school_admin', 'school_admin@example.com', 'pass12345', role=Role.SCHOOL_ADMIN, school=cls.school
+        )
+        cls.teacher = User.objects.create_user(
+            'teacher', 'teacher@example.com', 'pass12345', role=Role.TEACHER, school=cls.school
+        )
+        cls.student = User.objects.create_user(
+            'student', 'student@example.com', 'pass12345',
+            role=Role.STUDENT, school=cls.school, assigned_class=cls.klass,
+        )
+
+        cls.lectures = [
+            Lecture.objects.create(
+                title=f"Lecture {i}", class_assigned=cls.klass, subject=cls.subjects[i], topic=f"Topic {i}",
+                video_url=f"https://videos.example.com/{i}",
+            )
+            for i in range(cls.ROWS)
+        ]
+        today = datetime.date.today()
+        for i, lecture in enumerate(cls.lectures):
+            Attendance.objects.create(
+                student=cls.student, lecture=lecture,
+                date=today - datetime.timedelta(days=i), present=i % 2 == 0, watched_video=i % 2 == 0,
+            )
+            Announcement.objects.create(
+                title=f"Notice {i}", content="...", posted_by=cls.teacher, target_class=cls.klass
+            )
+
+        cls.questions = []
+        for lecture in cls.lectures:
+            question = Question.objects.create(title="Why?", content="...", asked_by=cls.student, lecture=lecture)
+            for _ in range(3):
+                Answer.objects.create(question=question, content="Because.", answered_by=cls.teacher)
+            cls.questions.append(question)
+        cls.answer = cls.questions[0].answers.first()
+        # Catalogs are built by the first request; budget the steady state
+        rebuild_catalog(cls.klass.pk)
+
+    # Answers other than 2xx the budget is measured on
+    EXPECTED_STATUS = {'announcement-stream': 403}
+    # Served over ASGI only
+    ASGI_ROUTES = {'announcement-stream'}
+
+    def requests(self):
+        """
+        route -> (user, method, url, data); data is sent as JSON unless it
+        is already encoded (multipart bytes) or holds files
+        """
+        lecture = self.lectures[0]
+        question = self.questions[0]
+        students = xlsx_upload('students.xlsx', ['Username', 'Email', 'Password', 'Class Name'], [
+            [f'imported_{i}', f'imported_{i}@example.com', 'pass12345', self.klass.name] for i in range(self.ROWS)
+        ])
+        video = SimpleUploadedFile('lecture.mp4', b'\0' * 1024, content_type='video/mp4')
+        return {
+            'api-root': (self.admin, 'get', reverse('api-root'), None),
+            'school-list': (self.admin, 'get', reverse('school-list'), None),
+            'school-detail': (self.admin, 'get', reverse('school-detail', args=[self.school.pk]), None),
+            'school-bulk': (self.admin, 'post', reverse('school-bulk'), [
+                {'name': f"School {i}", 'address': "..."} for i in range(self.ROWS)
+            ]),
+            'class-list': (self.admin, 'get', reverse('class-list'), None),
+            'class-detail': (self.admin, 'get', reverse('class-detail', args=[self.klass.pk]), None),
+            'class-bulk': (self.admin, 'post', reverse('class-bulk'), [
+                {'name': f"Class {i}", 'school': self.school.pk} for i in range(self.ROWS)
+            ]),
+            'subject-list': (self.admin, 'get', reverse('subject-list'), None),
+            'subject-detail': (self.admin, 'get', reverse('subject-detail', args=[self.subjects[0].pk]), None),
+            'subject-bulk': (self.admin, 'patch', reverse('subject-bulk'), [
+                {'id': subject.pk, 'name': f"{subject.name} (new)"} for subject in self.subjects
+            ]),
+            'lecture-list': (self.admin, 'get', reverse('lecture-list'), None),
+            'lecture-detail': (self.admin, 'get', reverse('lecture-detail', args=[lecture.pk]), None),
+            'lecture-upload-video': (
+                self.admin, 'put', reverse('lecture-upload-video', args=[lecture.pk]),
+                encode_multipart(BOUNDARY, {'video': video}),
+            ),
+            'lecture-bulk': (self.admin, 'post', reverse('lecture-bulk'), [
+                {'title': f"New {i}", 'class_assigned': self.other_class.pk, 'subject': subject.pk}
+                for i, subject in enumerate(self.subjects)
+            ]),
+            'attendance-list': (self.admin, 'get', reverse('attendance-list'), None),
+            'attendance-detail': (
+                self.admin, 'get', reverse('attendance-detail', args=[Attendance.objects.first().pk]), None
+            ),
+            'attendance-upload': (self.admin, 'get', reverse('attendance-upload'), None),
+            # Updates the existing rows and creates one per lecture for tomorrow
+            'attendance-bulk': (self.teacher, 'post', reverse('attendance-bulk'), {'records': [
+                {'student': self.student.pk, 'lecture': lecture.pk, 'date': str(day), 'present': True}
+                for lecture, record in zip(self.lectures, Attendance.objects.order_by('lecture_id'))
+                for day in (record.date, datetime.date.today() + datetime.timedelta(days=1))
+            ]}),
+            'announcement-list': (self.student, 'get', reverse('announcement-list'), None),
+            'announcement-detail': (
+                self.admin, 'get', reverse('announcement-detail', args=[Announcement.objects.first().pk]), None
+            ),
+            'announcement-bulk': (self.teacher, 'post', reverse('announcement-bulk'), [
+                {'title': f"Notice {i}", 'content': "...", 'posted_by': self.teacher.pk, 'target_class': self.klass.pk}
+                for i in range(self.ROWS)
+            ]),
+            'question-list': (self.student, 'get', reverse('question-list'), None),
+            'question-detail': (self.admin, 'get', reverse('question-detail', args=[question.pk]), None),
+            'answer-list': (self.student, 'get', reverse('answer-list'), None),
+            'answer-detail': (self.student, 'get', reverse('answer-detail', args=[self.answer.pk]), None),
+            'answer-accept': (self.student, 'post', reverse('answer-accept', args=[self.answer.pk]), None),
+
+            'student-dashboard': (self.student, 'get', reverse('student-dashboard'), None),
+            'student-lectures': (self.student, 'get', reverse('student-lectures'), None),
+            'student-lecture-detail': (
+                self.student, 'get', reverse('student-lecture-detail', args=[lecture.pk]), None
+            ),
+            'mark-lecture-watched': (
+                self.student, 'post', reverse('mark-lecture-watched', args=[self.lectures[1].pk]), None
+            ),
+            'student-attendance': (self.student, 'get', reverse('student-attendance'), None),
+            'student-profile': (self.student, 'get', reverse('student-profile'), None),
+            'student-change-password': (self.student, 'post', reverse('student-change-password'), {
+                'old_password': 'pass12345', 'new_password': 'pass54321', 'confirm_password': 'pass54321',
+            }),
+            'student-sync': (self.student, 'get', reverse('student-sync'), None),
+            'async-student-dashboard': (self.student, 'get', reverse('async-student-dashboard'), None),
+            'async-student-lectures': (self.student, 'get', reverse('async-student-lectures'), None),
+            'async-student-lecture-detail': (
+                self.student, 'get', reverse('async-student-lecture-detail', args=[lecture.pk]), None
+            ),
+            'async-mark-lecture-watched': (
+                self.student, 'post', reverse('async-mark-lecture-watched', args=[self.lectures[1].pk]), None
+            ),
+            'async-student-attendance': (self.student, 'get', reverse('async-student-attendance'), None),
+            'async-student-profile': (self.student, 'get', reverse('async-student-profile'), None),
+
+            'lecture-question-thread': (
+                self.student, 'get', reverse('lecture-question-thread', args=[lecture.pk]), None
+            ),
+            'question-answers-page': (
+                self.student, 'get', reverse('question-answers-page', args=[question.pk]), None
+            ),
+            'attendance-report': (
+                self.admin, 'get', reverse('attendance-report') + f'?class_id={self.klass.pk}', None
+            ),
+            'attendance-export': (self.admin, 'get', reverse('attendance-export'), None),
+            'batch': (self.student, 'post', reverse('batch'), {'requests': [
+                {'path': reverse(route)} for route in (
+                    'student-dashboard', 'student-lectures', 'student-attendance', 'student-profile',
+                    'announcement-list',
+                )
+            ]}),
+            # Another class's feed: rejected before the stream opens
+            'announcement-stream': (
+                self.student, 'get', reverse('announcement-stream', args=[self.other_class.pk]), None
+            ),
+
+            'users:register': (None, 'post', reverse('users:register'), {
+                'username': 'newcomer', 'email': 'newcomer@example.com', 'password': 'S3cure-pass-123',
+            }),
+            'users:student-upload': (self.school_admin, 'post', reverse('users:student-upload'), {'file': students}),
+        }
+
+    def test_every_route_has_a_budget(self):
+        routes = route_names(courses.urls) | route_names(users.urls)
+        self.assertEqual(routes - set(QUERY_BUDGETS), set(), "Routes without a query budget")
+        self.assertEqual(routes - set(self.requests()), set(), "Routes without a budget test request")
+
+    @override_settings(STORAGES={'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'}})
+    def test_routes_stay_within_query_budget(self):
+        for route, (user, method, url, data) in self.requests().items():
+            with self.subTest(route=route):
+                client = self.async_client if route in self.ASGI_ROUTES else self.client
+                client.logout()
+                if user is not None:
+                    # student-change-password ends the sessions of the old one
+                    user.refresh_from_db(fields=['password'])
+                    client.force_login(user)
+                call = getattr(client, method)
+                if route in self.ASGI_ROUTES:
+                    call = async_to_sync(call)
+                # Steady state: the reference cache is loaded (earlier writes drop it)
+                reference_snapshot()
+                if data is None:
+                    response = self.assertQueryBudget(route, call, url)
+                elif isinstance(data, bytes):
+                    response = self.assertQueryBudget(route, call, url, data, content_type=MULTIPART_CONTENT)
+                elif isinstance(data, dict) and any(hasattr(value, 'read') for value in data.values()):
+                    response = self.assertQueryBudget(route, call, url, data)
+                else:
+                    response = self.assertQueryBudget(route, call, url, data, content_type='application/json')
+                expected = self.EXPECTED_STATUS.get(route)
+                if expected is None:
+                    self.assertTrue(200 <= response.status_code < 300, (response.status_code, response.getvalue()[:500]))
+                else:
+                    self.assertEqual(response.status_code, expected)
+
+
+class ConditionalGetTests(TestCase):
+    """
+    ETag round trips of the conditional endpoints, including after a
+    delete that leaves the newest updated_at unchanged.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name="Springfield High")
+        klass = Class.objects.create(name="Class 10", school=school)
+        cls.subject = subject = Subject.objects.create(name="Physics")
+        cls.teacher = teacher = User.objects.create_user(
+            'teacher', 'teacher@example.com', 'pass12345', role=Role.TEACHER, school=school
+        )
+        cls.student = User.objects.create_user(
+            'student', 'student@example.com', 'pass12345', role=Role.STUDENT, school=school, assigned_class=klass,
+        )
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        # Created oldest first: deleting the first keeps MAX(updated_at)
+        cls.lectures = [
+            Lecture.objects.create(title=f"Lecture {i}", class_assigned=klass, subject=subject) for i in range(2)
+        ]
+        cls.attendance = [
+            Attendance.objects.create(student=cls.student, lecture=lecture, date=datetime.date.today(), present=True)
+            for lecture in cls.lectures
+        ]
+        cls.announcements = [
+            Announcement.objects.create(title=f"Notice {i}", content="...", posted_by=teacher, target_class=klass)
+            for i in range(2)
+        ]
+        rebuild_catalog(klass.pk)
+
+    def cases(self):
+        """
+        route -> (user, a row whose deletion changes the response)
+        """
+        return {
+            'student-dashboard': (self.student, Announcement.objects.filter(pk=self.announcements[0].pk)),
+            'student-lectures': (self.student, Lecture.objects.filter(pk=self.lectures[0].pk)),
+            'student-attendance': (self.student, Attendance.objects.filter(pk=self.attendance[0].pk)),
+            'announcement-list': (self.admin, Announcement.objects.filter(pk=self.announcements[0].pk)),
+        }
+
+    def test_etag_round_trip(self):
+        for route, (user, _) in self.cases().items():
+            with self.subTest(route=route):
+                self.client.force_login(user)
+                response = self.client.get(reverse(route))
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('Last-Modified', response)
+                cached = self.client.get(reverse(route), HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(cached.status_code, 304)
+                self.assertEqual(cached.content, b'')
+                self.assertEqual(cached['ETag'], response['ETag'])
+
+    def test_if_modified_since_alone_is_not_trusted(self):
+        for route, (user, _) in self.cases().items():
+            with self.subTest(route=route):
+                self.client.force_login(user)
+                response = self.client.get(reverse(route), HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+                self.assertEqual(response.status_code, 200)
+
+    def test_delete_changes_the_etag(self):
+        for route, (user, rows) in self.cases().items():
+            with self.subTest(route=route), transaction.atomic():
+                self.client.force_login(user)
+                etag = self.client.get(reverse(route))['ETag']
+                with self.captureOnCommitCallbacks(execute=True):
+                    rows.get().delete()
+                response = self.client.get(reverse(route), HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+                transaction.set_rollback(True)  # the row, for the next route
+
+    def test_renames_change_the_etag(self):
+        # Names rendered from other rows: the subject's and the poster's
+        renames = {
+            (Subject, self.subject.pk, 'name'): ('student-dashboard', 'student-lectures'),
+            (User, self.teacher.pk, 'username'): ('student-dashboard',),
+        }
+        self.client.force_login(self.student)
+        for (model, pk, field), routes in renames.items():
+            for route in routes:
+                with self.subTest(model=model.__name__, route=route), transaction.atomic():
+                    etag = self.client.get(reverse(route))['ETag']
+                    with self.captureOnCommitCallbacks(execute=True):
+                        row = model.objects.get(pk=pk)
+                        setattr(row, field, "renamed")
+                        row.save()
+                    response = self.client.get(reverse(route), HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertNotEqual(response['ETag'], etag)
+                    transaction.set_rollback(True)
+
+
+class QuestionStateTests(TestCase):
+    """
+    answer_count, is_answered and accepted_answer follow every answer
+    write, each in at most two statements.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name="Springfield High")
+        klass = Class.objects.create(name="Class 10", school=school)
+        lecture = Lecture.objects.create(
+            title="Optics", class_assigned=klass, subject=Subject.objects.create(name="Physics")
+        )
+        student = User.objects.create_user('student', 'student@example.com', 'pass12345', role=Role.STUDENT)
+        cls.teacher = User.objects.create_user('teacher', 'teacher@example.com', 'pass12345', role=Role.TEACHER)
+        cls.question = Question.objects.create(title="Why?", content="...", asked_by=student, lecture=lecture)
+
+    def answer(self, answered_by=None):
+        return Answer.objects.create(question=self.question, content="Because.", answered_by=answered_by or self.teacher)
+
+    def assertState(self, answer_count, is_answered, accepted_answer_id):
+        question = Question.objects.get(pk=self.question.pk)
+        self.assertEqual(
+            (question.answer_count, question.is_answered, question.accepted_answer_id),
+            (answer_count, is_answered, accepted_answer_id),
+        )
+
+    def test_create(self):
+        with self.assertNumQueries(2):
+            self.answer()
+        self.assertState(1, True, None)
+
+    def test_edit(self):
+        answer = self.answer()
+        answer.content = "Because of refraction."
+        with self.assertNumQueries(1):
+            answer.save()
+        self.assertState(1, True, None)
+
+    def test_accept(self):
+        first, second = self.answer(), self.answer()
+        first.accept()
+        with self.assertNumQueries(2):
+            second.accept()
+        self.assertState(2, True, second.pk)
+        self.assertEqual(list(Answer.objects.filter(is_accepted=True)), [second])
+
+    def test_delete(self):
+        first, second = self.answer(), self.answer()
+        second.accept()
+        with self.assertNumQueries(2):
+            second.delete()
+        self.assertState(1, True, None)
+        with self.assertNumQueries(2):
+            first.delete()
+        self.assertState(0, False, None)
+
+    def test_queryset_delete(self):
+        kept = self.answer()
+        accepted = self.answer()
+        accepted.accept()
+        Answer.objects.exclude(pk=kept.pk).delete()
+        self.assertState(1, True, None)
+
+    def test_cascade_from_the_answering_user(self):
+        other = User.objects.create_user('other', 'other@example.com', 'pass12345', role=Role.TEACHER)
+        self.answer()
+        accepted = self.answer(answered_by=other)
+        accepted.accept()
+        other.delete()
+        self.assertState(1, True, None)
+
+    def test_question_delete(self):
+        self.answer().accept()
+        self.question.delete()
+        self.assertFalse(Answer.objects.exists())
+
+
+class QuestionThreadTests(TestCase):
+    """
+    The thread carries the first N answers of each question, and both the
+    question pages and the answer pages neither skip nor repeat rows
+    created at the same moment.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name="Springfield High")
+        klass = Class.objects.create(name="Class 10", school=school)
+        cls.lecture = Lecture.objects.create(
+            title="Optics", class_assigned=klass, subject=Subject.objects.create(name="Physics")
+        )
+        cls.student = User.objects.create_user(
+            'student', 'student@example.com', 'pass12345', role=Role.STUDENT, school=school, assigned_class=klass,
+        )
+        teacher = User.objects.create_user('teacher', 'teacher@example.com', 'pass12345', role=Role.TEACHER)
+        cls.questions = [
+            Question.objects.create(title=f"Q{i}", content="...", asked_by=cls.student, lecture=cls.lecture)
+            for i in range(5)
+        ]
+        cls.answers = {
+            question.pk: [
+                Answer.objects.create(question=question, content=f"A{j}", answered_by=teacher).pk
+                for j in range(count)
+            ]
+            for question, count in zip(cls.questions, (5, 2, 0, 4, 1))
+        }
+        # Every question and answer created at the same moment
+        moment = timezone.now()
+        Question.objects.update(created_at=moment)
+        Answer.objects.update(created_at=moment)
+
+    def setUp(self):
+        self.client.force_login(self.student)
+
+    def test_answers_per_question(self):
+        body = self.client.get(
+            reverse('lecture-question-thread', args=[self.lecture.pk]), {'answers': 3}
+        ).json()
+        self.assertEqual(len(body['questions']), 5)
+        for question in body['questions']:
+            expected = self.answers[question['id']]
+            self.assertEqual([a['id'] for a in question['answers']], expected[:3])
+            self.assertEqual(question['answer_count'], len(expected))
+            self.assertEqual(question['has_more_answers'], len(expected) > 3)
+
+        body = self.client.get(reverse('lecture-question-thread', args=[self.lecture.pk]), {'answers': 0}).json()
+        self.assertTrue(all(q['answers'] == [] for q in body['questions']))
+
+    def test_question_pages(self):
+        ids, page = [], 1
+        while True:
+            body = self.client.get(
+                reverse('lecture-question-thread', args=[self.lecture.pk]), {'page': page, 'page_size': 2}
+            ).json()
+            ids.extend(q['id'] for q in body['questions'])
+            if not body['has_next']:
+                break
+            page += 1
+        self.assertEqual(ids, sorted((q.pk for q in self.questions), reverse=True))
+
+    def test_answer_pages(self):
+        question = self.questions[0]
+        url = reverse('question-answers-page', args=[question.pk])
+        # Continuing from the last answer the thread showed
+        ids, params = [], {'after': self.answers[question.pk][2], 'limit': 1}
+        while True:
+            body = self.client.get(url, params).json()
+            ids.extend(a['id'] for a in body['answers'])
+            if body['next_after'] is None:
+                break
+            params['after'] = body['next_after']
+        self.assertEqual(ids, self.answers[question.pk][3:])
+
+        body = self.client.get(url, {'limit': 2}).json()
+        self.assertEqual([a['id'] for a in body['answers']], self.answers[question.pk][:2])
+        self.assertEqual(body['next_after'], self.answers[question.pk][1])
+        self.assertEqual(self.client.get(url, {'after': 'x'}).status_code, 400)
+
+
+class ListingIndexTests(TestCase):
+    """
+    The newest-first list queries are index range scans returning rows in
+    index order: EXPLAIN names the composite index and shows no sort step.
+    """
+    # How a separate sort shows up in EXPLAIN, per backend
+    SORT_MARKERS = {
+        'sqlite': 'TEMP B-TREE',
+        'postgresql': 'Sort',
+        'mysql': 'filesort',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name="Springfield High")
+        cls.klass = Class.objects.create(name="Class 10", school=school)
+        cls.subject = Subject.objects.create(name="Maths")
+        cls.lecture = Lecture.objects.create(title="Lecture", class_assigned=cls.klass, subject=cls.subject)
+
+    def assertIndexScan(self, queryset, index_name):
+        if connection.vendor == 'postgresql':
+            # The test tables are tiny; make the planner show the index plan
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+        marker = self.SORT_MARKERS.get(connection.vendor)
+        if marker:
+            self.assertNotIn(marker, plan)
+
+    def test_class_lectures(self):
+        lectures = Lecture.objects.filter(class_assigned=self.klass).order_by('-uploaded_at')
+        self.assertIndexScan(lectures[:20], 'lecture_class_uploaded_idx')
+        self.assertIndexScan(lectures.filter(subject=self.subject)[:20], 'lecture_class_subject_idx')
+
+    def test_class_announcements(self):
+        announcements = Announcement.objects.filter(target_class=self.klass).order_by('-created_at')
+        self.assertIndexScan(announcements[:5], 'announcement_class_created_idx')
+        week_ago = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=7)
+        self.assertIndexScan(
+            announcements.filter(created_at__gte=week_ago).order_by().values('id'), 'announcement_class_created_idx'
+        )
+
+    def test_lecture_questions(self):
+        self.assertIndexScan(self.lecture.questions.order_by('-created_at')[:5], 'question_lecture_created_idx')
+        self.assertIndexScan(
+            Question.objects.filter(lecture=self.lecture).order_by('-created_at', '-id')[:20],
+            'question_lecture_created_idx',
+        )
+
+
+class FastReaderTests(TestCase):
+    """
+    FastReader output renders to exactly the bytes of the ModelSerializer's.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name="Springfield High")
+        klass = Class.objects.create(name="Class 10", school=school)
+        subject = Subject.objects.create(name="Maths")
+        teacher = User.objects.create_user('teacher', 'teacher@example.com', 'pass12345', role=Role.TEACHER)
+        student = User.objects.create_user('student', 'student@example.com', 'pass12345', role=Role.STUDENT)
+        lectures = [
+            Lecture.objects.create(
+                title="Algebra", description="Long text", video_url="https://example.com/v", class_assigned=klass,
+                subject=subject, topic="Chapter 1",
+            ),
+            # No class, subject or file: related names are omitted / null like DRF does
+            Lecture.objects.create(title="Orphan"),
+        ]
+        Attendance.objects.create(student=student, lecture=lectures[0], date=datetime.date(2025, 1, 31), present=True)
+        Attendance.objects.create(student=student, lecture=lectures[1], date=datetime.date(2025, 2, 1), present=False)
+        Announcement.objects.create(title="Exam", content="Friday", posted_by=teacher, target_class=klass, priority='high')
+
+    def assertSameJSON(self, serializer_class, queryset):
+        context = {'request': RequestFactory().get('/')}
+        expected = JSONRenderer().render(serializer_class(queryset, many=True, context=context).data)
+        self.assertEqual(JSONRenderer().render(FastReader.for_serializer(serializer_class).serialize(queryset, context)), expected)
+
+    @override_settings(STORAGES={'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'}})
+    def test_lectures(self):
+        lecture = Lecture.objects.get(title="Algebra")
+        lecture.video_file.save('lecture.mp4', ContentFile(b'...'))
+        self.assertSameJSON(LectureSerializer, Lecture.objects.order_by('id'))
+
+    def test_attendance(self):
+        self.assertSameJSON(AttendanceSerializer, Attendance.objects.order_by('id'))
+
+    def test_announcements(self):
+        self.assertSameJSON(AnnouncementSerializer, Announcement.objects.order_by('id'))
+
+
+class SparseFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name="Springfield High")
+        cls.klass = Class.objects.create(name="Class 10", school=school)
+        subject = Subject.objects.create(name="Maths")
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        cls.student = User.objects.create_user(
+            'student', 'student@example.com', 'pass12345', role=Role.STUDENT, school=school, assigned_class=cls.klass,
+        )
+        cls.lecture = Lecture.objects.create(
+            title="Algebra", description="Long text", class_assigned=cls.klass, subject=subject
+        )
+        Announcement.objects.create(title="Exam", content="Friday", posted_by=cls.admin, target_class=cls.klass)
+        question = Question.objects.create(title="Why?", content="...", asked_by=cls.student, lecture=cls.lecture)
+        Answer.objects.create(question=question, content="Because.", answered_by=cls.admin)
+
+    def get(self, user, url):
+        self.client.force_login(user)
+        reference_snapshot()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, ' '.join(q['sql'] for q in queries.captured_queries)
+
+    def test_list_prunes_output_and_columns(self):
+        response, sql = self.get(self.admin, reverse('lecture-list') + '?fields=title,id,subject_name')
+        self.assertEqual(response.json(), [{'id': self.lecture.pk, 'title': "Algebra", 'subject_name': "Maths"}])
+        self.assertNotIn('description', sql)
+        self.assertNotIn('courses_class', sql)
+
+    def test_retrieve_prunes_output_and_columns(self):
+        response, sql = self.get(self.admin, reverse('lecture-detail', args=[self.lecture.pk]) + '?fields=title')
+        self.assertEqual(response.json(), {'title': "Algebra"})
+        self.assertNotIn('description', sql)
+        self.assertNotIn('courses_subject', sql)
+
+    def test_related_names_and_dropped_prefetch(self):
+        response, _ = self.get(self.admin, reverse('announcement-list') + '?fields=title,school_name')
+        self.assertEqual(response.json(), [{'title': "Exam", 'school_name': "Springfield High"}])
+        response, sql = self.get(self.admin, reverse('question-list') + '?fields=id,title')
+        self.assertEqual(response.json()[0].keys(), {'id', 'title'})
+        self.assertNotIn('courses_answer', sql)
+
+    def test_unknown_field_is_rejected(self):
+        for url in (reverse('lecture-list'), reverse('student-lectures'), reverse('async-student-lectures')):
+            with self.subTest(url=url):
+                response, _ = self.get(self.student if 'student' in url else self.admin, url + '?fields=title,secret')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('secret', str(response.json()['fields']))
+
+    def test_student_lectures(self):
+        for route in ('student-lectures', 'async-student-lectures'):
+            with self.subTest(route=route):
+                response, sql = self.get(self.student, reverse(route) + '?fields=id,is_watched')
+                self.assertEqual(response.json()['lectures'], [{'id': self.lecture.pk, 'is_watched': False}])
+                self.assertNotIn('description', sql)
+
+
+class ReferenceCacheTests(TestCase):
+    """
+    School, Class and Subject resolve from the in-process cache, which
+    follows writes from this process and (through the version row) others.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name="Springfield High")
+        cls.klass = Class.objects.create(name="Class 10", school=cls.school)
+        cls.maths = Subject.objects.create(name="Maths")
+        cls.lectures = [
+            Lecture.objects.create(title=f"Lecture {i}", class_assigned=cls.klass, subject=cls.maths)
+            for i in range(3)
+        ]
+
+    def request(self):
+        # The version is checked once per request
+        request_started.send(sender=self.__class__)
+        self.addCleanup(request_finished.send, sender=self.__class__)
+
+    def test_names_resolve_without_joins(self):
+        reference_snapshot()
+        self.request()
+        lectures = list(Lecture.objects.order_by('id'))
+        with self.assertNumQueries(1):
+            names = [(str(lecture.class_assigned), lecture.subject.name) for lecture in lectures]
+        self.assertEqual(names, [("Class 10 - Springfield High", "Maths")] * 3)
+
+    def test_local_writes_are_visible(self):
+        self.assertEqual(Lecture.objects.get(pk=self.lectures[0].pk).subject.name, "Maths")
+        self.maths.name = "Mathematics"
+        self.maths.save()
+        self.assertEqual(Lecture.objects.get(pk=self.lectures[0].pk).subject.name, "Mathematics")
+
+    def test_other_process_writes_are_visible(self):
+        self.assertEqual(str(Class.objects.get(pk=self.klass.pk)), "Class 10 - Springfield High")
+        # What another process's School save does: new name, new version
+        School.objects.filter(pk=self.school.pk).update(name="Shelbyville High")
+        self.assertEqual(str(Class.objects.get(pk=self.klass.pk)), "Class 10 - Springfield High")
+        ReferenceDataVersion.objects.filter(pk=1).update(version=F('version') + 1)
+        self.assertEqual(str(Class.objects.get(pk=self.klass.pk)), "Class 10 - Shelbyville High")
+
+    def test_rolled_back_writes_are_dropped(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.klass.name = "Class 11"
+            self.klass.save()
+            self.assertEqual(Lecture.objects.get(pk=self.lectures[0].pk).class_assigned.name, "Class 11")
+            raise RuntimeError
+        self.assertEqual(Lecture.objects.get(pk=self.lectures[0].pk).class_assigned.name, "Class 10")
+
+    def test_modified_instances_are_not_shared(self):
+        lecture = Lecture.objects.get(pk=self.lectures[0].pk)
+        lecture.subject.name = "Changed"
+        self.assertEqual(Lecture.objects.get(pk=self.lectures[1].pk).subject.name, "Maths")
+
+    def test_scope_and_its_threads_check_once(self):
+        lecture = Lecture.objects.get(pk=self.lectures[0].pk)
+        with self.assertNumQueries(2):
+            # Outside a request or scope, every lookup checks the version
+            lecture.subject
+            lecture.class_assigned
+
+        thread_queries = []
+
+        def in_thread():
+            with CaptureQueriesContext(connection) as queries:
+                lecture.subject
+            thread_queries.append(len(queries))
+
+        with reference_scope():
+            reference_snapshot()
+            with self.assertNumQueries(0):
+                lecture.subject
+                lecture.class_assigned
+            # A pool thread running in a copy of the context (batch API)
+            thread = threading.Thread(target=copy_context().run, args=(in_thread,))
+            thread.start()
+            thread.join()
+        self.assertEqual(thread_queries, [0])
+
+
+class ReferenceVersionTests(TransactionTestCase):
+    """
+    The version row is written once per transaction, however many
+    reference rows it changes.
+    """
+    def version_writes(self, func):
+        with CaptureQueriesContext(connection) as queries:
+            func()
+        return sum(1 for query in queries if 'courses_referencedataversion' in query['sql']
+                   and query['sql'].startswith('UPDATE'))
+
+    def test_once_per_transaction(self):
+        def bulk():
+            with transaction.atomic():
+                for i in range(3):
+                    Subject.objects.create(name=f"Subject {i}")
+        self.assertEqual(self.version_writes(bulk), 1)
+        # Autocommit: every save is its own transaction
+        self.assertEqual(self.version_writes(lambda: Subject.objects.create(name="Art")), 1)
+
+    def test_again_after_a_rolled_back_savepoint(self):
+        def rolled_back_then_saved():
+            with transaction.atomic():
+                with self.assertRaises(RuntimeError), transaction.atomic():
+                    Subject.objects.create(name="Gone")
+                    reference_snapshot()  # cached with the row about to roll back
+                    raise RuntimeError
+                Subject.objects.create(name="Kept")
+                Subject.objects.create(name="Also kept")
+        self.assertEqual(self.version_writes(rolled_back_then_saved), 2)
+        self.assertEqual(sorted(row['name'] for row in reference_snapshot().rows[Subject][1].values()),
+                         ["Also kept", "Kept"])
+
+
+@override_settings(STORAGES={'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'}})
+class LectureCatalogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name="Springfield High")
+        cls.klass = Class.objects.create(name="Class 10", school=school)
+        cls.other_class = Class.objects.create(name="Class 11", school=school)
+        cls.maths = Subject.objects.create(name="Maths")
+        cls.physics = Subject.objects.create(name="Physics")
+        cls.student = User.objects.create_user(
+            'student', 'student@example.com', 'pass12345', role=Role.STUDENT, school=school, assigned_class=cls.klass,
+        )
+        cls.lectures = [
+            Lecture.objects.create(title="Algebra", class_assigned=cls.klass, subject=cls.maths,
+                                   video_url="https://example.com/v/1"),
+            Lecture.objects.create(title="Optics \u2028 \u00e9", class_assigned=cls.klass, subject=cls.physics,
+                                   description="Long text", video_file="lectures/videos/optics.mp4"),
+            Lecture.objects.create(title="Untitled", class_assigned=cls.klass, subject=None, duration_minutes=5),
+        ]
+        Attendance.objects.create(
+            student=cls.student, lecture=cls.lectures[1], date=datetime.date(2025, 1, 6), watched_video=True
+        )
+
+    def expected(self, subject_id=None):
+        watched = {self.lectures[1].pk}
+        lectures = filter_class_lectures(self.klass, subject_id)
+        data = build_lecture_list(self.klass, lectures, watched, class_subjects(self.klass.pk))
+        return JSONRenderer().render(data)
+
+    def rendered(self, subject_id=None):
+        return render_catalog(lecture_catalog(self.klass.pk), self.klass, {self.lectures[1].pk}, subject_id)
+
+    def test_byte_identical_to_lecture_list(self):
+        self.assertEqual(self.rendered(), self.expected())
+        self.assertEqual(self.rendered(self.physics.pk), self.expected(self.physics.pk))
+
+    def test_view_serves_catalog(self):
+        rebuild_catalog(self.klass.pk)
+        reference_snapshot()
+        self.client.force_login(self.student)
+        for route in ('student-lectures', 'async-student-lectures'):
+            with self.subTest(route=route):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(reverse(route))
+                self.assertEqual(response.content, self.expected())
+                self.assertNotIn('courses_subject', ' '.join(q['sql'] for q in queries.captured_queries))
+
+    def test_lecture_writes_update_entries(self):
+        built_at = rebuild_catalog(self.klass.pk).built_at
+        with self.captureOnCommitCallbacks(execute=True):
+            new = Lecture.objects.create(title="Geometry", class_assigned=self.klass, subject=self.maths)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lectures[0].title = "Algebra II"
+            self.lectures[0].save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lectures[2].delete()
+        self.assertEqual(self.rendered(), self.expected())
+        self.assertIn(b'Geometry', self.rendered())
+
+        # Moved away: gone from the old class, listed in the new one
+        rebuild_catalog(self.other_class.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            new.class_assigned = self.other_class
+            new.save()
+        self.assertNotIn(b'Geometry', self.rendered())
+        other = lecture_catalog(self.other_class.pk)
+        self.assertEqual([entry['id'] for entry in other.lectures], [new.pk])
+        self.assertGreater(lecture_catalog(self.klass.pk).built_at, built_at)
+
+    def test_bulk_update_rewrites_each_catalog_once(self):
+        rebuild_catalog(self.klass.pk)
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        self.client.force_login(admin)
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.patch(reverse('lecture-bulk'), [
+                {'id': lecture.pk, 'topic': "Revision"} for lecture in self.lectures
+            ], content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        catalog_callbacks = [c for c in callbacks if getattr(c, '__func__', None) is _PendingUpdates.run]
+        self.assertEqual(len(catalog_callbacks), 1)
+        # Savepoint, catalog lock, lectures, subjects, save, release
+        with self.assertNumQueries(6):
+            catalog_callbacks[0]()
+        self.assertEqual(self.rendered(), self.expected())
+
+    def test_etag_follows_the_catalog(self):
+        rebuild_catalog(self.klass.pk)
+        self.client.force_login(self.student)
+        etag = self.client.get(reverse('student-lectures'))['ETag']
+        # A request between the lecture write's commit and its catalog update
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.lectures[0].title = "Algebra II"
+            self.lectures[0].save()
+        response = self.client.get(reverse('student-lectures'), HTTP_IF_NONE_MATCH=etag)
+        self.assertNotIn(b'Algebra II', response.content)
+        for callback in callbacks:
+            callback()
+        response = self.client.get(reverse('student-lectures'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.expected())
+
+    def test_failed_update_marks_for_rebuild(self):
+        rebuild_catalog(self.klass.pk)
+        with mock.patch('courses.catalog.update_catalog_entries', side_effect=DatabaseError("lost connection")):
+            with self.assertLogs('django.test', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+                self.lectures[0].title = "Algebra II"
+                self.lectures[0].save()
+        self.assertIsNone(LectureCatalogSnapshot.objects.get(pk=self.klass.pk).built_at)
+        self.assertEqual(self.rendered(), self.expected())
+
+    def test_subject_rename_rebuilds(self):
+        rebuild_catalog(self.klass.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.maths.name = "Mathematics"
+            self.maths.save()
+        self.assertIsNone(LectureCatalogSnapshot.objects.get(pk=self.klass.pk).built_at)
+        self.assertIn(b'Mathematics', self.rendered())
+
+
+class LectureCatalogTransactionTests(TransactionTestCase):
+    """
+    Catalog updates are collected per transaction, and a rolled-back
+    transaction's don't swallow the next one's.
+    """
+    def setUp(self):
+        self.klass = Class.objects.create(name="Class 10", school=School.objects.create(name="Springfield High"))
+        rebuild_catalog(self.klass.pk)
+
+    def titles(self):
+        return [json.loads('{' + entry['parts'][0] + '}')['title'] for entry in lecture_catalog(self.klass.pk).lectures]
+
+    def test_once_per_transaction(self):
+        with mock.patch('courses.catalog.update_catalog_entries', wraps=update_catalog_entries) as update:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Lecture.objects.create(title="Gone", class_assigned=self.klass)
+                raise RuntimeError
+            self.assertEqual(update.call_count, 0)
+            with transaction.atomic():
+                for title in ("Optics", "Waves"):
+                    Lecture.objects.create(title=title, class_assigned=self.klass)
+            self.assertEqual(update.call_count, 1)
+        self.assertEqual(sorted(self.titles()), ["Optics", "Waves"])
+
+
+class AsyncViewParityTests(TestCase):
+    """
+    The async student views answer every request like their sync
+    counterparts: same status codes and bodies, and validators where the
+    sync view sends them (the ETag values differ: they hash the URL).
+    """
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name="Springfield High")
+        klass = Class.objects.create(name="Class 10", school=school)
+        other_class = Class.objects.create(name="Class 11", school=school)
+        cls.subject = Subject.objects.create(name="Physics")
+        cls.lecture = Lecture.objects.create(
+            title="Optics", class_assigned=klass, subject=cls.subject, video_url="https://example.com/optics"
+        )
+        cls.no_video = Lecture.objects.create(title="Waves", class_assigned=klass, subject=cls.subject)
+        cls.other_lecture = Lecture.objects.create(title="Sound", class_assigned=other_class, subject=cls.subject)
+        cls.student = User.objects.create_user(
+            'student', 'student@example.com', 'pass12345', role=Role.STUDENT, school=school, assigned_class=klass,
+        )
+        cls.unassigned = User.objects.create_user('newcomer', 'new@example.com', 'pass12345', role=Role.STUDENT)
+        cls.teacher = User.objects.create_user('teacher', 'teacher@example.com', 'pass12345', role=Role.TEACHER)
+        today = timezone.localdate()
+        for days, lecture in enumerate((cls.lecture, cls.no_video)):
+            Attendance.objects.create(
+                student=cls.student, lecture=lecture, date=today - datetime.timedelta(days=days), present=days == 0
+            )
+        Announcement.objects.create(title="Notice", content="...", posted_by=cls.teacher, target_class=klass)
+
+    def assertSameResponses(self, user, method, route, args=(), data=None):
+        """
+        route's response and async-route's, each request rolled back so
+        both see the same data.
+        """
+        self.client.force_login(user)
+        responses = []
+        for name in (route, f'async-{route}'):
+            with transaction.atomic():
+                response = getattr(self.client, method)(reverse(name, args=args), data)
+                transaction.set_rollback(True)
+            responses.append((response.status_code, response.json(), response.has_header('ETag')))
+        self.assertEqual(responses[0], responses[1])
+        return responses[0][0]
+
+    def test_reads(self):
+        cases = [
+            (self.student, 'student-dashboard', (), None, 200),
+            (self.unassigned, 'student-dashboard', (), None, 400),
+            (self.teacher, 'student-dashboard', (), None, 403),
+            (self.student, 'student-lectures', (), None, 200),
+            (self.student, 'student-lectures', (), {'subject': self.subject.pk, 'search': 'opt'}, 200),
+            (self.unassigned, 'student-lectures', (), None, 400),
+            (self.student, 'student-lecture-detail', (self.lecture.pk,), None, 200),
+            (self.student, 'student-lecture-detail', (self.other_lecture.pk,), None, 403),
+            (self.student, 'student-lecture-detail', (999999,), None, 404),
+            (self.student, 'student-attendance', (), None, 200),
+            (self.student, 'student-attendance', (), {'start_date': timezone.localdate().isoformat()}, 200),
+            (self.teacher, 'student-attendance', (), None, 403),
+            (self.student, 'student-profile', (), None, 200),
+        ]
+        for user, route, args, data, expected in cases:
+            with self.subTest(user=user.username, route=route, data=data):
+                self.assertEqual(self.assertSameResponses(user, 'get', route, args, data), expected)
+
+    def test_mark_watched(self):
+        cases = [
+            (self.lecture, 200),       # updates today's record
+            (self.no_video, 400),
+            (self.other_lecture, 403),
+        ]
+        for lecture, expected in cases:
+            with self.subTest(lecture=lecture.title):
+                self.assertEqual(
+                    self.assertSameResponses(self.student, 'post', 'mark-lecture-watched', (lecture.pk,)), expected
+                )
+
+
+class StudentSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name="Springfield High")
+        cls.klass = Class.objects.create(name="Class 10", school=school)
+        cls.other_class = Class.objects.create(name="Class 11", school=school)
+        cls.subject = Subject.objects.create(name="Maths")
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        cls.student = User.objects.create_user(
+            'student', 'student@example.com', 'pass12345', role=Role.STUDENT, school=school, assigned_class=cls.klass,
+        )
+        cls.lecture = Lecture.objects.create(title="Algebra", class_assigned=cls.klass, subject=cls.subject)
+        cls.announcement = Announcement.objects.create(
+            title="Exam", content="Friday", posted_by=cls.admin, target_class=cls.klass
+        )
+        cls.record = Attendance.objects.create(
+            student=cls.student, lecture=cls.lecture, date=datetime.date(2025, 1, 6), present=True
+        )
+
+    def sync(self, since=None):
+        self.client.force_login(self.student)
+        url = reverse('student-sync') + (f'?since={since}' if since else '')
+        return self.client.get(url)
+
+    def test_full_then_delta(self):
+        data = self.sync().json()
+        self.assertTrue(data['full'])
+        self.assertEqual([item['id'] for item in data['lectures']['changed']], [self.lecture.pk])
+        self.assertEqual(data['announcements']['changed'][0]['title'], "Exam")
+        self.assertEqual(data['attendance']['changed'][0]['lecture_id'], self.lecture.pk)
+        self.assertNotIn('video_url', data['lectures']['changed'][0])
+
+        # Rows older than the overlap window are not sent again
+        long_ago = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+        for model in (Lecture, Announcement, Attendance):
+            model.objects.update(updated_at=long_ago)
+        new = Lecture.objects.create(title="Geometry", class_assigned=self.klass, subject=self.subject)
+        data = self.sync(data['token']).json()
+        self.assertFalse(data['full'])
+        self.assertEqual([item['id'] for item in data['lectures']['changed']], [new.pk])
+        self.assertEqual(data['announcements']['changed'], [])
+        self.assertEqual(data['attendance']['changed'], [])
+
+    def test_deletions_are_tombstoned(self):
+        token = self.sync().json()['token']
+        lecture_id, announcement_id = self.lecture.pk, self.announcement.pk
+        self.announcement.delete()
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.delete(reverse('attendance-detail', args=[self.record.pk])).status_code, 204)
+        self.lecture.delete()
+
+        data = self.sync(token).json()
+        self.assertEqual(data['lectures']['deleted'], [lecture_id])
+        self.assertEqual(data['announcements']['deleted'], [announcement_id])
+        self.assertEqual(data['attendance']['deleted'], [self.record.pk])
+
+    def test_lecture_moved_to_another_class(self):
+        token = self.sync().json()['token']
+        self.lecture.class_assigned = self.other_class
+        self.lecture.save()
+        data = self.sync(token).json()
+        self.assertEqual(data['lectures'], {'changed': [], 'deleted': [self.lecture.pk]})
+
+    def test_announcement_moved_to_another_class(self):
+        token = self.sync().json()['token']
+        announcement = Announcement.objects.get(pk=self.announcement.pk)
+        announcement.target_class = self.other_class
+        announcement.save()
+        announcement.title = "Exam (moved)"
+        announcement.save()  # no second tombstone
+        data = self.sync(token).json()
+        self.assertEqual(data['announcements'], {'changed': [], 'deleted': [self.announcement.pk]})
+
+    def test_renames_are_synced(self):
+        long_ago = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+        for model in (Lecture, Announcement, Attendance):
+            model.objects.update(updated_at=long_ago)
+        token = self.sync().json()['token']
+        with self.captureOnCommitCallbacks(execute=True):
+            subject = Subject.objects.get(pk=self.subject.pk)
+            subject.name = "Mathematics"
+            subject.save()
+        admin = User.objects.get(pk=self.admin.pk)
+        admin.username = "principal"
+        admin.save()
+        data = self.sync(token).json()
+        self.assertEqual(data['lectures']['changed'][0]['subject']['name'], "Mathematics")
+        self.assertEqual(data['announcements']['changed'][0]['posted_by_username'], "principal")
+
+    def test_attendance_deleted_any_way_is_tombstoned(self):
+        token = self.sync().json()['token']
+        records = [
+            Attendance.objects.create(student=self.student, lecture=self.lecture, date=datetime.date(2025, 1, day))
+            for day in (7, 8)
+        ]
+        Attendance.objects.filter(pk__in=[self.record.pk, records[0].pk]).delete()
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.delete(reverse('attendance-detail', args=[records[1].pk])).status_code, 204)
+        data = self.sync(token).json()
+        self.assertEqual(sorted(data['attendance']['deleted']), [self.record.pk] + [r.pk for r in records])
+
+    def test_archived_attendance_is_not_tombstoned(self):
+        closed_year = academic_year(archive_horizon()) - 1
+        Attendance.objects.filter(pk=self.record.pk).update(date=academic_year_bounds(closed_year)[0])
+        archive_year(closed_year)
+        self.assertFalse(Attendance.objects.exists())
+        self.assertFalse(Tombstone.objects.filter(kind=Tombstone.ATTENDANCE).exists())
+
+    def test_class_change_or_expired_token_sends_everything(self):
+        token = self.sync().json()['token']
+        User.objects.filter(pk=self.student.pk).update(assigned_class=self.other_class)
+        data = self.sync(token).json()
+        self.assertTrue(data['full'])
+        self.assertEqual(data['lectures']['changed'], [])
+
+        with override_settings(SYNC_TOMBSTONE_DAYS=0):
+            self.assertTrue(self.sync(data['token']).json()['full'])
+
+    def test_invalid_token(self):
+        for token in ('abc', '1-2-3', '99999999999999999999999-1'):
+            with self.subTest(token=token):
+                self.assertEqual(self.sync(token).status_code, 400)
+
+
+class BatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name="Springfield High")
+        klass = Class.objects.create(name="Class 10", school=school)
+        subject = Subject.objects.create(name="Maths")
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        cls.student = User.objects.create_user(
+            'student', 'student@example.com', 'pass12345', role=Role.STUDENT, school=school, assigned_class=klass,
+        )
+        Lecture.objects.create(title="Algebra", class_assigned=klass, subject=subject)
+        Announcement.objects.create(title="Exam", content="Friday", posted_by=admin, target_class=klass)
+
+    def setUp(self):
+        self.client.force_login(self.student)
+
+    def batch(self, *items):
+        return self.client.post(reverse('batch'), {'requests': list(items)}, content_type='application/json')
+
+    def test_same_responses_as_direct_requests(self):
+        paths = [
+            reverse('student-dashboard'), reverse('student-lectures') + '?fields=id,title',
+            reverse('async-student-profile'), reverse('announcement-list'), reverse('school-list'),
+        ]
+        response = self.batch(*({'path': path} for path in paths))
+        self.assertEqual(response.status_code, 200)
+        for path, item in zip(paths, response.json()['responses']):
+            with self.subTest(path=path):
+                direct = self.client.get(path)
+                self.assertEqual(item['status'], direct.status_code)
+                self.assertEqual(item['body'], direct.json())
+                if direct.has_header('ETag'):
+                    self.assertEqual(item['headers']['ETag'], direct['ETag'])
+
+    def test_conditional_headers(self):
+        etag = self.client.get(reverse('student-lectures'))['ETag']
+        item = self.batch({'path': reverse('student-lectures'), 'headers': {'If-None-Match': etag}}).json()
+        self.assertEqual(item['responses'][0]['status'], 304)
+        self.assertIsNone(item['responses'][0]['body'])
+
+    def test_invalid_sub_requests(self):
+        response = self.batch(
+            {'path': reverse('student-profile')},
+            {'path': reverse('student-change-password'), 'method': 'POST'},
+            {'path': '/api/nowhere/'},
+            {'path': reverse('batch')},
+            {'path': '/admin/'},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()['error']), {'1', '2', '3', '4'})
+
+        with override_settings(BATCH_MAX_REQUESTS=1):
+            self.assertEqual(self.batch({'path': '/api/schools/'}, {'path': '/api/classes/'}).status_code, 400)
+
+    def test_requires_authentication(self):
+        self.client.logout()
+        self.assertIn(self.batch({'path': reverse('student-profile')}).status_code, (401, 403))
+
+    def test_sub_requests_are_authenticated_as_the_batch_user(self):
+        # Batch authenticated with HTTP Basic: no session for the sub-requests to reuse
+        self.client.logout()
+        credentials = base64.b64encode(b'student:pass12345').decode()
+        paths = [reverse('student-profile'), reverse('async-student-profile')]
+        response = self.client.post(
+            reverse('batch'), {'requests': [{'path': path} for path in paths]},
+            content_type='application/json', HTTP_AUTHORIZATION=f'Basic {credentials}',
+        )
+        self.assertEqual(
+            [(item['status'], item['body']['username']) for item in response.json()['responses']],
+            [(200, 'student'), (200, 'student')],
+        )
+
+        subs = [
+            _sub_request(RequestFactory().post(reverse('batch')), self.student, *item)
+            for item in parse_batch({'requests': [{'path': reverse('student-profile')}] * 2})
+        ]
+        self.assertIsNot(subs[0].batch_user, subs[1].batch_user)
+        self.assertIsNot(subs[0].batch_user.school, subs[1].batch_user.school)
+        self.assertEqual(BatchUserAuthentication().authenticate(Request(subs[0])), (subs[0].batch_user, None))
+        # Requests from outside carry no batch user
+        self.assertIsNone(BatchUserAuthentication().authenticate(Request(RequestFactory().get('/'))))
+
+
+class BatchConcurrencyTests(TransactionTestCase):
+    """
+    Outside a transaction the sub-requests run on the thread pool.
+    """
+    def test_thread_pool(self):
+        school = School.objects.create(name="Springfield High")
+        klass = Class.objects.create(name="Class 10", school=school)
+        student = User.objects.create_user(
+            'student', 'student@example.com', 'pass12345', role=Role.STUDENT, school=school, assigned_class=klass,
+        )
+        self.client.force_login(student)
+        routes = ['student-dashboard', 'student-lectures', 'student-attendance', 'student-profile']
+        response = self.client.post(reverse('batch'), {
+            'requests': [{'path': reverse(route)} for route in routes]
+        }, content_type='application/json')
+        self.assertEqual([item['status'] for item in response.json()['responses']], [200] * len(routes))
+        self.assertEqual(response.json()['responses'][3]['body']['email'], 'student@example.com')
+
+        # The pool threads' queries count towards the batch's, as they do
+        # when the sub-requests run on the request's thread
+        def queries():
+            response = self.client.post(reverse('batch'), {
+                'requests': [{'path': reverse(route)} for route in routes]
+            }, content_type='application/json')
+            return re.search(r'desc="(\d+) queries"', response['Server-Timing']).group(1)
+
+        with override_settings(BATCH_MAX_WORKERS=1):
+            serial = queries()
+        self.assertEqual(queries(), serial)
+
+
+class AnnouncementStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name="Springfield High")
+        cls.other_school = School.objects.create(name="Shelbyville High")
+        cls.klass = Class.objects.create(name="Class 10", school=cls.school)
+        cls.teacher = User.objects.create_user(
+            'teacher', 'teacher@example.com', 'pass12345', role=Role.TEACHER, school=cls.school
+        )
+        cls.outsider = User.objects.create_user(
+            'outsider', 'outsider@example.com', 'pass12345', role=Role.TEACHER, school=cls.other_school
+        )
+        cls.student = User.objects.create_user(
+            'student', 'student@example.com', 'pass12345',
+            role=Role.STUDENT, school=cls.school, assigned_class=cls.klass,
+        )
+        cls.announcement = Announcement.objects.create(
+            title="Exam", content="Friday", posted_by=cls.teacher, target_class=cls.klass
+        )
+
+    async def open_stream(self, user):
+        # The view itself, not the test client: the client's wrapper around
+        # streaming_content would not close the view's generator (_iterator)
+        request = AsyncRequestFactory().get(reverse('announcement-stream', args=[self.klass.pk]))
+        request.user = user
+        return await announcement_stream(request, self.klass.pk)
+
+    async def test_published_announcement_reaches_the_stream(self):
+        response = await self.open_stream(self.student)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = response._iterator
+        # The first chunk is sent once subscribed
+        self.assertEqual(await anext(stream), b"retry: 5000\n\n")
+
+        publish_announcement(self.announcement, "created")
+        chunk = await asyncio.wait_for(anext(stream), timeout=5)
+        self.assertTrue(chunk.startswith(b"event: announcement\ndata: "))
+        event = json.loads(chunk.decode().split('data: ', 1)[1])
+        self.assertEqual((event['event'], event['id'], event['title']), ("created", self.announcement.pk, "Exam"))
+        # A client disconnecting unsubscribes
+        await stream.aclose()
+        self.assertEqual(get_backend().broker.subscriber_count(self.klass.pk), 0)
+
+    async def test_only_the_class_and_its_school_may_subscribe(self):
+        response = await self.open_stream(self.outsider)
+        self.assertEqual(response.status_code, 403)
+
+        response = await self.open_stream(self.teacher)
+        self.assertEqual(response.status_code, 200)
+        await response._iterator.aclose()
+
+    @override_settings(ANNOUNCEMENT_EVENTS_POLL_INTERVAL=0.01)
+    async def test_database_backend_fans_out_to_other_processes(self):
+        # Two workers: each with its own broker, sharing the database
+        writer, reader = DatabaseBackend(LocalBroker()), DatabaseBackend(LocalBroker())
+        await sync_to_async(writer.publish)(self.klass.pk, {"event": "created", "id": 1})
+
+        async with reader.subscribe(self.klass.pk) as queue, reader.subscribe(self.klass.pk + 1) as other:
+            # Let the poller start from the latest event; earlier ones are not replayed
+            await asyncio.sleep(0.1)
+            await sync_to_async(writer.publish)(self.klass.pk, {"event": "updated", "id": 1})
+            event = await asyncio.wait_for(queue.get(), timeout=5)
+            self.assertEqual(event, {"event": "updated", "id": 1})
+            self.assertTrue(queue.empty())
+            self.assertTrue(other.empty())
+        # The poller stops with the last subscriber
+        await asyncio.wait_for(reader._poller, timeout=5)
+
+    @override_settings(ANNOUNCEMENT_EVENTS_POLL_INTERVAL=0.01)
+    async def test_database_backend_delivers_late_commits_once(self):
+        reader = DatabaseBackend(LocalBroker())
+        async with reader.subscribe(self.klass.pk) as queue:
+            await asyncio.sleep(0.1)
+            # The insert with the lower id commits after the higher one was read
+            for pk in (1000, 999):
+                await AnnouncementEvent.objects.acreate(id=pk, channel=self.klass.pk, payload={"id": pk})
+                self.assertEqual(await asyncio.wait_for(queue.get(), timeout=5), {"id": pk})
+            await asyncio.sleep(0.1)
+            self.assertTrue(queue.empty())
+        await asyncio.wait_for(reader._poller, timeout=5)
+
+
+class SingleFlightTests(TestCase):
+    """
+    Identical concurrent computations run once and share the result.
+    """
+    def setUp(self):
+        registry.reset()
+
+    def test_threads_share_one_computation(self):
+        calls, results, followers = [], [], []
+
+        def compute():
+            calls.append(1)
+            for _ in range(3):
+                thread = threading.Thread(target=lambda: results.append(single_flight(('test', 1), compute)))
+                thread.start()
+                followers.append(thread)
+            time.sleep(0.2)  # the followers find this call in flight
+            return {'value': 42}
+
+        self.assertEqual(single_flight(('test', 1), compute), {'value': 42})
+        for thread in followers:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'value': 42}] * 3)
+        self.assertEqual(registry.get('singleflight_calls_total', computation='test', role='follower'), 3)
+
+    def test_finished_results_are_not_kept(self):
+        self.assertEqual(single_flight(('test', 1), lambda: 1), 1)
+        self.assertEqual(single_flight(('test', 1), lambda: 2), 2)
+
+    def test_coroutines_share_one_computation(self):
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'done'
+
+        async def run():
+            return await asyncio.gather(*(asingle_flight(('test', 2), compute) for _ in range(3)))
+
+        self.assertEqual(async_to_sync(run)(), ['done'] * 3)
+        self.assertEqual(len(calls), 1)
+
+    def test_errors_are_shared(self):
+        async def compute():
+            await asyncio.sleep(0.05)
+            raise ValueError('boom')
+
+        async def run():
+            return await asyncio.gather(*(asingle_flight(('test', 3), compute) for _ in range(2)), return_exceptions=True)
+
+        self.assertEqual([type(result) for result in async_to_sync(run)()], [ValueError, ValueError])
+
+
+    def test_dashboard_key_is_per_class_state(self):
+        school = School.objects.create(name="Springfield High")
+        klass = Class.objects.create(name="Class 10", school=school)
+        students = [
+            User.objects.create_user(name, f'{name}@example.com', 'pass12345', role=Role.STUDENT, assigned_class=klass)
+            for name in ('ann', 'bob')
+        ]
+        factory = RequestFactory()
+
+        def key(student):
+            request = factory.get('/api/student/dashboard/')
+            request.user = student
+            week_ago = timezone.now() - datetime.timedelta(days=7)
+            return dashboard_sections_key(klass, compute_validators(
+                request, dashboard_validator_sources(student, klass, week_ago), user_fields=DASHBOARD_USER_FIELDS
+            ))
+
+        first = key(students[0])
+        self.assertEqual(key(students[1]), first)
+        Announcement.objects.create(title="Exam", content="Friday", posted_by=students[0], target_class=klass)
+        self.assertNotEqual(key(students[1]), first)
+
+class SingleFlightWriteTests(TransactionTestCase):
+    """
+    Outside a transaction, as in production: coalescing the dashboard
+    stays in the process and writes nothing.
+    """
+    def test_dashboard_runs_no_writes(self):
+        school = School.objects.create(name="Springfield High")
+        klass = Class.objects.create(name="Class 10", school=school)
+        subject = Subject.objects.create(name="Physics")
+        student = User.objects.create_user(
+            'student', 'student@example.com', 'pass12345', role=Role.STUDENT, school=school, assigned_class=klass,
+        )
+        lecture = Lecture.objects.create(title="Optics", class_assigned=klass, subject=subject)
+        Attendance.objects.create(student=student, lecture=lecture, date=datetime.date.today(), present=True)
+        rebuild_catalog(klass.pk)
+        self.client.force_login(student)
+
+        for route in ('student-dashboard', 'async-student-dashboard'):
+            with self.subTest(route=route), CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(reverse(route)).status_code, 200)
+            writes = [
+                query['sql'] for query in queries
+                if query['sql'].lstrip().split(None, 1)[0].upper() in ('INSERT', 'UPDATE', 'DELETE', 'SAVEPOINT')
+            ]
+            self.assertEqual(writes, [])
+
+
+@override_settings(ADMISSION_LANES={'heavy': {'concurrency': 1, 'queue': 1, 'timeout': 0.05, 'retry_after': 30}})
+class AdmissionControlTests(TestCase):
+    """
+    Heavy routes run in a bounded lane; past it they are shed with 503.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name="Springfield High")
+        cls.klass = Class.objects.create(name="Class 10", school=school)
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+
+    def setUp(self):
+        reset_lanes()
+        self.addCleanup(reset_lanes)
+        registry.reset()
+        self.client.force_login(self.admin)
+        self.report_url = reverse('attendance-report') + f'?class_id={self.klass.pk}'
+
+    def occupy(self):
+        lane = lane_for('attendance-report')
+        self.assertTrue(lane.acquire())
+        self.addCleanup(lane.release)
+        return lane
+
+    def test_sheds_past_the_queue_timeout(self):
+        self.occupy()
+        response = self.client.get(self.report_url)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(registry.get('admission_requests_total', lane='heavy', outcome='timeout'), 1)
+        # Other routes are not held back
+        self.assertEqual(self.client.get(reverse('school-list')).status_code, 200)
+
+    @override_settings(ADMISSION_LANES={'heavy': {'concurrency': 1, 'queue': 0}})
+    def test_sheds_when_the_queue_is_full(self):
+        self.occupy()
+        self.assertEqual(self.client.get(reverse('users:student-upload')).status_code, 503)
+        self.assertEqual(registry.get('admission_requests_total', lane='heavy', outcome='queue_full'), 1)
+
+    def test_slot_is_released_after_the_request(self):
+        for _ in range(2):
+            self.assertEqual(self.client.get(self.report_url).status_code, 200)
+        self.assertEqual(lane_for('attendance-report').in_flight, 0)
+        self.assertEqual(registry.get('admission_in_flight', lane='heavy'), 0)
+
+    @override_settings(ADMISSION_ROUTES={'attendance-export': 'heavy'})
+    def test_streaming_response_holds_the_slot_until_closed(self):
+        response = self.client.get(reverse('attendance-export'))
+        lane = lane_for('attendance-export')
+        self.assertEqual(lane.in_flight, 1)
+        # The test client closes the response once the body is consumed
+        b''.join(response.streaming_content)
+        self.assertEqual(lane.in_flight, 0)
+
+    def test_lanes_must_leave_a_thread_free(self):
+        check_lanes()
+        # concurrency 1 + queue 1
+        with override_settings(ADMISSION_WORKER_THREADS=2):
+            with self.assertRaisesMessage(ImproperlyConfigured, "Admission lane 'heavy' can hold 2 threads"):
+                check_lanes()
+        with override_settings(ADMISSION_ROUTES={'attendance-report': 'bulk'}):
+            with self.assertRaises(ImproperlyConfigured):
+                check_lanes()
+
+    def test_queued_request_gets_the_freed_slot(self):
+        lane = Lane('test', concurrency=1, queue=1, timeout=5)
+        self.assertTrue(lane.acquire())
+        threading.Timer(0.05, lane.release).start()
+        self.assertTrue(lane.acquire())
+        self.assertEqual(lane.queued, 0)
+
+    def test_batch_uses_the_lanes(self):
+        self.occupy()
+        response = self.client.post(reverse('batch'), {'requests': [
+            {'path': self.report_url}, {'path': reverse('school-list')},
+        ]}, content_type='application/json')
+        self.assertEqual([item['status'] for item in response.json()['responses']], [503, 200])
+
+
+class BulkActionsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        cls.school = School.objects.create(name="Springfield High")
+        cls.other_school = School.objects.create(name="Shelbyville High")
+        cls.klass = Class.objects.create(name="Class 10", school=cls.school)
+        cls.subject = Subject.objects.create(name="Maths")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def send(self, method, route, data):
+        return getattr(self.client, method)(reverse(route), data, content_type='application/json')
+
+    def test_create_sets_denormalized_school(self):
+        response = self.send('post', 'lecture-bulk', [
+            {'title': f"Lecture {i}", 'class_assigned': self.klass.pk, 'subject': self.subject.pk} for i in range(3)
+        ])
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual([item['class_assigned_name'] for item in response.json()], ["Class 10"] * 3)
+        self.assertEqual(set(Lecture.objects.values_list('school_id', flat=True)), {self.school.pk})
+
+    def test_create_is_all_or_nothing(self):
+        response = self.send('post', 'class-bulk', [
+            {'name': "Class 11", 'school': self.school.pk},
+            {'name': "Class 12", 'school': 999999},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()[0], {})
+        self.assertIn('school', response.json()[1])
+        self.assertEqual(Class.objects.count(), 1)
+
+    def test_update_moves_class_and_its_lectures(self):
+        lecture = Lecture.objects.create(title="Lecture", class_assigned=self.klass, subject=self.subject)
+        response = self.send('patch', 'class-bulk', [{'id': self.klass.pk, 'school': self.other_school.pk}])
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()[0]['school_name'], "Shelbyville High")
+        lecture.refresh_from_db()
+        self.assertEqual(lecture.school_id, self.other_school.pk)
+
+    def test_update_writes_only_each_items_fields(self):
+        first, second = (
+            Lecture.objects.create(title=f"Lecture {i}", topic="Algebra", class_assigned=self.klass, subject=self.subject)
+            for i in range(2)
+        )
+        serializer = LectureSerializer(
+            list(Lecture.objects.order_by('pk')), many=True, partial=True,
+            data=[{'id': first.pk, 'title': "Renamed"}, {'id': second.pk, 'topic': "Geometry"}],
+        )
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        # Edited by someone else after the instances were read
+        Lecture.objects.filter(pk=first.pk).update(topic="Trigonometry")
+        Lecture.objects.filter(pk=second.pk).update(title="Lecture B")
+        with CaptureQueriesContext(connection) as queries:
+            serializer.save()
+        # One UPDATE per set of fields
+        self.assertEqual(sum(q['sql'].startswith('UPDATE "courses_lecture"') for q in queries), 2)
+        self.assertEqual(
+            list(Lecture.objects.order_by('pk').values_list('title', 'topic')),
+            [("Renamed", "Trigonometry"), ("Lecture B", "Geometry")],
+        )
+
+    def test_update_rejects_unknown_and_repeated_ids(self):
+        response = self.send('patch', 'subject-bulk', [
+            {'id': self.subject.pk, 'name': "Algebra"},
+            {'id': self.subject.pk, 'name': "Geometry"},
+            {'id': 999999, 'name': "History"},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([bool(errors) for errors in response.json()], [False, True, True])
+        self.subject.refresh_from_db()
+        self.assertEqual(self.subject.name, "Maths")
+
+    def test_delete(self):
+        extra = Subject.objects.create(name="Physics")
+        response = self.send('delete', 'subject-bulk', {'ids': [extra.pk, 999999]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['ids'], [999999])
+        response = self.send('delete', 'subject-bulk', {'ids': [extra.pk, self.subject.pk]})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Subject.objects.exists())
+
+
+class AttendanceBulkTests(TestCase):
+    """
+    POST /api/attendance/bulk/: per-item results, tenant checks and
+    Idempotency-Key replays.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name="Springfield High")
+        other_school = School.objects.create(name="Shelbyville High")
+        klass = Class.objects.create(name="Class 10", school=school)
+        other_class = Class.objects.create(name="Class 10", school=other_school)
+        subject = Subject.objects.create(name="Physics")
+        cls.lecture = Lecture.objects.create(title="Optics", class_assigned=klass, subject=subject)
+        cls.other_lecture = Lecture.objects.create(title="Optics", class_assigned=other_class, subject=subject)
+        cls.teacher = User.objects.create_user(
+            'teacher', 'teacher@example.com', 'pass12345', role=Role.TEACHER, school=school
+        )
+        cls.student = User.objects.create_user(
+            'student', 'student@example.com', 'pass12345', role=Role.STUDENT, school=school, assigned_class=klass
+        )
+        cls.other_student = User.objects.create_user(
+            'other', 'other@example.com', 'pass12345', role=Role.STUDENT, school=other_school,
+            assigned_class=other_class,
+        )
+        cls.day = datetime.date(2025, 1, 31)
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def post(self, records, **headers):
+        return self.client.post(
+            reverse('attendance-bulk'), {'records': records}, content_type='application/json', headers=headers
+        )
+
+    def record(self, day=0, **values):
+        return {
+            'student': self.student.pk, 'lecture': self.lecture.pk,
+            'date': (self.day + datetime.timedelta(days=day)).isoformat(), 'present': True, **values,
+        }
+
+    def test_created_updated_unchanged(self):
+        Attendance.objects.create(student=self.student, lecture=self.lecture, date=self.day, present=False)
+        Attendance.objects.create(
+            student=self.student, lecture=self.lecture, date=self.day + datetime.timedelta(days=1), present=True
+        )
+        response = self.post([self.record(0), self.record(1), self.record(2, watched_video=True)])
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        self.assertEqual((body['created'], body['updated'], body['unchanged'], body['errors']), (1, 1, 1, 0))
+        self.assertEqual([r['status'] for r in body['results']], ['updated', 'unchanged', 'created'])
+        records = Attendance.objects.order_by('date')
+        self.assertEqual([r['id'] for r in body['results']], [r.pk for r in records])
+        self.assertEqual(
+            [(r.present, r.watched_video, r.school_id) for r in records],
+            [(True, False, self.student.school_id), (True, False, self.student.school_id),
+             (True, True, self.student.school_id)],
+        )
+
+    def test_invalid_items_do_not_stop_the_others(self):
+        response = self.post([
+            self.record(0),
+            self.record(1, present='yes', date='31/01/2025'),
+            {'student': self.student.pk},
+            "not an object",
+            self.record(0),
+        ])
+        self.assertEqual(response.status_code, 200, response.content)
+        body = response.json()
+        self.assertEqual((body['created'], body['errors']), (1, 4))
+        results = body['results']
+        self.assertEqual(results[0]['status'], 'created')
+        self.assertEqual(set(results[1]['errors']), {'present', 'date'})
+        self.assertEqual(set(results[2]['errors']), {'lecture', 'date', 'present'})
+        self.assertIn('non_field_errors', results[3]['errors'])
+        self.assertEqual(results[4]['errors'], {'non_field_errors': ['Duplicate of item 0.']})
+        self.assertEqual(Attendance.objects.count(), 1)
+
+    def test_other_schools_are_rejected(self):
+        response = self.post([
+            self.record(0, student=self.other_student.pk),
+            self.record(0, lecture=self.other_lecture.pk),
+            self.record(0, student=999999),
+        ])
+        results = response.json()['results']
+        self.assertEqual(results[0]['errors'], {'student': [f"Student {self.other_student.pk} is not in your school."]})
+        self.assertEqual(results[1]['errors'], {'lecture': [f"Lecture {self.other_lecture.pk} is not in your school."]})
+        self.assertEqual(results[2]['errors'], {'student': ["Student 999999 not found."]})
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_idempotent_replay(self):
+        first = self.post([self.record(0)], Idempotency_Key='sync-1')
+        Attendance.objects.update(present=False)
+        replay = self.post([self.record(0)], Idempotency_Key='sync-1')
+        self.assertEqual(replay.status_code, 200)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay.json(), first.json())
+        # Not written again
+        self.assertFalse(Attendance.objects.get().present)
+
+        response = self.post([self.record(1)], Idempotency_Key='sync-1')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Attendance.objects.count(), 1)
+
+
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+
+    def setUp(self):
+        registry.reset()
+        self.client.force_login(self.user)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('school-list'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('ser;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('school-list'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('http_requests_total{method="GET",route="school-list",status="200"} 1', body)
+        self.assertIn('http_request_db_queries_count{route="school-list"} 1', body)
+        self.assertIn('http_response_size_bytes_bucket{route="school-list",le="+Inf"} 1', body)
+
+    def test_metrics_endpoint_requires_access(self):
+        self.client.logout()
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='10.1.2.3')
+        self.assertEqual(response.status_code, 403)
+        # Localhost is not trusted by default (a reverse proxy's address)
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 403)
+        with override_settings(METRICS_TOKEN='s3cret'):
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+
+    def test_middleware_runs_natively_under_asgi(self):
+        async def get_response(request):
+            pass
+
+        middlewares = (RequestMetricsMiddleware, AdmissionControlMiddleware, ReplicaRoutingMiddleware, ProfilingMiddleware)
+        for middleware in middlewares:
+            with override_settings(PROFILING_ENABLED=True):
+                self.assertTrue(iscoroutinefunction(middleware(get_response)))
+                self.assertFalse(iscoroutinefunction(middleware(lambda request: None)))
+
+    async def test_async_request_is_measured(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('async-student-profile'))
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertEqual(
+            registry.get('http_requests_total', route='async-student-profile', method='GET', status=response.status_code), 1
+        )
+
+
+class AttendanceArchiveTests(TestCase):
+    """
+    Closed academic years move into AttendanceArchive and back, and the
+    read APIs combine both tables.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name="Springfield High")
+        cls.klass = Class.objects.create(name="Class 10", school=school)
+        cls.lecture = Lecture.objects.create(
+            title="Optics", class_assigned=cls.klass, subject=Subject.objects.create(name="Physics")
+        )
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        cls.student = User.objects.create_user(
+            'student', 'student@example.com', 'pass12345', first_name="Ann",
+            role=Role.STUDENT, school=school, assigned_class=cls.klass,
+        )
+        # Two records in a closed year, one live
+        cls.closed_year = academic_year(archive_horizon()) - 1
+        year_start = academic_year_bounds(cls.closed_year)[0]
+        for days, present in ((10, True), (20, False)):
+            Attendance.objects.create(
+                student=cls.student, lecture=cls.lecture, date=year_start + datetime.timedelta(days=days), present=present
+            )
+        Attendance.objects.create(student=cls.student, lecture=cls.lecture, date=timezone.localdate(), present=True)
+
+    def closed_rows(self):
+        start, end = academic_year_bounds(self.closed_year)
+        return list(Attendance.objects.filter(date__gte=start, date__lt=end).order_by('id').values(
+            'id', 'student_id', 'lecture_id', 'student_class_id', 'school_id', 'date', 'present', 'watched_video'
+        ))
+
+    def test_archive_restore_round_trip(self):
+        before = self.closed_rows()
+        self.assertEqual(archive_year(self.closed_year), (1, 2))
+        self.assertEqual(self.closed_rows(), [])
+        archive = AttendanceArchive.objects.get()
+        self.assertEqual((archive.record_count, archive.present_count), (2, 1))
+        self.assertEqual(archive.school_id, self.klass.school_id)
+        self.assertEqual(archive_year(self.closed_year), (0, 0))
+
+        # Late records are merged into the existing archive row; one with
+        # the key of an archived record replaces it
+        late = Attendance.objects.create(
+            student=self.student, lecture=self.lecture, date=before[-1]['date'] + datetime.timedelta(days=1),
+            present=True,
+        )
+        correction = Attendance.objects.create(
+            student=self.student, lecture=self.lecture, date=before[-1]['date'], present=True
+        )
+        self.assertEqual(archive_year(self.closed_year), (1, 2))
+        self.assertEqual(AttendanceArchive.objects.get().record_count, 3)
+
+        # Written after the last archive run: wins over its archived key
+        newer = Attendance.objects.create(
+            student=self.student, lecture=self.lecture, date=before[0]['date'], present=False
+        )
+        self.assertEqual(restore_year(self.closed_year), (1, 2))
+        self.assertFalse(AttendanceArchive.objects.exists())
+        self.assertEqual(self.closed_rows(), sorted([
+            {**before[-1], 'id': correction.pk, 'present': True},
+            {**before[-1], 'id': late.pk, 'date': late.date, 'present': True},
+            {**before[0], 'id': newer.pk, 'present': False},
+        ], key=lambda row: row['id']))
+
+    def test_live_years_are_not_archived(self):
+        with self.assertRaises(ValueError):
+            archive_year(self.closed_year + 1)
+        self.assertEqual(archivable_years(), [self.closed_year])
+
+    def test_needs_archive_boundaries(self):
+        horizon = archive_horizon()
+        self.assertEqual((horizon.month, horizon.day), (4, 1))
+        self.assertFalse(needs_archive(horizon))
+        self.assertFalse(needs_archive(horizon.isoformat()))
+        self.assertTrue(needs_archive(horizon - datetime.timedelta(days=1)))
+        self.assertTrue(needs_archive((horizon - datetime.timedelta(days=1)).isoformat()))
+        self.assertTrue(needs_archive(None))
+        self.assertTrue(needs_archive(''))
+        self.assertFalse(needs_archive('not-a-date'))
+        self.assertFalse(needs_archive('2024-13-01'))
+        self.assertEqual(academic_year(datetime.date(2024, 3, 31)), 2023)
+        self.assertEqual(academic_year(datetime.date(2024, 4, 1)), 2024)
+
+    def test_reads_include_archived_rows(self):
+        archive_year(self.closed_year)
+        self.client.force_login(self.student)
+        for route in ('student-attendance', 'async-student-attendance'):
+            with self.subTest(route=route):
+                body = self.client.get(reverse(route)).json()
+                self.assertEqual(body['summary']['total_lectures'], 3)
+                self.assertEqual(body['summary']['present'], 2)
+                dates = [item['date'] for item in body['history']]
+                self.assertEqual(dates, sorted(dates, reverse=True))
+                # A range inside the live years skips the archive
+                body = self.client.get(reverse(route), {'start_date': archive_horizon().isoformat()}).json()
+                self.assertEqual(body['summary']['total_lectures'], 1)
+        for route in ('student-dashboard', 'async-student-dashboard'):
+            with self.subTest(route=route):
+                attendance = self.client.get(reverse(route)).json()['attendance']
+                self.assertEqual((attendance['total_records'], attendance['present_count']), (3, 2))
+
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('attendance-report'), {'class_id': self.klass.pk})
+        rows = list(openpyxl.load_workbook(io.BytesIO(response.content)).active.iter_rows(min_row=2, values_only=True))
+        self.assertEqual([row[4] for row in rows], ["Present", "Absent", "Present"])  # newest first
+        self.assertEqual({row[1] for row in rows}, {"Ann"})
+
+
+class AttendanceExportTests(TestCase):
+    """
+    'scol' exports decode back to the exported rows, and an export from
+    the watermark of the last one returns only the rows changed since.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        school = School.objects.create(name="Springfield High")
+        klass = Class.objects.create(name="Class 10", school=school)
+        lecture = Lecture.objects.create(
+            title="Optics", class_assigned=klass, subject=Subject.objects.create(name="Physics")
+        )
+        student = User.objects.create_user(
+            'student', 'student@example.com', 'pass12345', role=Role.STUDENT, school=school, assigned_class=klass,
+        )
+        start = datetime.date(2026, 9, 1)
+        cls.ids = [
+            Attendance.objects.create(
+                student=student, lecture=lecture, date=start + datetime.timedelta(days=day), present=day % 3 == 0,
+            ).pk
+            for day in range(8)
+        ]
+        # A lecture-less record: nulls in lecture_id and subject_id
+        cls.ids.append(Attendance.objects.create(student=student, lecture=None, date=start, watched_video=True).pk)
+        cls.t0 = datetime.datetime(2026, 10, 1, 8, 0, tzinfo=datetime.timezone.utc)
+
+    def touch(self, ids, moment):
+        Attendance.objects.filter(pk__in=ids).update(updated_at=moment)
+
+    def export(self, since=None, until=None, chunk_size=3):
+        watermark, chunks = export_attendance(Attendance.objects.all(), since=since, until=until, chunk_size=chunk_size)
+        schema, end, decoded = read_scol(io.BytesIO(b''.join(chunks)))
+        rows = []
+        for chunk in decoded:
+            rows.extend(zip(*(chunk[name] for name, _, _ in EXPORT_COLUMNS)))
+        self.assertEqual(end['rows'], len(rows))
+        self.assertEqual(schema['watermark'], watermark)
+        self.assertEqual(end['watermark'], watermark)
+        return watermark, rows
+
+    def test_round_trip(self):
+        self.touch(self.ids, self.t0)
+        # A chunk of 8 dictionary-encodes the repeated ids, one of 1 doesn't
+        _, rows = self.export(until=self.t0 + datetime.timedelta(seconds=1), chunk_size=8)
+        expected = list(Attendance.objects.order_by('updated_at', 'id').values_list(
+            *(path for _, _, path in EXPORT_COLUMNS)
+        ))
+        self.assertEqual(rows, expected)
+        lectureless = rows[-1]
+        self.assertEqual(lectureless[0], self.ids[-1])
+        self.assertEqual((lectureless[4], lectureless[5], lectureless[8]), (None, None, True))
+
+    def test_incremental_export(self):
+        # Three rows share one updated_at across chunk boundaries, one is
+        # at the first export's until (not in it), one after
+        first, tied, at_until, later = self.ids[:1], self.ids[1:4], self.ids[4:5], self.ids[5:6]
+        until = self.t0 + datetime.timedelta(minutes=10)
+        self.touch(first, self.t0)
+        self.touch(tied, self.t0 + datetime.timedelta(minutes=5))
+        self.touch(at_until, until)
+        self.touch(later, until + datetime.timedelta(minutes=1))
+        self.touch(self.ids[6:], until + datetime.timedelta(hours=1))
+
+        watermark, rows = self.export(until=until, chunk_size=1)
+        self.assertEqual([row[0] for row in rows], first + tied)
+        self.assertEqual(parse_watermark(watermark), (until, 0))
+
+        # One tied row changes again, and everything else stays put
+        self.touch(tied[1:2], until + datetime.timedelta(minutes=2))
+        second_until = until + datetime.timedelta(minutes=30)
+        second, rows = self.export(since=watermark, until=second_until, chunk_size=1)
+        self.assertEqual([row[0] for row in rows], at_until + later + tied[1:2])
+        self.assertEqual(parse_watermark(second), (second_until, 0))
+
+        # Nothing changed since: no rows, and the client's watermark back
+        third, rows = self.export(since=second, until=second_until - datetime.timedelta(minutes=1))
+        self.assertEqual((third, rows), (second, []))
+
+
+class TenantKeyTests(TestCase):
+    """
+    The denormalized school and class keys follow moved students and
+    classes, and the moved rows show up as changed.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name="Springfield High")
+        cls.other_school = School.objects.create(name="Shelbyville High")
+        cls.klass = Class.objects.create(name="Class 10", school=cls.school)
+        cls.other_class = Class.objects.create(name="Class 11", school=cls.other_school)
+        cls.lecture = Lecture.objects.create(
+            title="Optics", class_assigned=cls.klass, subject=Subject.objects.create(name="Physics")
+        )
+        cls.student = User.objects.create_user(
+            'student', 'student@example.com', 'pass12345', role=Role.STUDENT,
+            school=cls.school, assigned_class=cls.klass,
+        )
+        closed_year = academic_year(archive_horizon()) - 1
+        Attendance.objects.create(
+            student=cls.student, lecture=cls.lecture, date=academic_year_bounds(closed_year)[0], present=True
+        )
+        archive_year(closed_year)
+        cls.attendance = Attendance.objects.create(student=cls.student, lecture=cls.lecture, date=timezone.localdate())
+        cls.long_ago = timezone.now() - datetime.timedelta(days=1)
+        Attendance.objects.update(updated_at=cls.long_ago)
+        Lecture.objects.update(updated_at=cls.long_ago)
+
+    def test_new_rows_copy_the_keys(self):
+        self.assertEqual(self.lecture.school_id, self.school.pk)
+        self.assertEqual(
+            (self.attendance.student_class_id, self.attendance.school_id), (self.klass.pk, self.school.pk)
+        )
+
+    def test_student_moved(self):
+        # Saves that don't touch the class or school don't look at attendance
+        with self.assertNumQueries(1):
+            self.student.last_login = timezone.now()
+            self.student.save(update_fields=['last_login'])
+
+        self.student.assigned_class = self.other_class
+        self.student.school = self.other_school
+        self.student.save()
+        attendance = Attendance.objects.get(pk=self.attendance.pk)
+        self.assertEqual(
+            (attendance.student_class_id, attendance.school_id), (self.other_class.pk, self.other_school.pk)
+        )
+        self.assertGreater(attendance.updated_at, self.long_ago)
+        archive = AttendanceArchive.objects.get()
+        self.assertEqual((archive.student_class_id, archive.school_id), (self.other_class.pk, self.other_school.pk))
+
+    def test_class_moved(self):
+        self.klass.name = "Class 10A"
+        self.klass.save(update_fields=['name'])
+        self.assertEqual(Lecture.objects.get(pk=self.lecture.pk).updated_at, self.long_ago)
+
+        self.klass.school = self.other_school
+        self.klass.save(update_fields=['school'])
+        lecture = Lecture.objects.get(pk=self.lecture.pk)
+        self.assertEqual(lecture.school_id, self.other_school.pk)
+        self.assertGreater(lecture.updated_at, self.long_ago)
+
+
+class TenantKeyMigrationTests(TransactionTestCase):
+    """
+    Migration 0006 fills the new tenant keys of existing rows.
+    """
+    before = [('courses', '0005_question_answer_state')]
+    after = [('courses', '0006_tenant_keys')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        super().tearDown()
+
+    def test_backfill(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        apps = executor.loader.project_state(self.before).apps
+        school = apps.get_model('courses', 'School').objects.create(name="Springfield High")
+        klass = apps.get_model('courses', 'Class').objects.create(name="Class 10", school=school)
+        lectures = apps.get_model('courses', 'Lecture').objects
+        lecture = lectures.create(title="Optics", class_assigned=klass)
+        unassigned = lectures.create(title="Draft")
+        users = apps.get_model('users', 'User').objects
+        student = users.create(username='student', school=school, assigned_class=klass)
+        newcomer = users.create(username='newcomer')
+        attendance = apps.get_model('courses', 'Attendance').objects
+        attended = attendance.create(student=student, lecture=lecture, date=datetime.date(2026, 9, 1))
+        other = attendance.create(student=newcomer, lecture=lecture, date=datetime.date(2026, 9, 1))
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        apps = executor.loader.project_state(self.after).apps
+        lectures = apps.get_model('courses', 'Lecture').objects
+        attendance = apps.get_model('courses', 'Attendance').objects
+        self.assertEqual(lectures.get(pk=lecture.pk).school_id, school.pk)
+        self.assertIsNone(lectures.get(pk=unassigned.pk).school_id)
+        attended = attendance.get(pk=attended.pk)
+        self.assertEqual((attended.student_class_id, attended.school_id), (klass.pk, school.pk))
+        other = attendance.get(pk=other.pk)
+        self.assertEqual((other.student_class_id, other.school_id), (None, None))
+
+
+class DatabaseConfigTests(SimpleTestCase):
+    """
+    DATABASES entries built from DB_* variables (scholiv_lms/database.py).
+    """
+    def environ(self, **variables):
+        """
+        Patch os.environ to just these DB_*/replica variables.
+        """
+        environ = {name: value for name, value in os.environ.items() if not name.startswith(('DB_', 'REPLICA'))}
+        return mock.patch.dict(os.environ, {**environ, **variables}, clear=True)
+
+    def test_sqlite(self):
+        with self.environ(DB_ENGINE='sqlite'):
+            self.assertEqual(database_config('DB', base_dir=Path('/srv/app')), {
+                'ENGINE': 'django.db.backends.sqlite3', 'NAME': '/srv/app/db.sqlite3', 'CONN_MAX_AGE': 0,
+            })
+
+    def test_mysql(self):
+        with self.environ(DB_PASSWORD='secret', DB_CONN_MAX_AGE='0', DB_CONN_HEALTH_CHECKS='False'):
+            config = database_config('DB')
+        self.assertEqual(config['ENGINE'], 'mysql.connector.django')
+        self.assertEqual((config['USER'], config['PASSWORD'], config['PORT']), ('root', 'secret', '3306'))
+        self.assertEqual((config['CONN_MAX_AGE'], config['CONN_HEALTH_CHECKS']), (0, False))
+        self.assertIn('init_command', config['OPTIONS'])
+
+    def test_postgresql_pool(self):
+        with self.environ(DB_ENGINE='postgresql', DB_PASSWORD='', DB_POOL='True', DB_POOL_MAX_SIZE='4'):
+            config = database_config('DB')
+        self.assertEqual((config['PASSWORD'], config['PORT'], config['CONN_MAX_AGE']), ('', '5432', 0))
+        self.assertEqual(config['OPTIONS']['pool'], {'min_size': 2, 'max_size': 4, 'timeout': 10.0})
+
+    def test_errors(self):
+        with self.environ(DB_ENGINE='oracle'), self.assertRaisesMessage(ValueError, "Unsupported DB_ENGINE"):
+            database_config('DB')
+        # No default password
+        with self.environ(DB_ENGINE='postgresql'), self.assertRaisesMessage(ValueError, "Set DB_PASSWORD"):
+            database_config('DB')
+
+    def test_replicas(self):
+        with self.environ():
+            self.assertEqual(replica_configs(), {})
+        with self.environ(
+            DB_ENGINE='postgresql', DB_PASSWORD='secret', DB_HOST='primary', DB_REPLICAS='replica1, replica2,',
+            REPLICA1_HOST='replica-1', REPLICA2_PASSWORD='other',
+        ):
+            replicas = replica_configs()
+        self.assertEqual(list(replicas), ['replica1', 'replica2'])
+        self.assertEqual(
+            [(r['HOST'], r['PASSWORD']) for r in replicas.values()], [('replica-1', 'secret'), ('primary', 'other')]
+        )
+        self.assertTrue(all(r['ENGINE'] == 'django.db.backends.postgresql' for r in replicas.values()))
+        self.assertTrue(all(r['TEST'] == {'MIRROR': 'default'} for r in replicas.values()))
+
+
+class BenchmarkCompareTests(SimpleTestCase):
+    def result(self, median_ms=5.0, queries=3, status=(200,)):
+        return {'small': {'case': {'median_ms': median_ms, 'queries': queries, 'status': list(status)}}}
+
+    def test_regressions(self):
+        baseline = self.result()
+        self.assertEqual(compare(self.result(median_ms=5.5), baseline, 0.25, 2.0), [])
+        cases = {
+            'median': self.result(median_ms=20.0),
+            'queries': self.result(queries=4),
+            'status': self.result(status=(200, 400)),
+        }
+        for what, results in cases.items():
+            with self.subTest(what=what):
+                [regression] = compare(results, baseline, 0.25, 2.0)
+                self.assertIn(what, regression)
+        # A server error is one even when the baseline had it too
+        self.assertEqual(len(compare(self.result(status=(500,)), self.result(status=(500,)), 0.25, 2.0)), 1)
+
+
+class SyntheticDataTests(TestCase):
+    """
+    manage.py generate_synthetic_data at a tiny scale: consistent rows
+    the student portal can serve.
+    """
+    def test_generate(self):
+        out = io.StringIO()
+        call_command(
+            'generate_synthetic_data', schools=1, classes_per_school=2, students_per_class=2, teachers_per_school=1,
+            subjects=2, lectures_per_class=2, years=1, announcements_per_class=1, questions_per_lecture=1,
+            answers_per_question=2, prefix='t', stdout=out,
+        )
+        self.assertIn("Created 1 schools, 2 classes", out.getvalue())
+        self.assertEqual(User.objects.filter(role=Role.STUDENT).count(), 4)
+        self.assertEqual(Lecture.objects.count(), 4)
+        self.assertEqual(Attendance.objects.count(), 4 * len(school_days(1)))
+        self.assertEqual(Answer.objects.count(), 8)
+        # Denormalized columns match what save() and the signals would write
+        self.assertFalse(Attendance.objects.exclude(student_class_id=F('student__assigned_class_id')).exists())
+        self.assertFalse(Attendance.objects.exclude(school_id=F('student__school_id')).exists())
+        self.assertFalse(Lecture.objects.exclude(school_id=F('class_assigned__school_id')).exists())
+        self.assertFalse(Question.objects.exclude(answer_count=2).exists())
+        self.assertFalse(User.objects.exclude(email_normalized=F('email')).exists())
+
+        student = User.objects.filter(role=Role.STUDENT).first()
+        self.assertTrue(self.client.login(username=student.username, password='password'))
+        self.assertEqual(self.client.get(reverse('student-dashboard')).status_code, 200)
+        with self.assertRaisesMessage(CommandError, "already exists"):
+            call_command('generate_synthetic_data', schools=1, prefix='t', stdout=io.StringIO())
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_MODE='cprofile', PROFILING_TOKEN='secret', PROFILING_ROUTES=[])
+class ProfilingTests(TestCase):
+    """
+    Requests with the profiling header leave a profile that
+    manage.py aggregate_profiles turns into collapsed stacks.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', 'student@example.com', 'pass12345', role=Role.STUDENT)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.client.force_login(self.student)
+
+    def test_profile_and_aggregate(self):
+        with self.settings(PROFILING_DIR=self.directory):
+            self.assertNotIn('X-Profile-File', self.client.get(reverse('student-profile')))
+            self.assertNotIn('X-Profile-File', self.client.get(reverse('student-profile'), HTTP_X_PROFILE='wrong'))
+            response = self.client.get(reverse('student-profile'), HTTP_X_PROFILE='secret')
+        self.assertEqual(response.status_code, 200)
+        path = os.path.join(self.directory, response['X-Profile-File'])
+        self.assertTrue(os.path.isfile(path))
+        self.assertEqual(os.path.basename(os.path.dirname(path)), 'student-profile')
+
+        unreadable = os.path.join(os.path.dirname(path), 'unreadable.prof')
+        with open(unreadable, 'wb') as f:
+            f.write(b'not a profile')
+        output = os.path.join(self.directory, 'stacks.txt')
+        stderr = io.StringIO()
+        call_command(
+            'aggregate_profiles', dir=self.directory, route=['student-profile'], output=output, delete=True,
+            stderr=stderr,
+        )
+        self.assertIn(f"Skipping {unreadable}", stderr.getvalue())
+        self.assertIn("Aggregated 1 profile(s)", stderr.getvalue())
+        with open(output, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, weight = line.rsplit(' ', 1)
+            self.assertTrue(stack and int(weight) >= 10)
+        self.assertTrue(any('student_views' in line for line in lines))
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(unreadable))
+
+        os.remove(unreadable)
+        with self.assertRaisesMessage(CommandError, "No profile files found."):
+            call_command('aggregate_profiles', dir=self.directory, stderr=io.StringIO())
+
+
+# A second database for ReplicaRoutingTests, registered before the test
+# runner sets up (and migrates) the databases its tests use
+connections.settings.setdefault('replica', connections.configure_settings({
+    'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+})['default'])
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Two SQLite databases: 'replica' has the schema but none of the rows,
+    so where a read went shows in the response.
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        caches['default'].clear()
+        settings_override = override_settings(DATABASE_REPLICAS=['replica'])
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        school = School.objects.create(name="Springfield High")
+        self.klass = Class.objects.create(name="Class 10", school=school)
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        self.other_admin = User.objects.create_superuser('other', 'other@example.com', 'pass12345')
+        Announcement.objects.create(title="Exam", content="Friday", posted_by=self.admin, target_class=self.klass)
+
+    def titles(self, client):
+        return [item['title'] for item in client.get(reverse('announcement-list')).json()]
+
+    def test_eligible_reads_go_to_the_replica(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.titles(self.client), [])
+        # Not replica-eligible: the primary
+        response = self.client.get(reverse('announcement-detail', args=[Announcement.objects.get().pk]))
+        self.assertEqual(response.json()['title'], "Exam")
+
+    def test_writer_is_pinned_on_every_client(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('announcement-list'), {
+            'title': "Trip", 'content': "Monday", 'posted_by': self.admin.pk, 'target_class': self.klass.pk,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(sorted(self.titles(self.client)), ["Exam", "Trip"])
+
+        # The same user on a second device, without the first one's cookies
+        second_device = Client()
+        second_device.force_login(self.admin)
+        self.assertEqual(sorted(self.titles(second_device)), ["Exam", "Trip"])
+        # Other users still read the replica
+        other = Client()
+        other.force_login(self.other_admin)
+        self.assertEqual(self.titles(other), [])
+
+    async def test_routing_under_asgi(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(reverse('announcement-list'))
+        self.assertEqual(response.json(), [])
+        response = await self.async_client.post(reverse('announcement-list'), {
+            'title': "Trip", 'content': "Monday", 'posted_by': self.admin.pk, 'target_class': self.klass.pk,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(await caches['default'].aget(f'db_pin_primary:{self.admin.pk}'))
+        response = await self.async_client.get(reverse('announcement-list'))
+        self.assertEqual(len(response.json()), 2)
+
+    def test_replica_reads(self):
+        request = RequestFactory().get(reverse('announcement-list'))
+        request.user = self.admin
+        view = resolve(reverse('announcement-list')).func
+        with replica_reads(request, view):
+            self.assertEqual(router.db_for_read(Announcement), 'replica')
+            self.assertFalse(Announcement.objects.exists())
+        self.assertEqual(router.db_for_read(Announcement), 'default')
+
+        pin_user(self.admin.pk)
+        with replica_reads(request, view):
+            self.assertEqual(router.db_for_read(Announcement), 'default')
@@ -0,0 +1,43 @@
+"""
+State shared by the writes of one transaction, for their on_commit() work.
+
+Signal handlers run once per saved row, but the follow-up work of a bulk
+write (re-rendering catalogs, bumping the reference version) should run
+once per transaction. transaction_state() hands every call in the same
+transaction, at the same savepoint, the same state object; the caller
+registers the object's on_commit() callback when it was just created.
+
+The states live in a WeakValueDictionary on the connection, and the only
+strong reference to one is its on_commit() callback. Once Django runs the
+callback (commit) or drops it (rollback of the transaction, or of the
+savepoint it was registered in), the state goes with it and the next
+write starts a new one. The caller must register a callback that refers
+to the state, e.g. one of its bound methods, and the callback should set
+the state's `done` attribute: captureOnCommitCallbacks(execute=True) runs
+callbacks without dropping them, and a done state is not joined.
+"""
+import weakref
+
+from django.db import transaction
+
+
+def transaction_state(key, factory, using=None):
+    """
+    (state, created): the state for `key` of the current transaction and
+    savepoint, made with factory() by the first call. Outside a transaction
+    every call gets a new state (its on_commit() callback runs right away).
+    """
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        return factory(), True
+    states = connection.__dict__.get('_transaction_states')
+    if states is None:
+        states = connection._transaction_states = weakref.WeakValueDictionary()
+    # Per savepoint: a state shared across one that rolls back would still
+    # count the work done inside it
+    state_key = (key, frozenset(connection.savepoint_ids))
+    state = states.get(state_key)
+    if state is not None and not getattr(state, 'done', False):
+        return state, False
+    state = states[state_key] = factory()
+    return state, True
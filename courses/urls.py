@@ -10,7 +10,19 @@ from .student_views import (
     StudentChangePasswordView,
     MarkLectureWatchedView,  # <--- NEW IMPORT
 )
-from .report_views import AttendanceReportView
+from .report_views import AttendanceReportView, AttendanceExportView
+from .stream_views import announcement_stream
+from .sync_views import StudentSyncView
+from .batch_views import BatchView
+from .qa_views import LectureQuestionThreadView, QuestionAnswersPageView
+from .async_student_views import (
+    AsyncStudentDashboardView,
+    AsyncStudentLecturesView,
+    AsyncStudentLectureDetailView,
+    AsyncStudentAttendanceView,
+    AsyncStudentProfileView,
+    AsyncMarkLectureWatchedView,
+)
 
 # Create a router and register our viewsets with it.
 router = DefaultRouter()
@@ -48,6 +60,28 @@ urlpatterns = [
     path('student/profile/', StudentProfileView.as_view(), name='student-profile'),
     path('student/change-password/', StudentChangePasswordView.as_view(), name='student-change-password'),
 
+    # 5. Offline sync (changes since the last token)
+    path('student/sync/', StudentSyncView.as_view(), name='student-sync'),
+
+    # --- Async Student Portal URLs (same payloads, for ASGI deployments) ---
+    path('async/student/dashboard/', AsyncStudentDashboardView.as_view(), name='async-student-dashboard'),
+    path('async/student/lectures/', AsyncStudentLecturesView.as_view(), name='async-student-lectures'),
+    path('async/student/lectures/<int:pk>/', AsyncStudentLectureDetailView.as_view(), name='async-student-lecture-detail'),
+    path('async/student/lectures/<int:pk>/mark-watched/', AsyncMarkLectureWatchedView.as_view(), name='async-mark-lecture-watched'),
+    path('async/student/attendance/', AsyncStudentAttendanceView.as_view(), name='async-student-attendance'),
+    path('async/student/profile/', AsyncStudentProfileView.as_view(), name='async-student-profile'),
+
+    # --- Q&A Threads ---
+    path('lectures/<int:pk>/thread/', LectureQuestionThreadView.as_view(), name='lecture-question-thread'),
+    path('questions/<int:pk>/answers/', QuestionAnswersPageView.as_view(), name='question-answers-page'),
+
     # Reporting URLs
     path('reports/attendance/', AttendanceReportView.as_view(), name='attendance-report'),
+    path('reports/attendance/export/', AttendanceExportView.as_view(), name='attendance-export'),
+
+    # Several GET requests in one round trip (app start-up)
+    path('batch/', BatchView.as_view(), name='batch'),
+
+    # Live announcement feed (Server-Sent Events, ASGI only)
+    path('announcements/stream/<int:class_id>/', announcement_stream, name='announcement-stream'),
 ]
\ No newline at end of file
@@ -1,5 +1,8 @@
 import openpyxl  
+from django.conf import settings
 from django.contrib.auth import get_user_model 
+from django.db import transaction
+from django.db.models import Prefetch
 from rest_framework.parsers import MultiPartParser
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
@@ -14,16 +17,102 @@ from .serializers import (
     AnnouncementSerializer,
     QuestionSerializer,
     AnswerSerializer,
-    AttendanceUploadSerializer  
+    AttendanceUploadSerializer,
+    AttendanceBulkSerializer,
 )
 # Import our NEW permission classes
 from .permissions import IsSuperAdmin, IsSchoolAdmin, IsTeacher
+from users.models import Role, normalize_email
+from .conditional import compute_validators, not_modified, set_validators
+from .bulk import bulk_upsert_attendance
+from .fast_serializers import FastListMixin
+from .sparse import SparseFieldsMixin
+from .idempotency import idempotent
 
 User = get_user_model()
 
+# --- Bulk actions ---
+
+class BulkActionsMixin:
+    """
+    Adds /bulk/ to a ModelViewSet whose serializer uses BulkListSerializer:
+
+        POST   [{...}, ...]               create all (201)
+        PATCH  [{"id": 1, ...}, ...]      partially update all (200)
+        DELETE {"ids": [1, 2, ...]}       delete all (200)
+
+    Each request is all-or-nothing: one invalid item, or an id outside
+    get_queryset(), fails it with 400 and per-item errors. Hooks such as
+    perform_create(serializer) apply to bulk requests too.
+    """
+
+    def _bulk_items(self, request):
+        items = request.data
+        limit = settings.COURSE_BULK_MAX_OBJECTS
+        if not isinstance(items, list) or not items:
+            return None, Response({'error': 'Expected a non-empty list.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > limit:
+            return None, Response(
+                {'error': f'At most {limit} objects per request.'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return items, None
+
+    @action(detail=False, methods=['POST'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Create, update (PATCH) or delete (DELETE) many objects in one request.
+        URL: /api/<resource>/bulk/
+        """
+        items, error = self._bulk_items(request)
+        if error:
+            return error
+        serializer = self.get_serializer(data=items, many=True)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @bulk.mapping.patch
+    def bulk_update(self, request):
+        items, error = self._bulk_items(request)
+        if error:
+            return error
+        ids = [item.get('id') for item in items if isinstance(item, dict)]
+        ids = [pk for pk in ids if isinstance(pk, int) and not isinstance(pk, bool)]
+        instances = self.filter_queryset(self.get_queryset()).in_bulk(ids)
+        serializer = self.get_serializer(list(instances.values()), data=items, many=True, partial=True)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @bulk.mapping.delete
+    def bulk_destroy(self, request):
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if (
+            not isinstance(ids, list) or not ids
+            or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids)
+        ):
+            return Response({'error': 'Expected {"ids": [<id>, ...]}.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > settings.COURSE_BULK_MAX_OBJECTS:
+            return Response(
+                {'error': f'At most {settings.COURSE_BULK_MAX_OBJECTS} objects per request.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        queryset = self.filter_queryset(self.get_queryset()).filter(pk__in=ids)
+        with transaction.atomic():
+            found = set(queryset.values_list('pk', flat=True))
+            missing = sorted(set(ids) - found)
+            if missing:
+                return Response({'error': 'Not found.', 'ids': missing}, status=status.HTTP_400_BAD_REQUEST)
+            # Model.delete() is not overridden on these models, so the
+            # queryset delete (with its signals) is equivalent
+            queryset.delete()
+        return Response({'deleted': sorted(found)}, status=status.HTTP_200_OK)
+
+
 # --- Core Management ViewSets (for Admins) ---
 
-class SchoolViewSet(viewsets.ModelViewSet):
+class SchoolViewSet(SparseFieldsMixin, BulkActionsMixin, viewsets.ModelViewSet):
     """
     API endpoint for SuperAdmins to manage Schools.
     Only SuperAdmins can create, edit, or delete schools.
@@ -31,24 +120,27 @@ class SchoolViewSet(viewsets.ModelViewSet):
     queryset = School.objects.all()
     serializer_class = SchoolSerializer
     permission_classes = [permissions.IsAuthenticated, IsSuperAdmin]
+    read_replica_actions = ('list',)
 
-class ClassViewSet(viewsets.ModelViewSet):
+class ClassViewSet(SparseFieldsMixin, BulkActionsMixin, viewsets.ModelViewSet):
     """
     API endpoint for SchoolAdmins to manage Classes within their school.
     """
     queryset = Class.objects.all()
     serializer_class = ClassSerializer
     permission_classes = [permissions.IsAuthenticated, IsSchoolAdmin]
+    read_replica_actions = ('list',)
 
-class SubjectViewSet(viewsets.ModelViewSet):
+class SubjectViewSet(SparseFieldsMixin, BulkActionsMixin, viewsets.ModelViewSet):
     """
     API endpoint for SchoolAdmins to manage Subjects.
     """
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
     permission_classes = [permissions.IsAuthenticated, IsSchoolAdmin]
+    read_replica_actions = ('list',)
 
-class LectureViewSet(viewsets.ModelViewSet):
+class LectureViewSet(SparseFieldsMixin, BulkActionsMixin, FastListMixin, viewsets.ModelViewSet):
     """
     API endpoint for SuperAdmins to manage the master Lecture list.
     Includes video upload functionality.
@@ -56,6 +148,7 @@ class LectureViewSet(viewsets.ModelViewSet):
     queryset = Lecture.objects.all()
     serializer_class = LectureSerializer
     permission_classes = [permissions.IsAuthenticated, IsSuperAdmin]
+    read_replica_actions = ('list',)
     
     @action(detail=True, methods=['PUT'], parser_classes=[MultiPartParser])
     def upload_video(self, request, pk=None):
@@ -87,14 +180,15 @@ class LectureViewSet(viewsets.ModelViewSet):
             'video_url': lecture.get_video_url(),
         }, status=status.HTTP_200_OK)
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+class AttendanceViewSet(SparseFieldsMixin, FastListMixin, viewsets.ModelViewSet):
     """
     API endpoint for Teachers (and Admins) to manage Attendance.
     Includes Excel Upload for bulk attendance.
     """
-    queryset = Attendance.objects.all()
+    queryset = Attendance.objects.select_related('student', 'lecture')
     serializer_class = AttendanceSerializer
     permission_classes = [permissions.IsAuthenticated, IsTeacher]
+    read_replica_actions = ('list',)
 
     # UPDATE: Added 'GET' to methods list so the browser page loads
     @action(detail=False, methods=['GET', 'POST'], parser_classes=[MultiPartParser], serializer_class=AttendanceUploadSerializer)
@@ -136,7 +230,7 @@ class AttendanceViewSet(viewsets.ModelViewSet):
 
                 # 1. Find Student
                 try:
-                    student = User.objects.get(email=email, role='student')
+                    student = User.objects.get(email_normalized=normalize_email(email), role='student')
                 except User.DoesNotExist:
                     errors.append(f"Row {index}: Student '{email}' not found.")
                     continue
@@ -165,57 +259,118 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['POST'], serializer_class=AttendanceBulkSerializer)
+    def bulk(self, request):
+        """
+        Create or update many attendance records from JSON (for LMS integrations).
+        URL: /api/attendance/bulk/
+        Body: {"records": [{"student": 12, "lecture": 7, "date": "2025-01-31", "present": true}, ...]}
+        Optional header: Idempotency-Key, so retries never write twice.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        records = serializer.validated_data['records']
+        return idempotent(
+            request, 'attendance-bulk',
+            lambda: Response(bulk_upsert_attendance(request.user, records), status=status.HTTP_200_OK),
+        )
+
 # ===========================
 # Q&A SYSTEM VIEWSETS
 # ===========================
 
-class AnnouncementViewSet(viewsets.ModelViewSet):
+class AnnouncementViewSet(SparseFieldsMixin, BulkActionsMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Announcement.objects.all()
     serializer_class = AnnouncementSerializer
     permission_classes = [permissions.IsAuthenticated]
+    read_replica_actions = ('list',)
     
     def get_queryset(self):
         user = self.request.user
+        announcements = Announcement.objects.select_related('posted_by')
         if user.is_superuser or user.role in ['super_admin', 'school_admin']:
-            return Announcement.objects.all()
+            return announcements
         if user.role == 'teacher':
-            return Announcement.objects.filter(posted_by=user)
+            return announcements.filter(posted_by=user)
         if user.role == 'student' and user.assigned_class:
-            return Announcement.objects.filter(target_class=user.assigned_class)
+            return announcements.filter(target_class=user.assigned_class)
         return Announcement.objects.none()
+
+    def list(self, request, *args, **kwargs):
+        """
+        Same as the default list, but answers 304 Not Modified when the
+        client's ETag still matches (checked with one aggregate query).
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        validators = compute_validators(request, {
+            "announcements": (queryset, "updated_at"),
+        })
+        cached = not_modified(request, validators)
+        if cached:
+            return cached
+        return set_validators(super().list(request, *args, **kwargs), validators)
     
     def perform_create(self, serializer):
         serializer.save(posted_by=self.request.user)
 
 
-class QuestionViewSet(viewsets.ModelViewSet):
+class QuestionViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    read_replica_actions = ('list',)
     
     def get_queryset(self):
         user = self.request.user
+        # Load askers, lectures and nested answers up front instead of per row
+        questions = Question.objects.select_related('asked_by', 'lecture').prefetch_related(
+            Prefetch('answers', queryset=Answer.objects.select_related('answered_by'))
+        )
         if user.is_superuser or user.role in ['super_admin', 'school_admin', 'teacher']:
-            return Question.objects.all()
+            return questions
         if user.role == 'student' and user.assigned_class:
-            return Question.objects.filter(lecture__class_assigned=user.assigned_class)
+            return questions.filter(lecture__class_assigned=user.assigned_class)
         return Question.objects.none()
     
     def perform_create(self, serializer):
         serializer.save(asked_by=self.request.user)
 
 
-class AnswerViewSet(viewsets.ModelViewSet):
+class AnswerViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     queryset = Answer.objects.all()
     serializer_class = AnswerSerializer
     permission_classes = [permissions.IsAuthenticated]
+    read_replica_actions = ('list',)
     
     def get_queryset(self):
-        return Answer.objects.all()
+        return Answer.objects.select_related('answered_by')
     
     def perform_create(self, serializer):
         user = self.request.user
         if user.role not in ['teacher', 'school_admin', 'super_admin'] and not user.is_superuser:
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied("Only teachers and admins can post answers.")
-        serializer.save(answered_by=self.request.user)
\ No newline at end of file
+        serializer.save(answered_by=self.request.user)
+
+    @action(detail=True, methods=['POST'])
+    def accept(self, request, pk=None):
+        """
+        Mark this answer as the accepted one for its question.
+        URL: /api/answers/{id}/accept/
+        Allowed for the student who asked the question, teachers and admins.
+        """
+        answer = self.get_object()
+        user = request.user
+        is_staff_role = user.role in [Role.TEACHER, Role.SCHOOL_ADMIN, Role.SUPER_ADMIN] or user.is_superuser
+        if not is_staff_role and answer.question.asked_by_id != user.id:
+            return Response(
+                {'error': 'Only the person who asked the question or a teacher can accept an answer.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        answer.accept()
+        return Response({
+            'message': 'Answer accepted.',
+            'answer_id': answer.id,
+            'question_id': answer.question_id,
+        }, status=status.HTTP_200_OK)
\ No newline at end of file
@@ -0,0 +1,211 @@
+"""
+Admission control: bounded lanes for routes that can hold a worker for
+minutes (uploads, the Excel report).
+
+ADMISSION_ROUTES maps route names to a lane of ADMISSION_LANES:
+
+    'heavy': {'concurrency': 2, 'queue': 4, 'timeout': 10, 'retry_after': 30}
+
+At most `concurrency` requests of a lane run at once in a process; up to
+`queue` more wait for a slot for at most `timeout` seconds. Anything
+beyond that is shed with 503 and a Retry-After header instead of
+occupying a worker thread. Queued requests hold a thread too, so cheap
+requests (in no lane, never held back) always find one only while
+concurrency + queue of every lane stays below the threads per worker
+(ADMISSION_WORKER_THREADS, which must match the server's setting, e.g.
+gunicorn --threads). The middleware refuses to start otherwise. Limits
+are per process.
+
+Metrics (scholiv_lms/metrics.py), labelled by lane:
+  admission_requests_total{outcome=admitted|queue_full|timeout}
+  admission_in_flight, admission_queued (gauges)
+  admission_queue_wait_seconds (histogram)
+"""
+import math
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.http import JsonResponse
+
+from .metrics import registry
+
+
+class Lane:
+    def __init__(self, name, concurrency, queue=0, timeout=0, retry_after=None):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.timeout = timeout
+        self.retry_after = retry_after if retry_after is not None else max(math.ceil(timeout), 1)
+        self.in_flight = 0
+        self.queued = 0
+        self._condition = threading.Condition()
+
+    def _gauges(self):
+        registry.set('admission_in_flight', self.in_flight, lane=self.name)
+        registry.set('admission_queued', self.queued, lane=self.name)
+
+    def acquire(self):
+        """
+        Take a slot, waiting in the queue if needed; False if shed.
+        """
+        started = time.monotonic()
+        with self._condition:
+            if self.in_flight >= self.concurrency:
+                if self.queued >= self.queue:
+                    return self._shed('queue_full')
+                self.queued += 1
+                self._gauges()
+                deadline = started + self.timeout
+                try:
+                    while self.in_flight >= self.concurrency:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return self._shed('timeout')
+                        self._condition.wait(remaining)
+                finally:
+                    self.queued -= 1
+            self.in_flight += 1
+            self._gauges()
+        registry.inc('admission_requests_total', lane=self.name, outcome='admitted')
+        registry.observe('admission_queue_wait_seconds', time.monotonic() - started, lane=self.name)
+        return True
+
+    def _shed(self, outcome):
+        self._gauges()
+        registry.inc('admission_requests_total', lane=self.name, outcome=outcome)
+        return False
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._gauges()
+            self._condition.notify()
+
+    def shed_response(self):
+        response = JsonResponse(
+            {'error': 'The server is busy with similar requests. Please retry later.'}, status=503
+        )
+        response['Retry-After'] = str(self.retry_after)
+        return response
+
+
+_lanes = {}
+_lanes_lock = threading.Lock()
+
+
+def lane_for(route):
+    """
+    The Lane of a route name, or None if it isn't admission-controlled.
+    """
+    name = getattr(settings, 'ADMISSION_ROUTES', {}).get(route)
+    if name is None:
+        return None
+    with _lanes_lock:
+        lane = _lanes.get(name)
+        if lane is None:
+            lane = _lanes[name] = Lane(name, **settings.ADMISSION_LANES[name])
+        return lane
+
+
+def check_lanes():
+    """
+    Raise ImproperlyConfigured unless every lane of ADMISSION_ROUTES leaves
+    a thread of ADMISSION_WORKER_THREADS free for other requests.
+    """
+    threads = settings.ADMISSION_WORKER_THREADS
+    for name in sorted(set(settings.ADMISSION_ROUTES.values())):
+        try:
+            lane = settings.ADMISSION_LANES[name]
+        except KeyError:
+            raise ImproperlyConfigured(f"ADMISSION_ROUTES uses lane '{name}', which is not in ADMISSION_LANES.")
+        held = lane['concurrency'] + lane.get('queue', 0)
+        if held >= threads:
+            raise ImproperlyConfigured(
+                f"Admission lane '{name}' can hold {held} threads (concurrency + queue) of "
+                f"ADMISSION_WORKER_THREADS={threads}; keep it below so other requests find a thread."
+            )
+
+
+def reset_lanes():
+    """
+    Forget the lanes (tests changing ADMISSION_LANES).
+    """
+    with _lanes_lock:
+        _lanes.clear()
+
+
+class AdmissionControlMiddleware:
+    """
+    Runs the views of ADMISSION_ROUTES in their lane, or sheds them.
+    Removes itself at startup when no route is configured, and fails when
+    a lane does not fit the worker's threads (check_lanes()).
+
+    Runs natively under WSGI and ASGI. Under ASGI, Django calls the
+    (blocking) process_view in the request's sync_to_async thread, so a
+    queued request waits there, not on the event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'ADMISSION_ROUTES', None):
+            raise MiddlewareNotUsed
+        check_lanes()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            self.release(request)
+            raise
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            self.release(request)
+            raise
+        return self.finish(request, response)
+
+    def finish(self, request, response):
+        lane = getattr(request, '_admission_lane', None)
+        if lane is not None and response.streaming:
+            # The body is produced after this returns: hold the slot until
+            # the server closes the response
+            close = response.close
+
+            def close_and_release():
+                try:
+                    close()
+                finally:
+                    self.release(request)
+
+            response.close = close_and_release
+        else:
+            self.release(request)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        lane = lane_for(request.resolver_match.view_name)
+        if lane is None:
+            return None
+        if not lane.acquire():
+            return lane.shed_response()
+        request._admission_lane = lane
+        return None
+
+    @staticmethod
+    def release(request):
+        lane = request.__dict__.pop('_admission_lane', None)
+        if lane is not None:
+            lane.release()
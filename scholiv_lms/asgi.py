@@ -3,6 +3,10 @@ ASGI config for scholiv_lms project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve with an ASGI server (e.g. ``uvicorn scholiv_lms.asgi:application``) to
+enable the live announcement stream (/api/announcements/stream/<class_id>/),
+where each open connection is a coroutine instead of a worker thread.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -0,0 +1,106 @@
+"""
+Environment-driven database configuration.
+
+Everything is read from the environment / .env (python-decouple), with
+defaults that match the original local MySQL setup. DB_PASSWORD has no
+default: MySQL and PostgreSQL need it set.
+
+    DB_ENGINE              mysql | postgresql | sqlite     (default: mysql)
+    DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT
+    DB_CONN_MAX_AGE        seconds to keep a connection open between
+                           requests; 0 = close after every request (default: 60)
+    DB_CONN_HEALTH_CHECKS  ping persistent connections before reuse (default: True)
+
+PostgreSQL only (needs psycopg 3 with psycopg_pool, see requirements.txt):
+
+    DB_POOL                use a psycopg connection pool (default: False)
+    DB_POOL_MIN_SIZE       connections kept open per process (default: 2)
+    DB_POOL_MAX_SIZE       upper bound per process (default: 10)
+    DB_POOL_TIMEOUT        seconds to wait for a free connection (default: 10)
+
+Pooling and persistent connections are mutually exclusive in Django, so
+CONN_MAX_AGE is forced to 0 when DB_POOL is on (the pool keeps the
+connections alive instead).
+
+Read replicas:
+
+    DB_REPLICAS            comma-separated aliases, e.g. "replica1,replica2"
+    <ALIAS>_HOST, <ALIAS>_NAME, ...   per-replica overrides (e.g. REPLICA1_HOST);
+                           anything not set is taken from the DB_* values.
+"""
+from decouple import config, undefined
+
+
+ENGINES = {
+    'mysql': 'mysql.connector.django',
+    'postgresql': 'django.db.backends.postgresql',
+    'sqlite': 'django.db.backends.sqlite3',
+}
+
+
+def database_config(prefix='DB', base_dir=None, fallback_prefix=None):
+    """
+    Build one DATABASES entry from <prefix>_* environment variables.
+    With fallback_prefix, unset variables fall back to <fallback_prefix>_*
+    (replicas inherit everything from the primary except what they override).
+    """
+    def env(name, default, cast=undefined):
+        if fallback_prefix:
+            default = config(f'{fallback_prefix}_{name}', default=default, cast=cast)
+        return config(f'{prefix}_{name}', default=default, cast=cast)
+
+    engine = env('ENGINE', 'mysql')
+    if engine not in ENGINES:
+        raise ValueError(f"Unsupported {prefix}_ENGINE '{engine}'. Choose from: {', '.join(ENGINES)}.")
+
+    if engine == 'sqlite':
+        name = env('NAME', str(base_dir / 'db.sqlite3') if base_dir else 'db.sqlite3')
+        return {
+            'ENGINE': ENGINES[engine],
+            'NAME': name,
+            'CONN_MAX_AGE': env('CONN_MAX_AGE', 0, cast=int),
+        }
+
+    password = env('PASSWORD', None)
+    if password is None:
+        names = f'{prefix}_PASSWORD' + (f' (or {fallback_prefix}_PASSWORD)' if fallback_prefix else '')
+        raise ValueError(f"Set {names} for the {engine} database, in the environment or .env.")
+
+    settings = {
+        'ENGINE': ENGINES[engine],
+        'NAME': env('NAME', 'scholiv_lms'),
+        'USER': env('USER', 'root'),
+        'PASSWORD': password,
+        'HOST': env('HOST', '127.0.0.1'),
+        'PORT': env('PORT', '3306' if engine == 'mysql' else '5432'),
+        'CONN_MAX_AGE': env('CONN_MAX_AGE', 60, cast=int),
+        'CONN_HEALTH_CHECKS': env('CONN_HEALTH_CHECKS', True, cast=bool),
+        'OPTIONS': {},
+    }
+
+    if engine == 'mysql':
+        settings['OPTIONS']['init_command'] = "SET sql_mode='STRICT_TRANS_TABLES'"
+
+    if engine == 'postgresql' and env('POOL', False, cast=bool):
+        settings['CONN_MAX_AGE'] = 0
+        settings['OPTIONS']['pool'] = {
+            'min_size': env('POOL_MIN_SIZE', 2, cast=int),
+            'max_size': env('POOL_MAX_SIZE', 10, cast=int),
+            'timeout': env('POOL_TIMEOUT', 10, cast=float),
+        }
+
+    return settings
+
+
+def replica_configs(base_dir=None):
+    """
+    DATABASES entries for the aliases listed in DB_REPLICAS. In tests they
+    mirror 'default', so routed reads see the test database.
+    """
+    aliases = [a.strip() for a in config('DB_REPLICAS', default='').split(',') if a.strip()]
+    replicas = {}
+    for alias in aliases:
+        replica = database_config(alias.upper(), base_dir=base_dir, fallback_prefix='DB')
+        replica['TEST'] = {'MIRROR': 'default'}
+        replicas[alias] = replica
+    return replicas
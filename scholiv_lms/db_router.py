@@ -0,0 +1,219 @@
+"""
+Read-replica routing.
+
+Reads go to a replica only while a request handled by a replica-eligible
+view is running; everything else (writes, admin, auth, migrations) uses
+'default'. A view opts in with:
+
+    use_read_replica = True            # APIView: its GET/HEAD handlers
+    read_replica_actions = ('list',)   # ViewSet: these actions only
+
+Read-your-writes: a successful write request pins its user to the
+primary for REPLICA_PIN_SECONDS, so e.g. the lecture list right after
+MarkLectureWatchedView or an upload reflects it, on every device and
+whether or not the client keeps cookies. The pin is an entry in the
+REPLICA_PIN_CACHE cache, which must be shared by all processes (the
+default local-memory cache only works with one). Anonymous writes set a
+short-lived cookie instead.
+
+Reads made before the request's user is known (authentication itself)
+go to the primary; the pin is looked up once the user is known.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.utils.functional import SimpleLazyObject, empty
+
+_read_alias = ContextVar('read_alias', default=None)
+
+PIN_COOKIE = 'db_pin_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def _pin_cache():
+    return caches[getattr(settings, 'REPLICA_PIN_CACHE', 'default')]
+
+
+def _pin_key(user_id):
+    return f'db_pin_primary:{user_id}'
+
+
+def pin_user(user_id):
+    """
+    Send this user's replica-eligible reads to the primary for a while.
+    """
+    _pin_cache().set(_pin_key(user_id), 1, getattr(settings, 'REPLICA_PIN_SECONDS', 15))
+
+
+async def apin_user(user_id):
+    await _pin_cache().aset(_pin_key(user_id), 1, getattr(settings, 'REPLICA_PIN_SECONDS', 15))
+
+
+def _known_user(request):
+    """
+    The request's user once authenticated, else None. DRF replaces the
+    middleware's lazy user with the one its authenticators found.
+    """
+    user = getattr(request, 'user', None)
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return None
+    return user
+
+
+class ReplicaChoice:
+    """
+    The replica picked for a request, until its user turns out pinned.
+    """
+    def __init__(self, request, alias):
+        self.request = request
+        self.alias = alias
+        self.pinned = None
+
+    def read_alias(self):
+        if self.pinned is None:
+            user = _known_user(self.request)
+            if user is None:
+                return 'default'
+            self.pinned = bool(user.is_authenticated and _pin_cache().get(_pin_key(user.pk)))
+        return 'default' if self.pinned else self.alias
+
+
+class ReplicaRouter:
+    """
+    Sends reads to the replica chosen for the current request, if any.
+    """
+    def db_for_read(self, model, **hints):
+        choice = _read_alias.get()
+        if choice is None:
+            return None
+        # Inside a transaction on the primary, keep reading from it
+        if connections['default'].in_atomic_block:
+            return 'default'
+        return choice.read_alias()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication
+        return db not in replica_aliases()
+
+
+def is_replica_eligible(request, view_func):
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None or request.method not in ('GET', 'HEAD'):
+        return False
+    actions = getattr(view_func, 'actions', None)
+    if actions is not None:
+        action = actions.get(request.method.lower())
+        return action in getattr(view_class, 'read_replica_actions', ())
+    return getattr(view_class, 'use_read_replica', False)
+
+
+def choose_replica(request, view_func):
+    """
+    The ReplicaChoice for this request's reads, or None for the primary.
+    """
+    replicas = replica_aliases()
+    if not replicas or request.COOKIES.get(PIN_COOKIE):
+        return None
+    if is_replica_eligible(request, view_func):
+        return ReplicaChoice(request, random.choice(replicas))
+    return None
+
+
+@contextmanager
+def replica_reads(request, view_func):
+    """
+    Route reads inside the block as ReplicaRoutingMiddleware would for a
+    request to view_func (for views called in-process, e.g. /api/batch/).
+    """
+    choice = choose_replica(request, view_func)
+    token = _read_alias.set(choice) if choice else None
+    try:
+        yield
+    finally:
+        if token is not None:
+            _read_alias.reset(token)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Picks a replica for replica-eligible read requests and pins writers to
+    the primary. Runs natively under WSGI and ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.reset(request)
+        user = self.writer(request, response)
+        if user is not None:
+            pin_user(user.pk)
+        return response
+
+    async def __acall__(self, request):
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.reset(request)
+        user = self.writer(request, response)
+        if user is not None:
+            await apin_user(user.pk)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        choice = choose_replica(request, view_func)
+        if choice:
+            _read_alias.set(choice)
+            request._read_alias_set = True
+        return None
+
+    @staticmethod
+    def reset(request):
+        # Not a ContextVar token: under ASGI process_view runs in a copy of
+        # the request's context (sync_to_async), which a token can't reset
+        if request.__dict__.pop('_read_alias_set', False):
+            _read_alias.set(None)
+
+    @staticmethod
+    def writer(request, response):
+        """
+        The authenticated user a successful write should pin, if any; an
+        anonymous writer gets the pin cookie instead.
+        """
+        if request.method in SAFE_METHODS or not 200 <= response.status_code < 300:
+            return None
+        user = _known_user(request)
+        if user is not None and user.is_authenticated:
+            return user
+        response.set_cookie(
+            PIN_COOKIE, '1',
+            max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 15),
+            httponly=True,
+            samesite='Lax',
+        )
+        return None
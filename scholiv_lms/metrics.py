@@ -0,0 +1,148 @@
+"""
+In-process metrics registry with a Prometheus text exposition endpoint.
+
+Counters, gauges and histograms live in this process only (each worker
+exposes its own numbers; Prometheus aggregates across scrape targets).
+
+    from scholiv_lms.metrics import registry
+    registry.inc('http_requests_total', route='student-dashboard', status='200')
+    registry.observe('http_request_duration_seconds', 0.042, route='student-dashboard')
+"""
+import math
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, math.inf)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = {}                       # name -> (type, help, buckets)
+        self._values = defaultdict(float)     # (name, labels) -> value
+        self._histograms = {}                 # (name, labels) -> [bucket counts, sum, count]
+
+    def describe(self, name, metric_type, help_text, buckets=DEFAULT_BUCKETS):
+        with self._lock:
+            self._meta[name] = (metric_type, help_text, tuple(buckets))
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            self._values[self._key(name, labels)] += value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._values[self._key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            buckets = self._meta.get(name, (None, None, DEFAULT_BUCKETS))[2]
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(buckets), 0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def get(self, name, **labels):
+        with self._lock:
+            return self._values.get(self._key(name, labels), 0)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+            self._histograms.clear()
+
+    def render(self):
+        """
+        Prometheus text exposition format (version 0.0.4).
+        """
+        def fmt_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            body = ','.join(f'{k}="{_escape(v)}"' for k, v in pairs)
+            return '{' + body + '}'
+
+        with self._lock:
+            values = dict(self._values)
+            histograms = {k: (list(v[0]), v[1], v[2]) for k, v in self._histograms.items()}
+            meta = dict(self._meta)
+
+        names = sorted({name for name, _ in values} | {name for name, _ in histograms})
+        lines = []
+        for name in names:
+            metric_type, help_text, buckets = meta.get(name, (None, None, DEFAULT_BUCKETS))
+            if help_text:
+                lines.append(f'# HELP {name} {help_text}')
+            if name in {n for n, _ in histograms}:
+                lines.append(f'# TYPE {name} histogram')
+                for (n, labels), (counts, total, count) in sorted(histograms.items()):
+                    if n != name:
+                        continue
+                    for bound, bucket_count in zip(buckets, counts):
+                        le = '+Inf' if bound == math.inf else repr(float(bound))
+                        lines.append(f'{name}_bucket{fmt_labels(labels, [("le", le)])} {bucket_count}')
+                    lines.append(f'{name}_sum{fmt_labels(labels)} {total}')
+                    lines.append(f'{name}_count{fmt_labels(labels)} {count}')
+            else:
+                lines.append(f'# TYPE {name} {metric_type or "untyped"}')
+                for (n, labels), value in sorted(values.items()):
+                    if n == name:
+                        lines.append(f'{name}{fmt_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+registry.describe('http_requests_total', 'counter', 'Requests handled, by route, method and status.')
+registry.describe('http_request_duration_seconds', 'histogram', 'Total request latency.')
+registry.describe('http_request_db_queries', 'histogram', 'SQL queries per request.',
+                  buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, math.inf))
+registry.describe('http_request_db_seconds', 'histogram', 'Time spent in SQL per request.')
+registry.describe('http_request_serialization_seconds', 'histogram', 'Time spent rendering the response body.')
+registry.describe('http_response_size_bytes', 'histogram', 'Response body size.',
+                  buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, math.inf))
+registry.describe('http_batch_subrequests_total', 'counter', 'Requests run inside /api/batch/, by route and status.')
+registry.describe('admission_requests_total', 'counter', 'Requests to admission-controlled routes, by lane and outcome.')
+registry.describe('admission_in_flight', 'gauge', 'Requests running in an admission lane.')
+registry.describe('admission_queued', 'gauge', 'Requests waiting for a slot in an admission lane.')
+registry.describe('admission_queue_wait_seconds', 'histogram', 'Time admitted requests waited for a lane slot.')
+registry.describe('singleflight_calls_total', 'counter',
+                  'Coalesced computations by computation and role (leader, follower, waited, uncoalesced).')
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint.
+    URL: /metrics/
+
+    Open to requests carrying 'Authorization: Bearer <METRICS_TOKEN>' when
+    a token is configured, to logged-in superusers, and to
+    METRICS_ALLOWED_IPS (none by default: behind a reverse proxy on the
+    same host every client would appear as 127.0.0.1).
+    """
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', [])
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    authorized = (
+        request.META.get('REMOTE_ADDR') in allowed_ips
+        or (token and request.META.get('HTTP_AUTHORIZATION') == f'Bearer {token}')
+        or getattr(request.user, 'is_superuser', False)
+    )
+    if not authorized:
+        return HttpResponseForbidden('Forbidden')
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,230 @@
+"""
+Per-request instrumentation and profiling.
+
+RequestMetricsMiddleware records, for every request:
+  - number of SQL queries and the time spent in them (all database aliases)
+  - serialization time (rendering of DRF / template responses)
+  - response size (non-streaming responses)
+  - total latency
+
+and reports them as a Server-Timing header (visible in the browser dev
+tools) and in the metrics registry served at /metrics/.
+
+Keep it FIRST in MIDDLEWARE so the numbers cover the whole stack and its
+process_template_response runs right before the response is rendered.
+Queries slower than SLOW_QUERY_MS are logged to 'scholiv_lms.slow_queries'.
+
+ProfilingMiddleware (opt-in, PROFILING_ENABLED) profiles selected requests
+and writes one file per request to PROFILING_DIR; see scholiv_lms/profiling.py
+and the aggregate_profiles command.
+
+Both run natively under WSGI and ASGI, so async views are not pushed
+through a thread by them. Under ASGI, work that touches database
+connections (which belong to a thread) runs in the request's
+thread-sensitive sync_to_async thread, where its ORM calls run too.
+"""
+import logging
+import os
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .metrics import registry
+from .profiling import make_profiler, profile_path
+
+slow_query_logger = logging.getLogger('scholiv_lms.slow_queries')
+profiling_logger = logging.getLogger('scholiv_lms.profiling')
+
+
+class RequestStats:
+    def __init__(self, request=None, slow_query_ms=None):
+        self.request = request
+        self.slow_query_ms = slow_query_ms
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+
+    def add(self, other):
+        """
+        Count the queries of work done for this request on another thread
+        (batch sub-requests), whose connections other stats wrapped.
+        """
+        self.queries += other.queries
+        self.db_time += other.db_time
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed with connection.execute_wrapper()
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.db_time += duration
+            self.queries += 1
+            if self.slow_query_ms is not None and duration * 1000 >= self.slow_query_ms:
+                slow_query_logger.warning(
+                    "Slow query (%.1f ms) on %s [%s]: %s",
+                    duration * 1000, context['connection'].alias, route_name(self.request), sql,
+                )
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match._func_path
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = request._request_stats = RequestStats(request, getattr(settings, 'SLOW_QUERY_MS', None))
+        started = time.perf_counter()
+        with self.wrap_connections(stats):
+            response = self.get_response(request)
+        return self.finish(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        stats = request._request_stats = RequestStats(request, getattr(settings, 'SLOW_QUERY_MS', None))
+        started = time.perf_counter()
+        wrappers = await sync_to_async(self.wrap_connections)(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(wrappers.close)()
+        return self.finish(request, response, stats, time.perf_counter() - started)
+
+    @staticmethod
+    def wrap_connections(stats):
+        """
+        Count the queries of every connection of the calling thread until
+        the returned ExitStack is closed.
+        """
+        with ExitStack() as stack:
+            for conn in connections.all(initialized_only=False):
+                stack.enter_context(conn.execute_wrapper(stats))
+            return stack.pop_all()
+
+    def finish(self, request, response, stats, total):
+        size = None if response.streaming else len(response.content)
+        self.record(request, response, stats, total, size)
+
+        if getattr(settings, 'SERVER_TIMING_HEADER', True):
+            timings = [f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries"']
+            if stats.render_time:
+                timings.append(f'ser;dur={stats.render_time * 1000:.2f}')
+            timings.append(f'total;dur={total * 1000:.2f}')
+            response['Server-Timing'] = ', '.join(timings)
+        return response
+
+    def process_template_response(self, request, response):
+        stats = request._request_stats
+        started = time.perf_counter()
+
+        def rendered(response):
+            stats.render_time += time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def record(self, request, response, stats, total, size):
+        route = route_name(request)
+        registry.inc('http_requests_total', route=route, method=request.method, status=response.status_code)
+        registry.observe('http_request_duration_seconds', total, route=route)
+        registry.observe('http_request_db_queries', stats.queries, route=route)
+        registry.observe('http_request_db_seconds', stats.db_time, route=route)
+        if stats.render_time:
+            registry.observe('http_request_serialization_seconds', stats.render_time, route=route)
+        if size is not None:
+            registry.observe('http_response_size_bytes', size, route=route)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a sample of requests to PROFILING_ROUTES (all routes if empty):
+
+      - every request with 'X-Profile: <PROFILING_TOKEN>' (any value in DEBUG
+        when no token is configured), and
+      - a random PROFILING_SAMPLE_RATE fraction of the others.
+
+    PROFILING_MODE 'stack' samples the request thread's stack every
+    PROFILING_INTERVAL_MS; 'cprofile' records every call (use on demand,
+    not with a sample rate). The file name is returned in X-Profile-File.
+
+    With PROFILING_ENABLED off the middleware removes itself at startup,
+    so it costs nothing. Under ASGI the stack sampler follows the thread
+    running the request's sync code (sync views, ORM calls).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.directory = settings.PROFILING_DIR
+        self.mode = getattr(settings, 'PROFILING_MODE', 'stack')
+        self.interval = getattr(settings, 'PROFILING_INTERVAL_MS', 5) / 1000
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        self.routes = set(getattr(settings, 'PROFILING_ROUTES', ()))
+        self.token = getattr(settings, 'PROFILING_TOKEN', '')
+        make_profiler(self.mode, self.interval)  # fail fast on a bad mode
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.finish(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if getattr(request, '_profiler', None) is not None:
+            # Writes the profile file
+            response = await sync_to_async(self.finish)(request, response)
+        return response
+
+    def finish(self, request, response):
+        profiler = getattr(request, '_profiler', None)
+        if profiler is not None:
+            profiler.stop()
+            try:
+                path = profile_path(self.directory, route_name(request), profiler.extension)
+                profiler.save(path)
+            except OSError:
+                profiling_logger.exception("Could not save profile for %s", request.path)
+            else:
+                response['X-Profile-File'] = os.path.relpath(path, self.directory)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.routes and route_name(request) not in self.routes:
+            return None
+        if not (self.requested(request) or random.random() < self.sample_rate):
+            return None
+        profiler = make_profiler(self.mode, self.interval)
+        if profiler.start():
+            request._profiler = profiler
+        return None
+
+    def requested(self, request):
+        header = request.META.get('HTTP_X_PROFILE')
+        if not header:
+            return False
+        if self.token:
+            return header == self.token
+        return settings.DEBUG
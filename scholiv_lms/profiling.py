@@ -0,0 +1,169 @@
+"""
+Request profilers used by ProfilingMiddleware, and the conversion of their
+output files to collapsed stacks ("frame;frame;frame weight" per line, the
+input format of flamegraph.pl / speedscope / inferno).
+
+Two kinds of profile files are written to PROFILING_DIR/<route>/:
+
+    *.prof    cProfile data (deterministic, higher overhead)
+    *.stacks  wall-clock stack samples of the request thread, already collapsed,
+              with a '# interval_ms=<n>' header line
+
+Weights of the collapsed output are microseconds for both.
+"""
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+# cProfile can only run in one thread at a time (Python 3.12+ enforces it)
+_cprofile_lock = threading.Lock()
+
+
+def frame_label(filename, lineno, function):
+    return f"{function} ({os.path.basename(filename)}:{lineno})"
+
+
+class CProfileProfiler:
+    extension = 'prof'
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        if not _cprofile_lock.acquire(blocking=False):
+            return False
+        self.profile.enable()
+        return True
+
+    def stop(self):
+        self.profile.disable()
+        _cprofile_lock.release()
+
+    def save(self, path):
+        self.profile.dump_stats(path)
+
+
+class StackSampler:
+    """
+    Samples the calling thread's stack every `interval` seconds from a
+    background thread. Cheap enough for production, and unlike cProfile
+    it sees time spent waiting (database, S3).
+    """
+    extension = 'stacks'
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.counts = Counter()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(frame_label(code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f'# interval_ms={self.interval * 1000:g}\n')
+            for stack, count in self.counts.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+def make_profiler(mode, interval):
+    if mode == 'cprofile':
+        return CProfileProfiler()
+    if mode == 'stack':
+        return StackSampler(interval)
+    raise ValueError(f"Unknown PROFILING_MODE '{mode}'. Choose 'cprofile' or 'stack'.")
+
+
+def profile_path(directory, route, extension):
+    """
+    PROFILING_DIR/<route>/<timestamp>-<pid>-<random>.<extension>
+    """
+    folder = os.path.join(directory, route.replace(':', '_').replace('/', '_'))
+    os.makedirs(folder, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}.{extension}"
+    return os.path.join(folder, name)
+
+
+# ---------------------------------------------------------------------------
+# Collapsing
+# ---------------------------------------------------------------------------
+
+def collapse_stacks_file(path, counts):
+    """
+    Add the samples of a .stacks file to `counts` (weights in microseconds).
+    """
+    interval_us = 1000.0
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if line.startswith('# interval_ms='):
+                interval_us = float(line.split('=', 1)[1]) * 1000
+                continue
+            if not line or line.startswith('#'):
+                continue
+            stack, _, count = line.rpartition(' ')
+            counts[stack] += int(count) * interval_us
+
+
+def collapse_prof_file(path, counts, max_depth=64, min_us=10):
+    """
+    Add a cProfile file to `counts` (weights in microseconds).
+
+    cProfile keeps caller -> callee edges, not full stacks, so stacks are
+    rebuilt by walking down from the root functions and splitting each
+    function's own time across its callers in proportion to the time each
+    caller spent in it. Good enough for a flame graph; exact for code
+    without shared helpers. Branches under `min_us` are dropped.
+    """
+    stats = pstats.Stats(path).stats
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, (_, _, _, cumtime) in callers.items():
+            callees.setdefault(caller, []).append((func, cumtime))
+
+    def label(func):
+        filename, lineno, name = func
+        return frame_label(filename, lineno, name)
+
+    def walk(func, share, stack, seen):
+        tottime = stats[func][2]
+        stack = stack + [label(func)]
+        if tottime * share > 0:
+            counts[';'.join(stack)] += tottime * share * 1e6
+        if len(stack) >= max_depth:
+            return
+        for callee, edge_time in callees.get(func, ()):
+            # Skip recursion; its time is already inside the outer call
+            if callee in seen or callee not in stats or share * edge_time * 1e6 < min_us:
+                continue
+            callee_cumtime = stats[callee][3]
+            if callee_cumtime > 0:
+                walk(callee, share * min(1.0, edge_time / callee_cumtime), stack, seen | {callee})
+
+    for func, (_, _, _, _, callers) in stats.items():
+        if not callers:
+            walk(func, 1.0, [], {func})
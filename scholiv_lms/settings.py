@@ -7,6 +7,7 @@ Generated by 'django-admin startproject' using Django 5.2.7.
 from pathlib import Path
 import os
 from decouple import config
+from .database import database_config, replica_configs
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -36,6 +37,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'scholiv_lms.middleware.RequestMetricsMiddleware',  # keep first: measures the whole stack
+    'scholiv_lms.admission.AdmissionControlMiddleware',  # sheds before any other view work
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -43,6 +46,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'scholiv_lms.db_router.ReplicaRoutingMiddleware',
+    'scholiv_lms.middleware.ProfilingMiddleware',  # no-op unless PROFILING_ENABLED
 ]
 
 ROOT_URLCONF = 'scholiv_lms.urls'
@@ -65,20 +70,24 @@ TEMPLATES = [
 WSGI_APPLICATION = 'scholiv_lms.wsgi.application'
 
 # Database
+# Configured from the environment (DB_ENGINE, DB_NAME, DB_CONN_MAX_AGE, DB_POOL...).
+# See scholiv_lms/database.py for every option and its default.
 DATABASES = {
-    'default': {
-        'ENGINE': 'mysql.connector.django',
-        'NAME': 'scholiv_lms',
-        'USER': 'root',
-        'PASSWORD': 'Sameer@21', 
-        'HOST': '127.0.0.1',
-        'PORT': '3306',
-        'OPTIONS': {
-            'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
-        },
-    }
+    'default': database_config('DB', base_dir=BASE_DIR),
 }
 
+# Read replicas (DB_REPLICAS=replica1,replica2). Student/report reads and
+# viewset list actions are routed to them; see scholiv_lms/db_router.py.
+DATABASES.update(replica_configs(base_dir=BASE_DIR))
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['scholiv_lms.db_router.ReplicaRouter']
+
+# After a write, keep that user on the primary for this many seconds. The
+# pins live in this cache alias, which must be shared by all processes
+# when there are replicas (e.g. a Redis or database cache in CACHES)
+REPLICA_PIN_SECONDS = config('DB_REPLICA_PIN_SECONDS', default=15, cast=int)
+REPLICA_PIN_CACHE = config('DB_REPLICA_PIN_CACHE', default='default')
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     { 'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator', },
@@ -103,6 +112,15 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
 
+REST_FRAMEWORK = {
+    # DRF's defaults, after the one authenticating /api/batch/ sub-requests
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'courses.authentication.BatchUserAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+}
+
 # Redirect after login
 LOGIN_REDIRECT_URL = '/api/'
 
@@ -136,4 +154,114 @@ STORAGES = {
     "staticfiles": {
         "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
     },
-}
\ No newline at end of file
+}
+
+# ==========================================
+# ANNOUNCEMENT EVENT STREAM (SSE over ASGI)
+# ==========================================
+
+# 'local'    -> in-process pub/sub (single worker)
+# 'database' -> fan-out through the AnnouncementEvent table (several workers)
+ANNOUNCEMENT_EVENTS_BACKEND = config('ANNOUNCEMENT_EVENTS_BACKEND', default='local')
+ANNOUNCEMENT_EVENTS_POLL_INTERVAL = 1.0        # seconds between DB polls ('database' backend)
+ANNOUNCEMENT_EVENTS_POLL_OVERLAP_SECONDS = 5  # each poll re-reads this much before the last one (late commits)
+ANNOUNCEMENT_EVENTS_KEEPALIVE = 15             # seconds between keep-alive comments
+ANNOUNCEMENT_EVENTS_RETENTION_SECONDS = 3600   # how long event rows are kept
+
+# ==========================================
+# REQUEST METRICS (see scholiv_lms/middleware.py)
+# ==========================================
+
+# Server-Timing header with DB / serialization / total time on every response
+SERVER_TIMING_HEADER = config('SERVER_TIMING_HEADER', default=True, cast=bool)
+
+# Who may scrape /metrics/: requests with 'Authorization: Bearer <token>'
+# and superusers. Allow addresses only where REMOTE_ADDR is the real client
+# (not behind a proxy on the same host)
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='', cast=lambda v: [ip.strip() for ip in v.split(',') if ip.strip()])
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Log SQL statements slower than this (milliseconds) to 'scholiv_lms.slow_queries'
+SLOW_QUERY_MS = config('SLOW_QUERY_MS', default=500, cast=int)
+
+# ==========================================
+# REQUEST PROFILING (opt-in, see scholiv_lms/profiling.py)
+# ==========================================
+
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_MODE = config('PROFILING_MODE', default='stack')            # 'stack' | 'cprofile'
+PROFILING_INTERVAL_MS = config('PROFILING_INTERVAL_MS', default=5, cast=float)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+PROFILING_TOKEN = config('PROFILING_TOKEN', default='')               # value of the X-Profile header
+PROFILING_DIR = config('PROFILING_DIR', default=str(BASE_DIR / 'profiles'))
+# Route names (as in reverse()) that may be profiled; empty = all
+PROFILING_ROUTES = [
+    'attendance-upload',
+    'users:student-upload',
+    'attendance-report',
+]
+
+# ==========================================
+# ATTENDANCE ARCHIVE (see courses/archive.py)
+# ==========================================
+
+# Month the academic year starts in (4 = April - March)
+ACADEMIC_YEAR_START_MONTH = config('ACADEMIC_YEAR_START_MONTH', default=4, cast=int)
+# Academic years kept in the live Attendance table, counting the current one;
+# older years may be moved to AttendanceArchive by `manage.py archive_attendance`
+ATTENDANCE_LIVE_YEARS = config('ATTENDANCE_LIVE_YEARS', default=2, cast=int)
+
+# Columnar attendance export (courses/export.py): rows changed in the last
+# N seconds wait for the next export, so in-flight writes are never skipped
+EXPORT_WATERMARK_LAG_SECONDS = config('EXPORT_WATERMARK_LAG_SECONDS', default=60, cast=int)
+
+# Bulk attendance API (POST /api/attendance/bulk/)
+ATTENDANCE_BULK_MAX_RECORDS = config('ATTENDANCE_BULK_MAX_RECORDS', default=5000, cast=int)
+# How long an Idempotency-Key and its stored response are kept
+IDEMPOTENCY_KEY_TTL_HOURS = config('IDEMPOTENCY_KEY_TTL_HOURS', default=24, cast=int)
+
+# Bulk create/update/delete of schools, classes, subjects, lectures and
+# announcements (/api/<resource>/bulk/): max objects per request
+COURSE_BULK_MAX_OBJECTS = config('COURSE_BULK_MAX_OBJECTS', default=5000, cast=int)
+
+# Delta sync (/api/student/sync/): each sync re-reads this many seconds
+# before its token, so rows committed late (or read from a lagging replica)
+# are not missed; tombstones of deletions are kept this many days, older
+# tokens get a full sync
+SYNC_OVERLAP_SECONDS = config('SYNC_OVERLAP_SECONDS', default=60, cast=int)
+SYNC_TOMBSTONE_DAYS = config('SYNC_TOMBSTONE_DAYS', default=30, cast=int)
+
+# Batch API (/api/batch/): max sub-requests per batch, and threads (each
+# with its own database connection) running them concurrently per process
+BATCH_MAX_REQUESTS = config('BATCH_MAX_REQUESTS', default=10, cast=int)
+BATCH_MAX_WORKERS = config('BATCH_MAX_WORKERS', default=4, cast=int)
+
+# Single-flight coalescing (courses/singleflight.py) of the attendance
+# report and student dashboard: how long identical calls wait for the one
+# computing, and the first back-off (doubling up to 1s) of a worker waiting
+# for another worker's report lock
+SINGLE_FLIGHT_TIMEOUT_SECONDS = config('SINGLE_FLIGHT_TIMEOUT_SECONDS', default=60, cast=float)
+SINGLE_FLIGHT_LOCK_BACKOFF_SECONDS = config('SINGLE_FLIGHT_LOCK_BACKOFF_SECONDS', default=0.05, cast=float)
+
+# Admission control (scholiv_lms/admission.py): routes that can hold a
+# worker for minutes run at most `concurrency` at a time per process, with
+# up to `queue` more waiting at most `timeout` seconds for a slot; the rest
+# get 503 with Retry-After. Waiting requests hold a thread too: concurrency
+# + queue of each lane must stay below the threads per worker, so cheap
+# requests always find one. Set ADMISSION_WORKER_THREADS to the server's
+# thread count (e.g. gunicorn --threads); startup fails if a lane exceeds it.
+ADMISSION_WORKER_THREADS = config('ADMISSION_WORKER_THREADS', default=8, cast=int)
+ADMISSION_LANES = {
+    'heavy': {
+        'concurrency': config('ADMISSION_HEAVY_CONCURRENCY', default=2, cast=int),
+        'queue': config('ADMISSION_HEAVY_QUEUE', default=4, cast=int),
+        'timeout': config('ADMISSION_HEAVY_QUEUE_TIMEOUT_SECONDS', default=10, cast=float),
+        'retry_after': config('ADMISSION_HEAVY_RETRY_AFTER_SECONDS', default=30, cast=int),
+    },
+}
+ADMISSION_ROUTES = {
+    'attendance-upload': 'heavy',
+    'users:student-upload': 'heavy',
+    'lecture-upload-video': 'heavy',
+    'attendance-report': 'heavy',
+}
@@ -0,0 +1,123 @@
+"""
+Test helpers for per-endpoint SQL query budgets.
+
+Every named route in courses/urls.py and users/urls.py must have an entry in
+QUERY_BUDGETS: the maximum number of queries one request to it may run with
+the fixture data of courses.tests.QueryBudgetTests (a handful of rows per
+table, so an N+1 shows up as a blown budget). Session authentication
+accounts for 2 of them (session + user), and the first School, Class or
+Subject read through the reference cache (courses/reference.py) for 1
+version check. Add the budget together with the route; raise one only
+with a reason.
+"""
+from contextlib import ExitStack
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver
+
+QUERY_BUDGETS = {
+    # Router (ModelViewSets)
+    'api-root': 2,
+    'school-list': 3,
+    'school-detail': 3,
+    'school-bulk': 6,                 # + one reference version write per transaction
+    'class-list': 4,
+    'class-detail': 4,
+    'class-bulk': 7,
+    'subject-list': 3,
+    'subject-detail': 3,
+    'subject-bulk': 7,
+    'lecture-list': 4,
+    'lecture-detail': 4,
+    'lecture-upload-video': 4,
+    'lecture-bulk': 7,                # one in_bulk per FK + one INSERT
+    'attendance-list': 3,
+    'attendance-detail': 3,
+    'attendance-bulk': 9,
+    'attendance-upload': 2,
+    'announcement-list': 4,
+    'announcement-detail': 4,
+    'announcement-bulk': 8,
+    'question-list': 4,
+    'question-detail': 4,
+    'answer-list': 3,
+    'answer-detail': 3,
+    'answer-accept': 8,
+
+    # Student portal
+    'student-dashboard': 12,           # + archived attendance totals
+    'student-lectures': 6,             # served from the class's catalog
+    'student-lecture-detail': 7,
+    'mark-lecture-watched': 8,         # first watch: INSERT in a savepoint (get_or_create)
+    'student-attendance': 7,           # + archived years (open date range)
+    'student-profile': 4,
+    'student-change-password': 3,
+    'student-sync': 6,                 # full sync; a delta adds watch status + tombstones
+    'async-student-dashboard': 11,
+    'async-student-lectures': 7,
+    'async-student-lecture-detail': 8,
+    'async-mark-lecture-watched': 6,
+    'async-student-attendance': 8,
+    'async-student-profile': 4,
+
+    # Q&A threads, reports, live feed
+    'lecture-question-thread': 5,
+    'question-answers-page': 4,
+    'attendance-export': 4,
+    'attendance-report': 7,            # + advisory lock and unlock (PostgreSQL, MySQL)
+    'announcement-stream': 4,          # another class's feed (403), over ASGI
+    'batch': 21,                       # dashboard, lectures, attendance, profile, announcements
+
+    # users/urls.py
+    'users:register': 4,
+    'users:student-upload': 23,        # 5 rows: class lookup, email and username checks, INSERT per row
+}
+
+
+def route_names(urlconf, namespace=None):
+    """
+    Names of all routes in a urls module, namespaced like reverse() expects.
+    """
+    namespace = namespace or getattr(urlconf, 'app_name', None)
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from walk(pattern.url_patterns)
+            elif isinstance(pattern, URLPattern) and pattern.name:
+                yield f'{namespace}:{pattern.name}' if namespace else pattern.name
+
+    return set(walk(urlconf.urlpatterns))
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin: assertQueryBudget(route, func, *args, **kwargs) calls
+    func (e.g. self.client.get) and fails if it ran more queries, on all
+    database aliases together, than QUERY_BUDGETS[route]. Streaming bodies
+    (except event streams) are consumed inside the budget.
+    """
+    query_budgets = QUERY_BUDGETS
+
+    def assertQueryBudget(self, route, func, *args, **kwargs):
+        budget = self.query_budgets.get(route)
+        if budget is None:
+            self.fail(f"No query budget for route '{route}'. Add it to QUERY_BUDGETS.")
+
+        with ExitStack() as stack:
+            contexts = [
+                stack.enter_context(CaptureQueriesContext(conn))
+                for conn in connections.all(initialized_only=False)
+            ]
+            result = func(*args, **kwargs)
+            if getattr(result, 'streaming', False) and result.get('Content-Type') != 'text/event-stream':
+                result.streaming_content = [b''.join(result.streaming_content)]
+
+        queries = [q['sql'] for ctx in contexts for q in ctx.captured_queries]
+        if len(queries) > budget:
+            listing = '\n'.join(f'{i}. {sql}' for i, sql in enumerate(queries, start=1))
+            self.fail(
+                f"'{route}' ran {len(queries)} queries, budget is {budget}:\n{listing}"
+            )
+        return result
@@ -7,6 +7,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .metrics import metrics_view
+
 # JWT Imports
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
@@ -27,6 +29,9 @@ urlpatterns = [
 
     # Browsable API Login/Logout (Adds the dropdown button in the browser)
     path('api-auth/', include('rest_framework.urls')),
+
+    # Prometheus scrape endpoint (request metrics)
+    path('metrics/', metrics_view, name='metrics'),
 ]
 
 # Serve static and media files in development
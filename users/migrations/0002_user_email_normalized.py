@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:02
+
+import logging
+
+from django.db import migrations, models
+from django.db.models import F
+
+logger = logging.getLogger('users.migrations')
+
+
+def normalize_emails(apps, schema_editor):
+    """
+    Fill email_normalized. Where several accounts share an address (in any
+    letter case), the most recently used one keeps it and the others have
+    their email cleared (logged as a warning); nothing is deleted, and they
+    can still sign in with their username.
+    """
+    User = apps.get_model('users', 'User')
+    users = User.objects.exclude(email='').only('id', 'email').order_by(
+        F('last_login').desc(nulls_last=True), 'id'
+    )
+    seen = {}
+    batch = []
+    for user in users.iterator(chunk_size=2000):
+        normalized = str(user.email or '').strip().lower() or None  # users.models.normalize_email
+        if normalized is None:
+            user.email_normalized = None
+        elif normalized in seen:
+            logger.warning(
+                "User %s: cleared duplicate email %r (kept by user %s)", user.id, user.email, seen[normalized]
+            )
+            user.email, user.email_normalized = '', None
+        else:
+            seen[normalized] = user.id
+            user.email_normalized = normalized
+        batch.append(user)
+        if len(batch) >= 2000:
+            User.objects.bulk_update(batch, ['email', 'email_normalized'])
+            batch = []
+    if batch:
+        User.objects.bulk_update(batch, ['email', 'email_normalized'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='email_normalized',
+            field=models.CharField(blank=True, editable=False, max_length=254, null=True),
+        ),
+        # Dedupe and backfill before the unique index exists
+        migrations.RunPython(normalize_emails, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='user',
+            name='email_normalized',
+            field=models.CharField(blank=True, editable=False, max_length=254, null=True, unique=True),
+        ),
+    ]
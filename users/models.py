@@ -1,5 +1,9 @@
 from django.contrib.auth.models import AbstractUser
+from django.core.exceptions import ValidationError
 from django.db import models
+
+from courses.reference import ReferenceForeignKey
+
 # from courses.models import School, Class  <-- This line was deleted, it caused an error
 
 # This is the fix. We are moving the Role class outside
@@ -10,6 +14,15 @@ class Role(models.TextChoices):
     TEACHER = 'Teacher', 'Teacher'
     STUDENT = 'Student', 'Student'
 
+def normalize_email(email):
+    """
+    The form emails are compared and looked up in (User.email_normalized):
+    trimmed and lower-cased, None for an empty email.
+    """
+    email = str(email or '').strip().lower()
+    return email or None
+
+
 class User(AbstractUser):
     """
     Custom User model extending Django's AbstractUser.
@@ -24,7 +37,7 @@ class User(AbstractUser):
         default=Role.STUDENT
     )
     
-    school = models.ForeignKey(
+    school = ReferenceForeignKey(
         'courses.School', # Use string path to avoid circular import
         on_delete=models.CASCADE,
         null=True, 
@@ -32,7 +45,7 @@ class User(AbstractUser):
         related_name='users'
     )
     
-    assigned_class = models.ForeignKey(
+    assigned_class = ReferenceForeignKey(
         'courses.Class', # Use string path to avoid circular import
         on_delete=models.SET_NULL,
         null=True,
@@ -40,5 +53,31 @@ class User(AbstractUser):
         related_name='students'
     )
 
+    # normalize_email(email), kept in sync by save(). Unique, so every
+    # lookup by email is one index probe and an address (in any case) can
+    # belong to one account only. NULL for users without an email.
+    email_normalized = models.CharField(max_length=254, unique=True, null=True, blank=True, editable=False)
+
+    def clean(self):
+        super().clean()
+        normalized = normalize_email(self.email)
+        if normalized and User.objects.filter(email_normalized=normalized).exclude(pk=self.pk).exists():
+            raise ValidationError({'email': 'A user with this email address already exists.'})
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_username = instance.__dict__.get('username')
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.email_normalized = normalize_email(self.email)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'email' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'email_normalized'}
+        super().save(*args, **kwargs)
+        # After post_save: the poster_renamed signal (courses/signals.py) compares the two
+        self._loaded_username = self.username
+
     def __str__(self):
         return self.username
\ No newline at end of file
@@ -3,7 +3,7 @@ from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 
 # Make sure to import the User model from its new location
-from .models import User 
+from .models import Role, User, normalize_email
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -37,8 +37,8 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         fields = ('username', 'email', 'password', 'role')
 
     def validate(self, attrs):
-        # Check if email already exists
-        if User.objects.filter(email=attrs['email']).exists():
+        # Check if email already exists (in any letter case)
+        if User.objects.filter(email_normalized=normalize_email(attrs['email'])).exists():
             raise serializers.ValidationError({"email": "This email address is already in use."})
         
         # Check if username already exists
@@ -50,11 +50,11 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         # Use .create_user() to ensure the password is properly hashed
         # Default to 'student'
-        user = User.create_user(
+        user = User.objects.create_user(
             username=validated_data['username'],
             email=validated_data['email'],
             password=validated_data['password'],
-            role=validated_data.get('role', 'student') 
+            role=validated_data.get('role', Role.STUDENT)
         )
         return user
 
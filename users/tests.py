@@ -1,3 +1,83 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from django.db import IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Role, User
+from .serializers import UserRegistrationSerializer
+
+
+class EmailNormalizedTests(TestCase):
+    def test_save_keeps_email_normalized_in_sync(self):
+        user = User.objects.create_user('ann', ' Ann@Example.com', 'pass12345')
+        self.assertEqual(user.email_normalized, 'ann@example.com')
+        user.email = 'ann@school.org'
+        user.save(update_fields=['email'])
+        self.assertTrue(User.objects.filter(email_normalized='ann@school.org').exists())
+
+    def test_email_is_unique_in_any_case(self):
+        User.objects.create_user('ann', 'ann@example.com', 'pass12345')
+        User.objects.create_user('bob', '', 'pass12345')
+        User.objects.create_user('cat', '', 'pass12345')  # empty emails don't collide
+        with self.assertRaises(IntegrityError):
+            User.objects.create_user('ann2', 'ANN@example.com', 'pass12345')
+
+    def test_registration_rejects_email_in_other_case(self):
+        User.objects.create_user('ann', 'ann@example.com', 'pass12345')
+        serializer = UserRegistrationSerializer(data={
+            'username': 'ann2', 'email': 'Ann@Example.com', 'password': 'S3cure-pass-123',
+        })
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('email', serializer.errors)
+
+
+class RegistrationTests(TestCase):
+    def test_register(self):
+        response = self.client.post(reverse('users:register'), {
+            'username': 'ann', 'email': 'ann@example.com', 'password': 'S3cure-pass-123',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['user']['username'], 'ann')
+        user = User.objects.get(username='ann')
+        self.assertEqual(user.role, Role.STUDENT)
+        self.assertTrue(user.check_password('S3cure-pass-123'))
+
+
+class EmailNormalizedMigrationTests(TransactionTestCase):
+    """
+    Migration 0002 backfills email_normalized and clears the addresses
+    duplicated in another letter case.
+    """
+    before = [('users', '0001_initial')]
+    after = [('users', '0002_user_email_normalized')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        super().tearDown()
+
+    def test_backfill(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        users = executor.loader.project_state(self.before).apps.get_model('users', 'User').objects
+        recent = users.create(username='recent', email='Ann@Example.com ', last_login=timezone.now())
+        stale = users.create(
+            username='stale', email='ann@example.com', last_login=timezone.now() - datetime.timedelta(days=30)
+        )
+        blank = users.create(username='blank', email='   ')
+        other_blank = users.create(username='other-blank', email='')
+
+        executor = MigrationExecutor(connection)
+        with self.assertLogs('users.migrations', 'WARNING') as logs:
+            executor.migrate(self.after)
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn(f"User {stale.pk}: cleared duplicate email", logs.output[0])
+
+        users = executor.loader.project_state(self.after).apps.get_model('users', 'User').objects
+        emails = dict(users.values_list('pk', 'email_normalized'))
+        self.assertEqual(emails, {recent.pk: 'ann@example.com', stale.pk: None, blank.pk: None, other_blank.pk: None})
+        self.assertEqual(users.get(pk=stale.pk).email, '')
+        self.assertEqual(users.get(pk=blank.pk).email, '   ')
@@ -8,7 +8,7 @@ import secrets # For generating random passwords
 import string
 
 # Import the User model from its new location
-from .models import User 
+from .models import User, normalize_email
 # Import the relevant course models
 from courses.models import Class 
 # Import the new serializers
@@ -32,6 +32,7 @@ class UserRegistrationView(generics.CreateAPIView):
         # but the serializer's create method handles hashing and defaults the role.
         user = serializer.save()
         # Optionally, you could add logic here, e.g., send a welcome email.
+        return user
 
     def create(self, request, *args, **kwargs):
         """
@@ -113,8 +114,8 @@ class StudentUploadView(APIView):
                      continue
 
 
-                # --- Check if user already exists (by email or username) ---
-                if User.objects.filter(email=email).exists():
+                # --- Check if user already exists (by email in any case, or username) ---
+                if User.objects.filter(email_normalized=normalize_email(email)).exists():
                     errors.append(f"Row {row_idx}: Email '{email}' already exists.")
                     continue
                 if User.objects.filter(username=username).exists():